@@ -1,10 +1,34 @@
 from django.contrib import admin
 
-from anagram.models import Word
+from anagram.models import AnagramGroup, Job, Word
 
 
 @admin.register(Word)
 class WordAdmin(admin.ModelAdmin):
     list_display = ("id", "word", "sorted_word", "sorted_lowercase_word", "is_proper_noun")
     search_fields = ("word", "sorted_word")
-    readonly_fields = ("word", "sorted_word", "sorted_lowercase_word", "is_proper_noun")
+    readonly_fields = ("word", "sorted_word", "sorted_lowercase_word", "is_proper_noun", "group")
+
+
+@admin.register(AnagramGroup)
+class AnagramGroupAdmin(admin.ModelAdmin):
+    list_display = ("id", "signature", "count", "length")
+    search_fields = ("signature",)
+    readonly_fields = ("signature", "count", "length")
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "processed", "total", "created_at", "finished_at")
+    list_filter = ("kind", "status")
+    readonly_fields = (
+        "kind",
+        "status",
+        "upload",
+        "processed",
+        "total",
+        "result",
+        "error",
+        "started_at",
+        "finished_at",
+    )
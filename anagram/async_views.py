@@ -0,0 +1,157 @@
+"""Async versions of the read endpoints, routed instead of the sync ones when `ANAGRAM_ASYNC_VIEWS` is set.
+
+DRF views are synchronous, so under an ASGI server every request holds a worker thread for as long as it runs. These
+are plain Django views with async handlers that query the database with the async ORM, so slow clients only cost an
+idle coroutine. They keep the URLs, query parameters and serializers of their counterparts in `anagram/views.py`, and
+return the same JSON.
+"""
+
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+from anagram.cache import cached_response, conditional_response, single_flight
+from anagram.index import anagram_index
+from anagram.models import AnagramGroup, Word
+from anagram.pagination import AnagramGroupCursorPagination, AsyncPageNumberPagination
+from anagram.renderers import ORJSONParser, ORJSONRenderer
+from anagram.routers import replica_reads
+from anagram.serializers import (
+    AnagramsListSerializer,
+    BatchAnagramsRequestSerializer,
+    BatchAnagramsSerializer,
+    MostAnagramsSerializer,
+    WordLengthStatsSerializer,
+)
+from anagram.views import (
+    BLANK,
+    anagram_groups_queryset,
+    anagrams_queryset,
+    batch_queryset,
+    batch_results,
+    get_anagram_query_options,
+    get_anagrams_with_blanks,
+    indexed_batch_results,
+    length_histogram,
+    length_statistics,
+)
+
+
+def json_response(data, status_code: int = status.HTTP_200_OK) -> HttpResponse:
+    """Render the data the way `ORJSONRenderer` renders the JSON responses of the sync views."""
+    return HttpResponse(ORJSONRenderer().render(data), status=status_code, content_type="application/json")
+
+
+class AsyncReadView(View):
+    """Base class of the async read endpoints.
+
+    Handlers get a DRF `Request` (for `query_params` and parsed `data`) and DRF exceptions are turned into the same
+    error responses DRF sends. Their reads go to the replica, like those of the sync `@read_only` views.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Exempt from CSRF checks like every DRF view. `ATOMIC_REQUESTS` can't wrap async views, and these only read.
+        view.csrf_exempt = True
+        return transaction.non_atomic_requests(view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request, parsers=[ORJSONParser()])
+        try:
+            with replica_reads():
+                response = await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            data = exc.detail if isinstance(exc.detail, list | dict) else {"detail": exc.detail}
+            response = json_response(data, exc.status_code)
+        # Like DRF views, as the same URL is served as MessagePack by the sync views.
+        patch_vary_headers(response, ("Accept",))
+        return response
+
+
+class AnagramsForWordView(AsyncReadView):
+    @conditional_response
+    @cached_response
+    async def get(self, request, word):
+        """Async `AnagramViewSet.get_anagrams_for_word`."""
+        limit, exclude_proper_nouns = get_anagram_query_options(request)
+
+        if BLANK in word:
+            # In a worker thread, as the letter index is rebuilt from the database whenever it is out of date.
+            anagrams_list = await sync_to_async(get_anagrams_with_blanks)(word, limit, exclude_proper_nouns)
+        elif settings.ANAGRAM_INDEX_ENABLED:
+            # In a worker thread too, the anagram index is rebuilt from the database just the same.
+            anagrams_list = await sync_to_async(anagram_index.get_anagrams)(word, limit, exclude_proper_nouns)
+        else:
+            anagrams_list = [anagram async for anagram in anagrams_queryset(word, limit, exclude_proper_nouns)]
+        return json_response(AnagramsListSerializer({"anagrams": anagrams_list}).data)
+
+
+class BatchAnagramsView(AsyncReadView):
+    async def post(self, request):
+        """Async `AnagramViewSet.get_anagrams_for_words`."""
+        serializer = BatchAnagramsRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        words = serializer.validated_data["words"]
+        limit, exclude_proper_nouns = get_anagram_query_options(request)
+
+        if settings.ANAGRAM_INDEX_ENABLED:
+            # In a worker thread, as the anagram index is rebuilt from the database whenever it is out of date.
+            results = await sync_to_async(indexed_batch_results)(words, limit, exclude_proper_nouns)
+        else:
+            rows = [row async for row in batch_queryset(words, exclude_proper_nouns)]
+            results = batch_results(words, rows, limit)
+        return json_response(BatchAnagramsSerializer({"results": results}).data)
+
+
+class WordLengthStatsView(AsyncReadView):
+    @conditional_response
+    @cached_response
+    @single_flight
+    async def get(self, request):
+        """Async `WordViewSet.get_word_length_statistics`."""
+        length_counts = [row async for row in length_histogram()]
+        return json_response(WordLengthStatsSerializer(length_statistics(length_counts)).data)
+
+
+class BiggestAnagramGroupView(AsyncReadView):
+    @conditional_response
+    @cached_response
+    @single_flight
+    async def get(self, request):
+        """Async `WordViewSet.get_biggest_anagram_group`."""
+        biggest_group = await AnagramGroup.objects.order_by("-count", "signature").afirst()
+        if biggest_group is None:
+            return json_response(MostAnagramsSerializer({"count": 0, "words": []}).data)
+        words = [word async for word in Word.objects.filter(group=biggest_group).values_list("word", flat=True)]
+        return json_response(MostAnagramsSerializer({"count": biggest_group.count, "words": words}).data)
+
+
+class AnagramGroupsView(AsyncReadView):
+    @conditional_response
+    @cached_response
+    @single_flight
+    async def get(self, request):
+        """Async `WordViewSet.get_anagram_groups_of_at_least_size_x`."""
+        anagram_groups = anagram_groups_queryset(request)
+        if request.query_params.get("pagination") == "cursor":
+            paginator = AnagramGroupCursorPagination()
+        else:
+            paginator = AsyncPageNumberPagination()
+        page = await paginator.apaginate_queryset(anagram_groups, request, view=self)
+
+        # Words of all groups in the page are fetched with a single query
+        words_by_group = defaultdict(list)
+        words = Word.objects.filter(group__in=[group.pk for group in page]).values_list("group_id", "word")
+        async for group_id, word in words:
+            words_by_group[group_id].append(word)
+        serializable_groups = [{"count": group.count, "words": words_by_group[group.pk]} for group in page]
+        return json_response(paginator.get_paginated_response(serializable_groups).data)
@@ -0,0 +1,38 @@
+"""Query budgets: the most database queries (and optionally SQL time) a view may spend on a single request.
+
+Views declare their budget with `@query_budget`. The test suite's `client` fixture (see `conftest.py`) checks every
+request against the budget of the view that served it and fails with the request's SQL when the view goes over, so a
+per-row query shows up in CI rather than in production. Budgets count the queries a view runs however much data there
+is, which is the point: a view whose queries grow with its rows can't stay under any of them.
+"""
+
+from dataclasses import dataclass
+
+from django.urls import ResolverMatch
+
+
+@dataclass(frozen=True)
+class QueryBudget:
+    queries: int
+    # Total time of the request's queries, in seconds. Unchecked if `None`.
+    seconds: float | None = None
+
+
+def query_budget(queries: int, seconds: float | None = None):
+    """Annotate a view method (or function view) with its query budget. The view itself is left as it is."""
+
+    def decorator(view):
+        view.query_budget = QueryBudget(queries=queries, seconds=seconds)
+        return view
+
+    return decorator
+
+
+def get_query_budget(match: ResolverMatch, method: str) -> QueryBudget | None:
+    """Budget of the view that `match` resolved to, for a request with the given HTTP method, if it has one."""
+    view_class = getattr(match.func, "cls", None)
+    if view_class is None:
+        return getattr(match.func, "query_budget", None)
+    # Viewsets map methods to their actions, API views handle them with the method of the same name.
+    handler_name = getattr(match.func, "actions", {}).get(method.lower(), method.lower())
+    return getattr(getattr(view_class, handler_name, None), "query_budget", None)
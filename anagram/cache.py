@@ -0,0 +1,388 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from anagram.metrics import coalesced_requests_total
+from anagram.routers import primary_reads
+
+DATASET_VERSION_KEY = "anagram:dataset-version"
+
+
+def _cache():
+    return caches[settings.ANAGRAM_CACHE_ALIAS]
+
+
+def dataset_version() -> int:
+    """Current version of the `Word` table, changed by every write. Costs a single cache read."""
+    version = _cache().get(DATASET_VERSION_KEY)
+    if version is None:
+        # Start from the clock rather than 1, so a version key that got evicted can never reuse an older version.
+        _cache().add(DATASET_VERSION_KEY, time.time_ns(), timeout=None)
+        version = _cache().get(DATASET_VERSION_KEY)
+    return version
+
+
+async def adataset_version() -> int:
+    """Async version of `dataset_version`."""
+    version = await _cache().aget(DATASET_VERSION_KEY)
+    if version is None:
+        await _cache().aadd(DATASET_VERSION_KEY, time.time_ns(), timeout=None)
+        version = await _cache().aget(DATASET_VERSION_KEY)
+    return version
+
+
+def request_dataset_version(request) -> int:
+    """Dataset version as seen by a request, read once and shared by the decorators below."""
+    if not hasattr(request, "_anagram_dataset_version"):
+        request._anagram_dataset_version = dataset_version()
+    return request._anagram_dataset_version
+
+
+async def arequest_dataset_version(request) -> int:
+    """Async version of `request_dataset_version`."""
+    if not hasattr(request, "_anagram_dataset_version"):
+        request._anagram_dataset_version = await adataset_version()
+    return request._anagram_dataset_version
+
+
+def request_media_type(request) -> str:
+    """Media type the response to a request is rendered as: negotiated by DRF from the `Accept` header, always JSON for
+    the async views (which don't negotiate)."""
+    return getattr(request, "accepted_media_type", None) or "application/json"
+
+
+def _request_hash(request) -> str:
+    """Hash of the full request URL and the media type of its response, which responses are cached by."""
+    return hashlib.sha1(f"{request_media_type(request)} {request.build_absolute_uri()}".encode()).hexdigest()
+
+
+def bump_dataset_version() -> int:
+    """Mark every cached response as stale and return the new version. Call it once the write is committed, e.g. with
+    `transaction.on_commit`."""
+    try:
+        return _cache().incr(DATASET_VERSION_KEY)
+    except ValueError:
+        # The key is missing (never read or evicted), a fresh version is just as good as a bumped one.
+        return dataset_version()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+
+class ResponseCache:
+    """Cache of read endpoint responses, keyed by the dataset version, the endpoint, the full request URL and the media
+    type the response is rendered as.
+
+    Entries are never invalidated one by one: a write bumps the dataset version, so later requests build new keys and
+    the old entries are left to the cache's own eviction (`TIMEOUT` and `MAX_ENTRIES` of the cache alias). Hit and
+    miss counters are kept per process.
+    """
+
+    def __init__(self):
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(hits=self._stats.hits, misses=self._stats.misses)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = CacheStats()
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self._stats.hits += 1
+            else:
+                self._stats.misses += 1
+
+    @staticmethod
+    def make_key(name: str, request) -> str:
+        return f"anagram:response:{request_dataset_version(request)}:{name}:{_request_hash(request)}"
+
+    def __call__(self, view_method):
+        """Decorate a read-only view action so its successful responses are cached.
+
+        Async view methods (see `anagram/async_views.py`) return rendered responses, so their content (and content
+        type) is cached instead of the response data.
+        """
+        name = view_method.__qualname__
+
+        if inspect.iscoroutinefunction(view_method):
+
+            @functools.wraps(view_method)
+            async def async_wrapper(view, request, *args, **kwargs):
+                if not settings.ANAGRAM_CACHE_ENABLED:
+                    return await view_method(view, request, *args, **kwargs)
+                await arequest_dataset_version(request)
+                key = self.make_key(name, request)
+                cached = await _cache().aget(key)
+                if cached is not None:
+                    self._count(hit=True)
+                    content_type, content = cached
+                    return HttpResponse(content, content_type=content_type)
+                self._count(hit=False)
+                # Read from `default`, a lagging replica's response would be cached under the new version.
+                with primary_reads():
+                    response = await view_method(view, request, *args, **kwargs)
+                if response.status_code == status.HTTP_200_OK:
+                    await _cache().aset(key, (response["Content-Type"], response.content))
+                return response
+
+            return async_wrapper
+
+        @functools.wraps(view_method)
+        def wrapper(view, request, *args, **kwargs):
+            if not settings.ANAGRAM_CACHE_ENABLED:
+                return view_method(view, request, *args, **kwargs)
+            key = self.make_key(name, request)
+            data = _cache().get(key)
+            if data is not None:
+                self._count(hit=True)
+                return Response(data, status=status.HTTP_200_OK)
+            self._count(hit=False)
+            # Read from `default`, a lagging replica's response would be cached under the new version.
+            with primary_reads():
+                response = view_method(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                _cache().set(key, response.data)
+            return response
+
+        return wrapper
+
+
+cached_response = ResponseCache()
+
+
+@dataclass
+class Flight:
+    """A view running in this process for an identical request, which other requests wait for."""
+
+    done: threading.Event = field(default_factory=threading.Event)
+    # Response data of the leader, if it succeeded.
+    data: Any = None
+
+
+class SingleFlight:
+    """Run identical concurrent requests to an expensive read endpoint once, and share the response.
+
+    Requests are identical when they have the same endpoint, full URL, response media type and dataset version, like
+    the response cache keys. The first one leads and runs the view; the others wait for its response instead of
+    running the same query. In a process they wait for the leader's `Flight` (threads) or future (coroutines). Across
+    processes the leader holds a lock in the cache and publishes its response there under a token of its own, which
+    the other processes poll for. A request that doesn't get a response (the leader failed, or took longer than
+    `ANAGRAM_COALESCE_TIMEOUT`) runs the view itself.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[str, Flight] = {}
+        self._async_flights: dict[tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+
+    @staticmethod
+    def make_key(name: str, request) -> str:
+        return f"anagram:flight:{request_dataset_version(request)}:{name}:{_request_hash(request)}"
+
+    def _lead(self, key: str, run_view):
+        """Run the view holding the cache lock, or wait for the process that holds it."""
+        lock_key, token = f"{key}:lock", uuid.uuid4().hex
+        if _cache().add(lock_key, token, timeout=settings.ANAGRAM_COALESCE_TIMEOUT):
+            try:
+                response = run_view()
+                if response.status_code == status.HTTP_200_OK:
+                    _cache().set(f"{key}:{token}", response.data, timeout=settings.ANAGRAM_COALESCE_TIMEOUT)
+                return response
+            finally:
+                if _cache().get(lock_key) == token:
+                    _cache().delete(lock_key)
+
+        leader = _cache().get(lock_key)
+        deadline = time.monotonic() + settings.ANAGRAM_COALESCE_TIMEOUT
+        while leader is not None and time.monotonic() < deadline:
+            time.sleep(settings.ANAGRAM_COALESCE_POLL_INTERVAL)
+            data = _cache().get(f"{key}:{leader}")
+            if data is not None:
+                coalesced_requests_total.inc(source="cache")
+                return Response(data, status=status.HTTP_200_OK)
+            if _cache().get(lock_key) != leader:
+                # The leader finished without a response to share.
+                break
+        return run_view()
+
+    async def _alead(self, key: str, run_view):
+        """Async `_lead`, sharing the content type and rendered content of the response."""
+        lock_key, token = f"{key}:lock", uuid.uuid4().hex
+        if await _cache().aadd(lock_key, token, timeout=settings.ANAGRAM_COALESCE_TIMEOUT):
+            try:
+                response = await run_view()
+                if response.status_code == status.HTTP_200_OK:
+                    await _cache().aset(
+                        f"{key}:{token}",
+                        (response["Content-Type"], response.content),
+                        timeout=settings.ANAGRAM_COALESCE_TIMEOUT,
+                    )
+                return response
+            finally:
+                if await _cache().aget(lock_key) == token:
+                    await _cache().adelete(lock_key)
+
+        leader = await _cache().aget(lock_key)
+        deadline = time.monotonic() + settings.ANAGRAM_COALESCE_TIMEOUT
+        while leader is not None and time.monotonic() < deadline:
+            await asyncio.sleep(settings.ANAGRAM_COALESCE_POLL_INTERVAL)
+            shared = await _cache().aget(f"{key}:{leader}")
+            if shared is not None:
+                coalesced_requests_total.inc(source="cache")
+                content_type, content = shared
+                return HttpResponse(content, content_type=content_type)
+            if await _cache().aget(lock_key) != leader:
+                break
+        return await run_view()
+
+    def __call__(self, view_method):
+        """Decorate a read-only view action so identical concurrent requests run it once."""
+        name = view_method.__qualname__
+
+        if inspect.iscoroutinefunction(view_method):
+
+            @functools.wraps(view_method)
+            async def async_wrapper(view, request, *args, **kwargs):
+                if not settings.ANAGRAM_COALESCE_ENABLED:
+                    return await view_method(view, request, *args, **kwargs)
+                await arequest_dataset_version(request)
+                key = self.make_key(name, request)
+                flight_key = (asyncio.get_running_loop(), key)
+                with self._lock:
+                    future = self._async_flights.get(flight_key)
+                    leading = future is None
+                    if leading:
+                        future = self._async_flights[flight_key] = flight_key[0].create_future()
+                if not leading:
+                    try:
+                        # Shielded, so a waiter that is cancelled doesn't cancel the flight for everyone else.
+                        shared = await asyncio.wait_for(asyncio.shield(future), settings.ANAGRAM_COALESCE_TIMEOUT)
+                    except TimeoutError:
+                        shared = None
+                    if shared is not None:
+                        coalesced_requests_total.inc(source="process")
+                        content_type, content = shared
+                        return HttpResponse(content, content_type=content_type)
+                    return await view_method(view, request, *args, **kwargs)
+
+                shared = None
+                try:
+                    response = await self._alead(key, lambda: view_method(view, request, *args, **kwargs))
+                    if response.status_code == status.HTTP_200_OK:
+                        shared = (response["Content-Type"], response.content)
+                    return response
+                finally:
+                    with self._lock:
+                        del self._async_flights[flight_key]
+                    future.set_result(shared)
+
+            return async_wrapper
+
+        @functools.wraps(view_method)
+        def wrapper(view, request, *args, **kwargs):
+            if not settings.ANAGRAM_COALESCE_ENABLED:
+                return view_method(view, request, *args, **kwargs)
+            key = self.make_key(name, request)
+            with self._lock:
+                flight = self._flights.get(key)
+                leading = flight is None
+                if leading:
+                    flight = self._flights[key] = Flight()
+            if not leading:
+                if flight.done.wait(settings.ANAGRAM_COALESCE_TIMEOUT) and flight.data is not None:
+                    coalesced_requests_total.inc(source="process")
+                    return Response(flight.data, status=status.HTTP_200_OK)
+                return view_method(view, request, *args, **kwargs)
+
+            try:
+                response = self._lead(key, lambda: view_method(view, request, *args, **kwargs))
+                if response.status_code == status.HTTP_200_OK:
+                    flight.data = response.data
+                return response
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+
+        return wrapper
+
+
+single_flight = SingleFlight()
+
+
+def conditional_response(view_method):
+    """Decorate a read-only view action with a strong ETag, answering a matching `If-None-Match` with a 304.
+
+    The ETag is derived from the dataset version, the full request URL and the media type the response is rendered as
+    (JSON and MessagePack responses differ, and both vary on `Accept`), so checking it costs one cache read and the
+    view itself only runs when the client's copy is outdated.
+    """
+    name = view_method.__qualname__
+
+    def get_etag(request) -> str:
+        key = f"{request_dataset_version(request)}:{name}:{request_media_type(request)}:{request.build_absolute_uri()}"
+        return quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+    def is_not_modified(request, etag: str) -> bool:
+        if_none_match = request.headers.get("If-None-Match")
+        if not if_none_match:
+            return False
+        # Weak comparison: compressed responses carry the weak form of the ETag (see `anagram/compression.py`).
+        return if_none_match.strip() == "*" or etag in [tag.removeprefix("W/") for tag in parse_etags(if_none_match)]
+
+    if inspect.iscoroutinefunction(view_method):
+
+        @functools.wraps(view_method)
+        async def async_wrapper(view, request, *args, **kwargs):
+            if not settings.ANAGRAM_ETAG_ENABLED:
+                return await view_method(view, request, *args, **kwargs)
+            await arequest_dataset_version(request)
+            etag = get_etag(request)
+            if is_not_modified(request, etag):
+                return HttpResponseNotModified(headers={"ETag": etag})
+            # Read from `default`, like `cached_response`: the ETag marks the response as current.
+            with primary_reads():
+                response = await view_method(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response["ETag"] = etag
+            return response
+
+        return async_wrapper
+
+    @functools.wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        if not settings.ANAGRAM_ETAG_ENABLED:
+            return view_method(view, request, *args, **kwargs)
+        etag = get_etag(request)
+        if is_not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        # Read from `default`, like `cached_response`: the ETag marks the response as current.
+        with primary_reads():
+            response = view_method(view, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+        return response
+
+    return wrapper
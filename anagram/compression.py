@@ -0,0 +1,89 @@
+"""Brotli or gzip compression of responses, picked by the request's `Accept-Encoding` header.
+
+Only responses of at least `ANAGRAM_COMPRESSION_MIN_SIZE` bytes are compressed: below that the CPU time isn't worth
+the bytes saved. Streaming responses are left alone, the exports compress themselves (`gzip=true`). Brotli runs at
+`ANAGRAM_BROTLI_QUALITY`, its top qualities are far too slow for responses rendered on every request.
+
+Only API responses (JSON and MessagePack) are compressed. HTML pages (the admin, the browsable API) mix secrets such
+as CSRF tokens with text reflected from the request, and the compressed size of such a page leaks the secret (BREACH).
+"""
+
+import brotli
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+from anagram.renderers import MSGPACK_MEDIA_TYPE
+
+# Supported encodings, preferred first when a client accepts several equally.
+ENCODINGS = ("br", "gzip")
+COMPRESSED_MEDIA_TYPES = ("application/json", MSGPACK_MEDIA_TYPE)
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """The supported encoding the `Accept-Encoding` header prefers, `None` if it accepts none of them."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, parameters = item.partition(";")
+        weight = 1.0
+        for parameter in parameters.split(";"):
+            name, _, value = parameter.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding := coding.strip().lower():
+            weights[coding] = weight
+    default = weights.get("*", 0.0)
+    encoding = max(ENCODINGS, key=lambda coding: weights.get(coding, default))
+    return encoding if weights.get(encoding, default) > 0 else None
+
+
+def compress_response(request, response):
+    """Compress the content of the response in place, if it is an API response big enough and the client accepts an
+    encoding."""
+    if response.streaming or response.has_header("Content-Encoding"):
+        return response
+    if response.get("Content-Type", "").partition(";")[0].strip().lower() not in COMPRESSED_MEDIA_TYPES:
+        return response
+    if len(response.content) < settings.ANAGRAM_COMPRESSION_MIN_SIZE:
+        return response
+    patch_vary_headers(response, ("Accept-Encoding",))
+    encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding is None:
+        return response
+    if encoding == "br":
+        content = brotli.compress(response.content, quality=settings.ANAGRAM_BROTLI_QUALITY)
+    else:
+        content = compress_string(response.content)
+    if len(content) >= len(response.content):
+        return response
+    response.content = content
+    response["Content-Length"] = str(len(content))
+    response["Content-Encoding"] = encoding
+    # A strong ETag promises the exact bytes, and these are not the bytes of the uncompressed response.
+    if (etag := response.get("ETag")) and etag.startswith('"'):
+        response["ETag"] = f"W/{etag}"
+    return response
+
+
+class CompressionMiddleware:
+    """Compress responses with `compress_response`."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return compress_response(request, await self.get_response(request))
@@ -0,0 +1,92 @@
+"""Streaming exports of the words and the anagram groups as NDJSON or CSV.
+
+Rows come from a server-side cursor (`.iterator(chunk_size=...)`) and are rendered a chunk at a time, so memory stays
+flat however big the tables are. The same generators back the export endpoints and the `export_dictionary` command.
+"""
+
+import csv
+import io
+import itertools
+import zlib
+from collections.abc import Iterable, Iterator
+from operator import itemgetter
+
+import orjson
+from django.http import StreamingHttpResponse
+
+from anagram.helpers import chunked
+from anagram.models import Word
+
+NDJSON = "ndjson"
+CSV = "csv"
+EXPORT_FORMATS = [NDJSON, CSV]
+CONTENT_TYPES = {NDJSON: "application/x-ndjson", CSV: "text/csv"}
+
+WORD_FIELDS = ["word", "length", "is_proper_noun"]
+GROUP_FIELDS = ["signature", "count", "words"]
+
+# Rows fetched per round trip and rendered per yielded piece of output.
+CHUNK_SIZE = 2000
+
+
+def _render(rows: Iterable[tuple], fields: list[str], export_format: str) -> Iterator[str]:
+    """Render rows as NDJSON objects or CSV lines (with a header), a chunk of rows per yielded string."""
+    if export_format == CSV:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for chunk in itertools.chain([[fields]], chunked(rows, CHUNK_SIZE)):
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    else:
+        for chunk in chunked(rows, CHUNK_SIZE):
+            yield b"".join(orjson.dumps(dict(zip(fields, row, strict=True))) + b"\n" for row in chunk).decode()
+
+
+def export_words(export_format: str) -> Iterator[str]:
+    """All words in `id` order."""
+    rows = Word.objects.order_by("id").values_list(*WORD_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+    return _render(rows, WORD_FIELDS, export_format)
+
+
+def export_groups(export_format: str, min_group_size: int = 1) -> Iterator[str]:
+    """Anagram groups of at least `min_group_size` words in signature order, with their words in `id` order.
+
+    Words are read in `(sorted_lowercase_word, id)` order, straight from the signature index, and grouped on the fly.
+    In CSV the words of a group are separated by spaces.
+    """
+    words = Word.objects.order_by("sorted_lowercase_word", "id")
+    if min_group_size > 1:
+        words = words.filter(group__count__gte=min_group_size)
+    rows = words.values_list("sorted_lowercase_word", "word").iterator(chunk_size=CHUNK_SIZE)
+    groups = (
+        (signature, [word for _, word in group_rows])
+        for signature, group_rows in itertools.groupby(rows, key=itemgetter(0))
+    )
+    if export_format == CSV:
+        records = ((signature, len(words), " ".join(words)) for signature, words in groups)
+    else:
+        records = ((signature, len(words), words) for signature, words in groups)
+    return _render(records, GROUP_FIELDS, export_format)
+
+
+def gzip_stream(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Gzip a stream of strings on the fly, yielding compressed bytes as the compressor produces them."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if data := compressor.compress(chunk.encode()):
+            yield data
+    yield compressor.flush()
+
+
+def export_response(chunks: Iterator[str], name: str, export_format: str, use_gzip: bool) -> StreamingHttpResponse:
+    """Stream an export as a file download named `<name>.<format>`, or `<name>.<format>.gz` when gzipped."""
+    filename = f"{name}.{export_format}"
+    if use_gzip:
+        response = StreamingHttpResponse(gzip_stream(chunks), content_type="application/gzip")
+        filename += ".gz"
+    else:
+        response = StreamingHttpResponse(chunks, content_type=f"{CONTENT_TYPES[export_format]}; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,227 @@
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from django.db import connection
+from django.db.models import Count, Exists, F, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Length
+
+from anagram.models import AnagramGroup, AnagramGroupDeletion, Word
+
+
+def _change_counts(deltas: dict[int, int]) -> None:
+    """Apply count deltas (group id -> delta) with one UPDATE per distinct delta value, then drop empty groups."""
+    ids_by_delta = defaultdict(list)
+    for group_id, delta in deltas.items():
+        if delta:
+            ids_by_delta[delta].append(group_id)
+    for delta, group_ids in ids_by_delta.items():
+        AnagramGroup.objects.filter(pk__in=group_ids).update(count=F("count") + delta)
+    if any(delta < 0 for delta in ids_by_delta):
+        delete_groups(AnagramGroup.objects.filter(pk__in=list(deltas), count__lte=0))
+
+
+def deletion_signatures(signature: str) -> set[str]:
+    """Signatures one letter shorter than the given one."""
+    return {signature[:position] + signature[position + 1 :] for position in range(len(signature))}
+
+
+def add_deletions(groups: Iterable[tuple[int, str]]) -> None:
+    """Store the deletion signatures of new groups, passing `(id, signature)` pairs.
+
+    On Postgres the pairs are sent as two arrays and the deletions are derived by `insert_deletions_sql`, one statement
+    however many groups there are; other backends get a `bulk_create` of every deletion.
+    """
+    if connection.vendor == "postgresql":
+        groups = list(groups)
+        if groups:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    insert_deletions_sql(
+                        "(SELECT * FROM UNNEST(%s::bigint[], %s::text[]) AS new_groups (id, signature))"
+                    ),
+                    [[group_id for group_id, _ in groups], [signature for _, signature in groups]],
+                )
+        return
+    AnagramGroupDeletion.objects.bulk_create(
+        (
+            AnagramGroupDeletion(group_id=group_id, deletion=deletion)
+            for group_id, signature in groups
+            for deletion in deletion_signatures(signature)
+        ),
+        batch_size=5000,
+        ignore_conflicts=True,
+    )
+
+
+def insert_deletions_sql(groups: str, skip_conflicts: bool = True) -> str:
+    """Postgres statement storing the deletion signatures of the groups in `groups`, a table, CTE or subquery with
+    `id` and `signature` columns. Same as `add_deletions`, without sending every row through Python.
+
+    Signatures are sorted, so deleting any of a run of the same letter gives the same deletion: only the first letter
+    of every run is deleted, instead of deduplicating all of them afterwards. `skip_conflicts=False` leaves out the
+    `ON CONFLICT DO NOTHING`, which doubles the cost of the statement, for groups that can't have any deletions yet.
+    """
+    quote_name = connection.ops.quote_name
+    table = quote_name(AnagramGroupDeletion._meta.db_table)
+    group_id = quote_name(AnagramGroupDeletion._meta.get_field("group").column)
+    return (
+        f"INSERT INTO {table} ({group_id}, deletion) "
+        f"SELECT groups.id, OVERLAY(groups.signature PLACING '' FROM position FOR 1) "
+        f"FROM {groups} groups, GENERATE_SERIES(1, LENGTH(groups.signature)) position "
+        f"WHERE position = 1 "
+        f"OR SUBSTRING(groups.signature FROM position FOR 1) <> SUBSTRING(groups.signature FROM position - 1 FOR 1)"
+        + (" ON CONFLICT DO NOTHING" if skip_conflicts else "")
+    )
+
+
+def groups_without_deletions() -> QuerySet:
+    """Groups whose deletion signatures aren't stored (yet)."""
+    # NOT EXISTS rather than NOT IN: Postgres can run it as an anti join, NOT IN over millions of deletion rows that
+    # don't fit in `work_mem` ends up rescanning them for every group.
+    return AnagramGroup.objects.filter(length__gt=0).exclude(
+        Exists(AnagramGroupDeletion.objects.filter(group=OuterRef("pk")))
+    )
+
+
+def add_missing_deletions() -> int:
+    """Store the deletion signatures of all groups that have none, for loaders that skip them while inserting groups.
+    Returns the number of deletions stored.
+
+    On Postgres this is one statement for all groups. When the table is empty (a first or `--truncate` load), its
+    indexes are dropped first and built again afterwards, which is several times faster than updating them for each
+    of the millions of rows. Meanwhile the table is locked, so callers must run this in the same transaction as the
+    load.
+    """
+    groups = groups_without_deletions().order_by().values("id", "signature")
+    if connection.vendor != "postgresql":
+        deletions_before = AnagramGroupDeletion.objects.count()
+        add_deletions(groups.values_list("id", "signature").iterator())
+        return AnagramGroupDeletion.objects.count() - deletions_before
+
+    select_sql, params = groups.query.sql_with_params()
+    meta = AnagramGroupDeletion._meta
+    rebuild_indexes = not AnagramGroupDeletion.objects.exists()
+    if rebuild_indexes:
+        with connection.schema_editor() as schema_editor:
+            for constraint in meta.constraints:
+                schema_editor.remove_constraint(AnagramGroupDeletion, constraint)
+            for index in meta.indexes:
+                schema_editor.remove_index(AnagramGroupDeletion, index)
+    with connection.cursor() as cursor:
+        cursor.execute(insert_deletions_sql(f"({select_sql})", skip_conflicts=False), params)
+        stored = cursor.rowcount
+    if rebuild_indexes:
+        with connection.schema_editor() as schema_editor:
+            for constraint in meta.constraints:
+                schema_editor.add_constraint(AnagramGroupDeletion, constraint)
+            for index in meta.indexes:
+                schema_editor.add_index(AnagramGroupDeletion, index)
+    return stored
+
+
+def delete_groups(groups: QuerySet) -> None:
+    """Delete groups together with their deletion signatures."""
+    AnagramGroupDeletion.objects.filter(group__in=groups).delete()
+    groups.delete()
+
+
+def link_groups(words: list[Word], deletions: bool = True) -> None:
+    """Point unsaved words at their anagram groups, creating missing (empty) groups. Counts are left untouched.
+    `deletions=False` skips storing the deletion signatures of the new groups (see `add_missing_deletions`)."""
+    signatures = {word.sorted_lowercase_word for word in words}
+    if not signatures:
+        return
+    AnagramGroup.objects.bulk_create(
+        [AnagramGroup(signature=signature, length=len(signature)) for signature in signatures],
+        ignore_conflicts=True,
+    )
+    group_ids = {}
+    new_groups = []
+    for signature, group_id, count in AnagramGroup.objects.filter(signature__in=signatures).values_list(
+        "signature", "id", "count"
+    ):
+        group_ids[signature] = group_id
+        # Groups are only ever empty between being created here and their words being inserted.
+        if not count:
+            new_groups.append((group_id, signature))
+    if deletions:
+        add_deletions(new_groups)
+    for word in words:
+        word.group_id = group_ids[word.sorted_lowercase_word]
+
+
+def grow_groups(group_ids: Iterable[int]) -> None:
+    """Grow groups after words were inserted, passing the `group_id` of every inserted word."""
+    _change_counts(Counter(group_ids))
+
+
+def release_groups(group_ids: Iterable[int | None]) -> None:
+    """Shrink groups after their words were deleted, passing the `group_id` of every deleted word."""
+    counts = Counter(group_id for group_id in group_ids if group_id is not None)
+    _change_counts({group_id: -count for group_id, count in counts.items()})
+
+
+def rebuild_groups() -> int:
+    """Recreate all anagram groups (and their deletion signatures) from the `Word` table and relink every word.
+    Returns the number of groups.
+
+    Runs as a handful of set based statements; foreign keys are only checked at commit, so callers must wrap this in
+    a transaction.
+    """
+    group_rows = (
+        Word.objects.order_by()
+        .values("sorted_lowercase_word")
+        .annotate(count=Count("id"), length=Length("sorted_lowercase_word"))
+        .values_list("sorted_lowercase_word", "count", "length")
+    )
+    select_sql, params = group_rows.query.sql_with_params()
+    quote_name = connection.ops.quote_name
+    table = quote_name(AnagramGroup._meta.db_table)
+    columns = ", ".join(
+        quote_name(AnagramGroup._meta.get_field(name).column) for name in ("signature", "count", "length")
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {quote_name(AnagramGroupDeletion._meta.db_table)}")
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(f"INSERT INTO {table} ({columns}) {select_sql}", params)
+        created = cursor.rowcount
+    add_missing_deletions()
+    Word.objects.update(
+        group=Subquery(AnagramGroup.objects.filter(signature=OuterRef("sorted_lowercase_word")).values("id")[:1])
+    )
+    return created
+
+
+@dataclass
+class GroupDrift:
+    unlinked_words: int = 0
+    mislinked_words: int = 0
+    wrong_counts: list[tuple[str, int, int]] = field(default_factory=list)
+    groups_without_deletions: int = 0
+
+    def __bool__(self):
+        return bool(self.unlinked_words or self.mislinked_words or self.wrong_counts or self.groups_without_deletions)
+
+
+def check_groups() -> GroupDrift:
+    """Compare the anagram groups with what the `Word` table says they should be."""
+    drift = GroupDrift()
+    drift.unlinked_words = Word.objects.filter(group__isnull=True).count()
+    drift.mislinked_words = (
+        Word.objects.exclude(group__isnull=True).exclude(group__signature=F("sorted_lowercase_word")).count()
+    )
+
+    actual_counts = dict(
+        Word.objects.order_by()
+        .values_list("sorted_lowercase_word")
+        .annotate(count=Count("id"))
+        .values_list("sorted_lowercase_word", "count")
+    )
+    for signature, stored_count in AnagramGroup.objects.values_list("signature", "count").iterator():
+        actual_count = actual_counts.pop(signature, 0)
+        if actual_count != stored_count:
+            drift.wrong_counts.append((signature, stored_count, actual_count))
+    drift.wrong_counts.extend((signature, 0, actual_count) for signature, actual_count in actual_counts.items())
+    drift.groups_without_deletions = groups_without_deletions().count()
+    return drift
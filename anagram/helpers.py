@@ -1,3 +1,6 @@
+from collections.abc import Iterable, Iterator
+from itertools import islice
+
 from django.forms import NullBooleanField
 
 
@@ -6,12 +9,28 @@ def to_python_bool(value: str | bool | None) -> bool:
     return NullBooleanField().to_python(value)
 
 
-def calculate_median(lengths: list[int]) -> float | None:
-    if not lengths:
+def calculate_median(value_counts: list[tuple[int, int]]) -> float | None:
+    """Calculate the median from `(value, count)` pairs sorted by value, e.g. a histogram of word lengths."""
+    total = sum(count for _, count in value_counts)
+    if not total:
         return None
 
-    count = len(lengths)
-    if count % 2 == 1:
-        return lengths[count // 2]
+    def value_at(position: int) -> int:
+        seen = 0
+        for value, count in value_counts:
+            seen += count
+            if position < seen:
+                return value
+        raise IndexError(position)
+
+    if total % 2 == 1:
+        return value_at(total // 2)
     else:
-        return (lengths[count // 2 - 1] + lengths[count // 2]) / 2
+        return (value_at(total // 2 - 1) + value_at(total // 2)) / 2
+
+
+def chunked[T](iterable: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Split an iterable into lists of at most `size` items, without materializing the whole iterable."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
@@ -0,0 +1,228 @@
+import functools
+import logging
+import operator
+import threading
+from bisect import bisect_left
+from collections.abc import Iterable
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+
+from anagram.cache import dataset_version
+from anagram.helpers import chunked
+from anagram.models import Word
+from anagram.routers import primary_reads
+from anagram.snapshot import AnagramSnapshot, SnapshotError
+
+logger = logging.getLogger(__name__)
+
+# Words deleted since the snapshot are looked for in ranges of 1024 ids.
+ID_RANGE_BITS = 10
+
+
+class AnagramIndex:
+    """In-process lookup table of anagram groups, keyed by `sorted_lowercase_word` (the word signature).
+
+    Every group is a list of `(id, word, is_proper_noun)` tuples kept in `id` order, so results come out in the same
+    order as `Word.objects.filter(...)` would return them. The index is built lazily on first use and then kept up to
+    date by the write endpoints. Each process holds its own copy, so like `LetterIndex` it remembers the dataset
+    version it was built at and is rebuilt on next use once writes of other processes (workers, jobs, management
+    commands) moved the version on. This process' own writes move it to their version with `follow_write`.
+
+    With `ANAGRAM_SNAPSHOT_PATH` set, groups are read from the memory-mapped snapshot (see `anagram/snapshot.py`)
+    instead, shared by all processes on the host. `_groups` then only holds the groups that changed since the snapshot
+    was written: read from the database at build, and copied from the snapshot on their first change by a write.
+    """
+
+    def __init__(self):
+        self._groups: dict[str, list[tuple[int, str, bool]]] = {}
+        self._snapshot: AnagramSnapshot | None = None
+        self._lock = threading.RLock()
+        self._version: int | None = None
+        self._is_built = False
+
+    @property
+    def is_built(self) -> bool:
+        return self._is_built
+
+    def build(self, version: int | None = None) -> None:
+        """(Re)load the whole index as of the given dataset version (the current one by default), from the snapshot and
+        the words changed since it was written when there is a snapshot, otherwise from the database."""
+        # Reads go to `default` even in a read-only view: a lagging replica may not have reached that version yet.
+        with self._lock, primary_reads():
+            # Read before the words, so a write committed meanwhile bumps the version again rather than getting lost.
+            self._version = dataset_version() if version is None else version
+            # The file is reopened on every build, so a refreshed snapshot is picked up by the next build after it was
+            # written. A replaced snapshot is unmapped once no lookup is reading it any more.
+            snapshot = self._open_snapshot()
+            changed_groups = self._changes_since(snapshot) if snapshot is not None else None
+            if changed_groups is not None:
+                self._snapshot, self._groups = snapshot, changed_groups
+                self._is_built = True
+                return
+            self._snapshot = None
+            groups: dict[str, list[tuple[int, str, bool]]] = {}
+            rows = Word.objects.order_by("id").values_list("id", "sorted_lowercase_word", "word", "is_proper_noun")
+            for pk, signature, word, is_proper_noun in rows.iterator(chunk_size=10_000):
+                groups.setdefault(signature, []).append((pk, word, is_proper_noun))
+            self._groups = groups
+            self._is_built = True
+
+    @staticmethod
+    def _open_snapshot() -> AnagramSnapshot | None:
+        path = settings.ANAGRAM_SNAPSHOT_PATH
+        if not path:
+            return None
+        try:
+            return AnagramSnapshot(path)
+        except (OSError, SnapshotError) as exc:
+            logger.warning("Loading the anagram index from the database, the snapshot can't be used: %s", exc)
+            return None
+
+    @staticmethod
+    def _changes_since(snapshot: AnagramSnapshot) -> dict[str, list[tuple[int, str, bool]]] | None:
+        """The groups that changed since the snapshot was written, read from the database, or `None` when none of the
+        snapshot's words are left.
+
+        A single aggregate query tells whether words were added (ids above the snapshot's highest one) or deleted
+        (fewer words up to that id than in the snapshot). Only then are the signatures of those words collected, and
+        their groups loaded. Deleted words are found by counting the words per range of `2 ** ID_RANGE_BITS` ids, in
+        the database and in the snapshot, and only reading the ids of the ranges that lost words.
+        """
+        words, max_word_id = snapshot.fingerprint
+        stats = Word.objects.aggregate(
+            kept=Count("id", filter=Q(id__lte=max_word_id)), added=Count("id", filter=Q(id__gt=max_word_id))
+        )
+        if words and not stats["kept"]:
+            return None
+        signatures = set()
+        if stats["added"]:
+            added = Word.objects.filter(id__gt=max_word_id).values_list("sorted_lowercase_word", flat=True)
+            signatures.update(added.iterator(chunk_size=10_000))
+        if stats["kept"] != words:
+            id_range = F("id").bitrightshift(ID_RANGE_BITS)
+            kept = Word.objects.filter(id__lte=max_word_id)
+            kept_per_range = dict(
+                kept.values(id_range=id_range).annotate(words=Count("id")).values_list("id_range", "words")
+            )
+            changed = [
+                id_range
+                for id_range, count in snapshot.words_per_id_range(ID_RANGE_BITS).items()
+                if kept_per_range.get(id_range) != count
+            ]
+            if changed:
+                in_changed_ranges = functools.reduce(
+                    operator.or_,
+                    (
+                        Q(id__gte=id_range << ID_RANGE_BITS, id__lt=(id_range + 1) << ID_RANGE_BITS)
+                        for id_range in changed
+                    ),
+                )
+                deleted = snapshot.ids_in_ranges(changed, ID_RANGE_BITS)
+                deleted -= set(kept.filter(in_changed_ranges).values_list("id", flat=True))
+                signatures |= snapshot.signatures_of(deleted)
+        if signatures:
+            logger.info("Reading %d anagram groups changed since the snapshot from the database.", len(signatures))
+        # Every changed group is stored, even when empty, to hide the snapshot's.
+        groups: dict[str, list[tuple[int, str, bool]]] = {signature: [] for signature in signatures}
+        for chunk in chunked(sorted(signatures), 10_000):
+            rows = (
+                Word.objects.filter(sorted_lowercase_word__in=chunk)
+                .order_by("id")
+                .values_list("id", "sorted_lowercase_word", "word", "is_proper_noun")
+            )
+            for pk, signature, word, is_proper_noun in rows.iterator(chunk_size=10_000):
+                groups[signature].append((pk, word, is_proper_noun))
+        return groups
+
+    def _group(self, signature: str) -> list[tuple[int, str, bool]]:
+        group = self._groups.get(signature)
+        if group is None and (snapshot := self._snapshot) is not None:
+            return snapshot.get_group(signature)
+        return group or []
+
+    def _own_group(self, signature: str) -> list[tuple[int, str, bool]]:
+        """The group to change in place, copied from the snapshot first if needed."""
+        if (group := self._groups.get(signature)) is None:
+            group = self._groups[signature] = self._snapshot.get_group(signature) if self._snapshot else []
+        return group
+
+    def ensure_built(self) -> None:
+        """Build the index if it isn't built yet or misses writes of other processes. Costs a single cache read."""
+        version = dataset_version()
+        if not self._is_built or self._version != version:
+            with self._lock:
+                if not self._is_built or self._version != version:
+                    self.build(version)
+
+    def follow_write(self, version: int) -> None:
+        """Move the index to the dataset version returned by `bump_dataset_version`, see `LetterIndex.follow_write`."""
+        with self._lock:
+            if self._version is not None and version == self._version + 1:
+                self._version = version
+
+    def reset(self) -> None:
+        """Drop the index, it will be rebuilt from the database on next use."""
+        with self._lock:
+            self._groups = {}
+            self._snapshot = None
+            self._version = None
+            self._is_built = False
+
+    def get_anagrams(self, word: str, limit: int | None = None, exclude_proper_nouns: bool = False) -> list[str]:
+        """Return anagrams of a word, mirroring the database query used by `AnagramViewSet.get_anagrams_for_word`."""
+        self.ensure_built()
+        return self._get_anagrams(word, limit, exclude_proper_nouns)
+
+    def get_anagrams_for_words(
+        self, words: list[str], limit: int | None = None, exclude_proper_nouns: bool = False
+    ) -> list[list[str]]:
+        """`get_anagrams` of every word, checking the index is up to date once for all of them."""
+        self.ensure_built()
+        return [self._get_anagrams(word, limit, exclude_proper_nouns) for word in words]
+
+    def _get_anagrams(self, word: str, limit: int | None, exclude_proper_nouns: bool) -> list[str]:
+        signature = "".join(sorted(word.lower()))
+        anagrams = [
+            group_word
+            for _, group_word, is_proper_noun in self._group(signature)
+            if group_word != word and not (exclude_proper_nouns and is_proper_noun)
+        ]
+        return anagrams[:limit] if limit is not None else anagrams
+
+    def add_words(self, words: Iterable[Word]) -> None:
+        """Add freshly created words. Ignored until the index is built, as the build will pick them up anyway."""
+        with self._lock:
+            if not self._is_built:
+                return
+            for word in words:
+                group = self._own_group(word.sorted_lowercase_word)
+                entry = (word.pk, word.word, word.is_proper_noun)
+                position = bisect_left(group, entry)
+                if position == len(group) or group[position][0] != word.pk:
+                    group.insert(position, entry)
+
+    def remove_word(self, signature: str, pk: int) -> None:
+        with self._lock:
+            group = self._own_group(signature)
+            group[:] = [entry for entry in group if entry[0] != pk]
+            # An empty group has to stay to hide the snapshot's.
+            if not group and self._snapshot is None:
+                del self._groups[signature]
+
+    def remove_signature(self, signature: str) -> None:
+        with self._lock:
+            if self._snapshot is None:
+                self._groups.pop(signature, None)
+            else:
+                self._groups[signature] = []
+
+    def clear(self) -> None:
+        """Empty the index after all words were deleted. Unlike `reset`, the index stays built."""
+        with self._lock:
+            self._groups = {}
+            self._snapshot = None
+            self._is_built = True
+
+
+anagram_index = AnagramIndex()
@@ -0,0 +1,482 @@
+import csv
+import gzip
+import io
+import zlib
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction
+
+from anagram.cache import bump_dataset_version
+from anagram.groups import delete_groups, grow_groups, insert_deletions_sql, link_groups
+from anagram.helpers import chunked
+from anagram.index import anagram_index
+from anagram.letters import letter_index
+from anagram.metrics import words_ingested_total
+from anagram.models import AnagramGroup, AnagramGroupDeletion, Word
+
+INSERT_BATCH_SIZE = 5000
+INSERT_FIELDS = ["word", "sorted_word", "sorted_lowercase_word", "is_proper_noun", "length", "group"]
+
+MAX_WORD_LENGTH = Word._meta.get_field("word").max_length
+# Longest line of a valid word: every character taking 4 bytes in UTF-8, followed by "\r\n".
+MAX_LINE_BYTES = 4 * MAX_WORD_LENGTH + 2
+GZIP_MAGIC = b"\x1f\x8b"
+# Rejected lines listed in an import summary, the rest are only counted.
+MAX_REPORTED_ERRORS = 10
+
+
+@dataclass
+class IngestResult:
+    created: list[Word] = field(default_factory=list)
+    skipped: int = 0
+
+    @property
+    def inserted(self) -> int:
+        return len(self.created)
+
+
+@dataclass
+class ImportSummary:
+    lines: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    # `{"line": <line number>, "error": <reason>}` for the first `MAX_REPORTED_ERRORS` rejected lines.
+    errors: list[dict] = field(default_factory=list)
+
+    def reject(self, line: int, error: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+
+def bump_indexed_dataset_version() -> None:
+    """Bump the dataset version after a write committed, moving the in-process indexes to the new version, and queue a
+    refresh of the anagram snapshot. Register it with `transaction.on_commit` after the callbacks that apply the write
+    to the indexes."""
+    # `anagram.tasks` imports this module.
+    from anagram.tasks import schedule_snapshot_refresh
+
+    version = bump_dataset_version()
+    anagram_index.follow_write(version)
+    letter_index.follow_write(version)
+    schedule_snapshot_refresh()
+
+
+def on_words_created(created_words: list[Word]) -> None:
+    """Once the current transaction commits, add the words to the in-process indexes and bump the dataset version."""
+    words_ingested_total.inc(len(created_words))
+    transaction.on_commit(lambda: anagram_index.add_words(created_words))
+    transaction.on_commit(lambda: letter_index.add_words(created_words))
+    transaction.on_commit(bump_indexed_dataset_version)
+
+
+def on_words_deleted(deleted_words: list[tuple[int, str]]) -> None:
+    """Once the current transaction commits, remove the words, passed as `(id, sorted_lowercase_word)` pairs, from the
+    in-process indexes and bump the dataset version."""
+
+    def remove_words():
+        for pk, signature in deleted_words:
+            anagram_index.remove_word(signature, pk)
+            letter_index.remove_word(signature, pk)
+
+    transaction.on_commit(remove_words)
+    transaction.on_commit(bump_indexed_dataset_version)
+
+
+def derive_word_fields(word: str) -> dict:
+    """Compute all `Word` model fields for a word."""
+    return {
+        "word": word,
+        "sorted_word": "".join(sorted(word)),
+        "sorted_lowercase_word": "".join(sorted(word.lower())),
+        "is_proper_noun": word.istitle(),
+        "length": len(word),
+    }
+
+
+def build_word(word: str) -> Word:
+    """Build an unsaved `Word` with all the derived fields filled in."""
+    return Word(**derive_word_fields(word))
+
+
+def _insert_fields():
+    return [Word._meta.get_field(name) for name in INSERT_FIELDS]
+
+
+def _quoted_columns() -> str:
+    return ", ".join(connection.ops.quote_name(model_field.column) for model_field in _insert_fields())
+
+
+def insert_words(words: list[Word]) -> list[Word]:
+    """Insert unsaved words with `ON CONFLICT DO NOTHING` and return the ones actually inserted, with ids set.
+
+    Words must be distinct. Conflicts only happen when the optional unique constraint on `Word.word` is in place.
+    Backends without `INSERT ... ON CONFLICT ... RETURNING` get a plain `bulk_create`.
+    """
+    if not words:
+        return []
+    if connection.vendor not in ("postgresql", "sqlite"):
+        return Word.objects.bulk_create(words)
+
+    fields = _insert_fields()
+    table = connection.ops.quote_name(Word._meta.db_table)
+    pk_column = connection.ops.quote_name(Word._meta.pk.column)
+    word_column = connection.ops.quote_name(Word._meta.get_field("word").column)
+    row_placeholders = f"({', '.join(['%s'] * len(fields))})"
+    inserted_ids = {}
+    with connection.cursor() as cursor:
+        for batch in chunked(words, connection.ops.bulk_batch_size(fields, words)):
+            params = [
+                model_field.get_db_prep_save(getattr(word, model_field.attname), connection)
+                for word in batch
+                for model_field in fields
+            ]
+            cursor.execute(
+                f"INSERT INTO {table} ({_quoted_columns()}) VALUES {', '.join([row_placeholders] * len(batch))} "
+                f"ON CONFLICT DO NOTHING RETURNING {pk_column}, {word_column}",
+                params,
+            )
+            inserted_ids.update((word, pk) for pk, word in cursor.fetchall())
+
+    inserted = []
+    for word in words:
+        if word.word in inserted_ids:
+            word.pk = inserted_ids[word.word]
+            word._state.adding = False
+            inserted.append(word)
+    return inserted
+
+
+def bulk_insert_words(words: Iterable[str], batch_size: int = INSERT_BATCH_SIZE) -> IngestResult:
+    """Insert words, skipping duplicates within the batch and already stored words.
+
+    On Postgres all words go through `copy_new_words`, a handful of set based statements however many words there are.
+    Other backends insert them in chunks of `batch_size` multi-row INSERTs, a constant number of queries per chunk
+    (find existing words, link groups, insert the rest, grow groups) instead of two per word.
+    """
+    if connection.vendor == "postgresql":
+        return copy_new_words(words)
+
+    result = IngestResult()
+    seen: set[str] = set()
+    for chunk in chunked(words, batch_size):
+        new_words = []
+        for word in chunk:
+            if word in seen:
+                result.skipped += 1
+                continue
+            seen.add(word)
+            new_words.append(word)
+        existing_words = set(Word.objects.filter(word__in=new_words).values_list("word", flat=True))
+        words_to_create = [build_word(word) for word in new_words if word not in existing_words]
+        link_groups(words_to_create)
+        created = insert_words(words_to_create)
+        grow_groups(word.group_id for word in created)
+        result.skipped += len(new_words) - len(created)
+        result.created.extend(created)
+    return result
+
+
+def _word_columns() -> list[str]:
+    """Quoted columns of the fields set by `derive_word_fields`, in the same order."""
+    return [connection.ops.quote_name(Word._meta.get_field(name).column) for name in derive_word_fields("")]
+
+
+def _copy_to_staging(cursor, words: Iterable[str], batch_size: int = INSERT_BATCH_SIZE) -> tuple[str, int]:
+    """Stream words with their derived fields into a temporary table with `COPY`, `batch_size` words at a time, and
+    return its quoted name and the number of rows copied. Rows keep the order of `words` in a `position` column; the
+    table is emptied first and dropped at commit."""
+    word_fields = [Word._meta.get_field(name) for name in derive_word_fields("")]
+    word_columns = _word_columns()
+    column_definitions = ", ".join(
+        f"{column} {model_field.db_type(connection)}"
+        for column, model_field in zip(word_columns, word_fields, strict=True)
+    )
+    staging_table = connection.ops.quote_name(f"{Word._meta.db_table}_load")
+    cursor.execute(
+        f"CREATE TEMPORARY TABLE IF NOT EXISTS {staging_table} "
+        f"(position bigserial, {column_definitions}) ON COMMIT DROP"
+    )
+    cursor.execute(f"TRUNCATE {staging_table}")
+
+    copied = 0
+    for batch in chunked(words, batch_size):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for word in batch:
+            row = derive_word_fields(word).values()
+            writer.writerow(["t" if value is True else "f" if value is False else value for value in row])
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {staging_table} ({', '.join(word_columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        copied += cursor.rowcount
+    return staging_table, copied
+
+
+def _store_staged_words(cursor, staging_table: str, staged: int, deletions: bool, returning: str) -> list[tuple]:
+    """Store the `staged` words of a staging table and return the `returning` columns of those actually inserted, in
+    staging order.
+
+    A first statement inserts the missing groups with their final count, and their deletion signatures unless
+    `deletions` is false, and grows the existing ones; a second one inserts the words, linked to their groups. So no
+    group is written twice. When a word or group was inserted by another transaction meanwhile, the counts of the
+    groups are taken from their words again.
+    """
+    quote_name = connection.ops.quote_name
+    signature = quote_name(Word._meta.get_field("sorted_lowercase_word").column)
+    length = quote_name(Word._meta.get_field("length").column)
+    group_column = quote_name(Word._meta.get_field("group").column)
+    word_columns = ", ".join(_word_columns())
+    staging_columns = ", ".join(f"staging.{column}" for column in _word_columns())
+    words_table = quote_name(Word._meta.db_table)
+    groups_table = quote_name(AnagramGroup._meta.db_table)
+
+    # The UPDATE doesn't see the groups inserted by the same statement, it only grows the existing ones.
+    insert_deletions = (
+        f", deletions AS ({insert_deletions_sql('new_groups', skip_conflicts=False)}) " if deletions else " "
+    )
+    cursor.execute(
+        f"WITH signatures AS ("
+        f"  SELECT {signature} AS signature, COUNT(*) AS count, MIN({length}) AS length FROM {staging_table} "
+        f"  GROUP BY {signature}"
+        f"), new_groups AS ("
+        f"  INSERT INTO {groups_table} (signature, count, length) "
+        f"  SELECT signature, count, length FROM signatures ORDER BY signature "
+        f"  ON CONFLICT (signature) DO NOTHING RETURNING id, signature"
+        f"), grown AS ("
+        f"  UPDATE {groups_table} SET count = {groups_table}.count + signatures.count FROM signatures "
+        f"  WHERE {groups_table}.signature = signatures.signature RETURNING 1"
+        f"){insert_deletions}"
+        f"SELECT (SELECT COUNT(*) FROM signatures) - (SELECT COUNT(*) FROM new_groups) "
+        f"- (SELECT COUNT(*) FROM grown)"
+    )
+    (missed_groups,) = cursor.fetchone()
+    cursor.execute(
+        f"INSERT INTO {words_table} ({word_columns}, {group_column}) "
+        f"SELECT {staging_columns}, groups.id FROM {staging_table} staging "
+        f"JOIN {groups_table} groups ON groups.signature = staging.{signature} ORDER BY staging.position "
+        f"ON CONFLICT DO NOTHING RETURNING {returning}"
+    )
+    rows = cursor.fetchall()
+    if missed_groups or len(rows) < staged:
+        cursor.execute(
+            f"UPDATE {groups_table} SET count = (SELECT COUNT(*) FROM {words_table} words "
+            f"WHERE words.{group_column} = {groups_table}.id) "
+            f"WHERE signature IN (SELECT {signature} FROM {staging_table})"
+        )
+    return rows
+
+
+def copy_words(words: Iterable[str], deletions: bool = True, batch_size: int = INSERT_BATCH_SIZE) -> int:
+    """Load words as fast as the database allows and return how many were inserted.
+
+    Words are not deduplicated, unless the unique constraint on `Word.word` is in place. On Postgres the words are
+    streamed with `COPY` into a temporary table, `batch_size` at a time, and groups and words are then inserted with
+    set based statements (see `_store_staged_words`); other backends fall back to multi-row INSERTs of `batch_size`
+    words. With `deletions=False` the deletion signatures of new groups are left out, for loaders that store them all
+    at once with `add_missing_deletions` before committing.
+    """
+    if connection.vendor != "postgresql":
+        inserted = 0
+        for batch in chunked(words, batch_size):
+            word_instances = [build_word(word) for word in batch]
+            link_groups(word_instances, deletions=deletions)
+            created = insert_words(word_instances)
+            grow_groups(word.group_id for word in created)
+            inserted += len(created)
+        return inserted
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        staging_table, staged = _copy_to_staging(cursor, words, batch_size)
+        pk_column = connection.ops.quote_name(Word._meta.pk.column)
+        return len(_store_staged_words(cursor, staging_table, staged, deletions, returning=pk_column))
+
+
+def truncate_words() -> int:
+    """Delete all words with their groups and deletion signatures, and return the number of words deleted.
+
+    On Postgres the tables are truncated, which is much faster than deleting every row and leaves no dead rows behind
+    for a load that follows, but locks them until the transaction ends.
+    """
+    if connection.vendor != "postgresql":
+        deleted, _ = Word.objects.all().delete()
+        delete_groups(AnagramGroup.objects.all())
+        return deleted
+    deleted = Word.objects.count()
+    tables = ", ".join(
+        connection.ops.quote_name(model._meta.db_table) for model in (Word, AnagramGroup, AnagramGroupDeletion)
+    )
+    # TRUNCATE isn't allowed while deferred constraint checks of earlier writes are pending, run them now.
+    connection.check_constraints()
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {tables}")
+    return deleted
+
+
+@contextmanager
+def secondary_indexes_dropped(*models):
+    """Drop the non-unique indexes and the foreign keys of the models' tables, and create them again on exit.
+
+    Building an index once over all rows is several times faster than updating it for each of them, and a foreign key
+    added afterwards is checked with a single join. Unique indexes stay, `ON CONFLICT` relies on them. For loads into
+    empty tables on Postgres, in a transaction: the tables are locked until it ends, and when the load fails the
+    rollback brings the indexes back. Other backends keep their indexes.
+    """
+    if connection.vendor != "postgresql":
+        yield
+        return
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conrelid::regclass::text, quote_ident(conname), pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE contype = 'f' AND conrelid = ANY(%s::regclass[])",
+            [tables],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            "SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid) FROM pg_index "
+            "WHERE indrelid = ANY(%s::regclass[]) AND NOT indisunique",
+            [tables],
+        )
+        indexes = cursor.fetchall()
+        # Same as for TRUNCATE, a foreign key can't be dropped while checks of it are pending.
+        connection.check_constraints()
+        for table, name, _ in foreign_keys:
+            cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {name}")
+    yield
+    with connection.cursor() as cursor:
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for table, name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+
+
+def copy_new_words(words: Iterable[str]) -> IngestResult:
+    """`bulk_insert_words` for Postgres, a handful of set based statements however many words there are.
+
+    The words are streamed into a temporary table with `COPY`, where only the first occurrence of every word that
+    isn't stored yet is kept, and then stored by `_store_staged_words`. Returns the inserted words, with ids and groups
+    set.
+    """
+    quote_name = connection.ops.quote_name
+    word = quote_name(Word._meta.get_field("word").column)
+    words_table = quote_name(Word._meta.db_table)
+    returning = ", ".join(
+        [quote_name(Word._meta.pk.column), *_word_columns(), quote_name(Word._meta.get_field("group").column)]
+    )
+    # No savepoint: the temporary table only needs a transaction to live in, callers are usually in one already.
+    with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+        staging_table, staged = _copy_to_staging(cursor, words)
+        cursor.execute(
+            f"DELETE FROM {staging_table} WHERE position IN ("
+            f"  SELECT position FROM ("
+            f"    SELECT position, MIN(position) OVER (PARTITION BY {word}) AS first FROM {staging_table}"
+            f"  ) occurrences WHERE position > first "
+            f"  UNION SELECT staging.position FROM {staging_table} staging "
+            f"  JOIN {words_table} stored ON stored.{word} = staging.{word}"
+            f")"
+        )
+        rows = _store_staged_words(cursor, staging_table, staged - cursor.rowcount, True, returning)
+
+    created = []
+    for pk, *values, group_id in sorted(rows):
+        instance = Word(pk=pk, group_id=group_id, **dict(zip(derive_word_fields(""), values, strict=True)))
+        instance._state.adding = False
+        created.append(instance)
+    return IngestResult(created=created, skipped=staged - len(created))
+
+
+class _RawStream(io.RawIOBase):
+    """Adapt anything with a `read(size)` method (an uploaded file, the request body) to `io.RawIOBase`."""
+
+    def __init__(self, file):
+        self._file = file
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._file.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def read_word_list(file) -> Iterator[tuple[int, str, str | None]]:
+    """Read a word list (one word per line, plain text or gzipped) from a binary file-like object as a stream.
+
+    Yields `(line number, word, error)` for every line, with an empty word for blank lines and the reason in `error`
+    for lines that aren't a valid word. Lines are read with a length limit, so memory use stays bounded even for a
+    file without any line breaks.
+    """
+    reader = io.BufferedReader(_RawStream(file))
+    if reader.peek(len(GZIP_MAGIC)).startswith(GZIP_MAGIC):
+        reader = gzip.GzipFile(fileobj=reader)
+
+    def lines() -> Iterator[tuple[bytes, bool]]:
+        """Lines with a flag telling whether they were cut at the length limit."""
+        while line := reader.readline(MAX_LINE_BYTES):
+            overlong = len(line) == MAX_LINE_BYTES and not line.endswith(b"\n")
+            if overlong:
+                while (rest := reader.readline(MAX_LINE_BYTES)) and not rest.endswith(b"\n"):
+                    pass
+            yield line, overlong
+
+    line_number = 0
+    try:
+        for line_number, (line, overlong) in enumerate(lines(), start=1):
+            if overlong:
+                yield line_number, "", f"Longer than {MAX_WORD_LENGTH} characters."
+                continue
+            try:
+                word = line.decode().strip()
+            except UnicodeDecodeError:
+                yield line_number, "", "Not valid UTF-8."
+                continue
+            if len(word) > MAX_WORD_LENGTH:
+                yield line_number, "", f"Longer than {MAX_WORD_LENGTH} characters."
+            elif not word.isprintable() or any(character.isspace() for character in word):
+                yield line_number, "", "Not a single word."
+            else:
+                yield line_number, word, None
+    except (EOFError, OSError, zlib.error):
+        # Truncated or corrupt gzip data, nothing after this point can be read.
+        yield line_number + 1, "", "Not valid gzip data."
+
+
+def import_word_list(
+    file,
+    batch_size: int = INSERT_BATCH_SIZE,
+    on_insert: Callable[[list[Word]], None] | None = None,
+    on_progress: Callable[[ImportSummary], None] | None = None,
+) -> ImportSummary:
+    """Insert the words of a word list streamed from a binary file-like object (see `read_word_list`).
+
+    Words are inserted with `bulk_insert_words` in batches of `batch_size`, each committed in a transaction of its
+    own, so memory use and transaction length don't grow with the file. `on_insert` is called with the words created
+    by every batch, inside its transaction, and `on_progress` with the summary so far once the batch is committed.
+    Words already stored (or repeated in the file) count as duplicates.
+    """
+    summary = ImportSummary()
+
+    def words() -> Iterator[str]:
+        for line_number, word, error in read_word_list(file):
+            summary.lines = line_number
+            if error:
+                summary.reject(line_number, error)
+            elif word:
+                yield word
+
+    for batch in chunked(words(), batch_size):
+        with transaction.atomic():
+            result = bulk_insert_words(batch, batch_size=batch_size)
+            if on_insert is not None:
+                on_insert(result.created)
+        summary.inserted += result.inserted
+        summary.duplicates += result.skipped
+        if on_progress is not None:
+            on_progress(summary)
+    return summary
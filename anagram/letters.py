@@ -0,0 +1,224 @@
+import threading
+from bisect import bisect_left
+from collections.abc import Iterable
+
+import numpy as np
+
+from anagram.cache import dataset_version
+from anagram.models import Word
+from anagram.routers import primary_reads
+
+ALPHABET_SIZE = 26
+LETTER_BITS = np.left_shift(np.uint32(1), np.arange(ALPHABET_SIZE, dtype=np.uint32))
+
+
+def letter_counts(signatures: list[str]) -> np.ndarray:
+    """Count the letters of lowercase a-z strings into a `(len(signatures), 26)` uint8 matrix."""
+    lengths = np.fromiter((len(signature) for signature in signatures), dtype=np.intp, count=len(signatures))
+    codes = np.frombuffer("".join(signatures).encode("ascii"), dtype=np.uint8) - ord("a")
+    counts = np.zeros((len(signatures), ALPHABET_SIZE), dtype=np.uint8)
+    np.add.at(counts, (np.repeat(np.arange(len(signatures)), lengths), codes), 1)
+    return counts
+
+
+def is_spellable(signature: str) -> bool:
+    """Only words made of plain a-z letters can be spelled from a rack of letters."""
+    return signature.isascii() and signature.isalpha()
+
+
+class LetterIndex:
+    """In-process index answering "which words can be spelled from these letters" (sub-anagram) queries.
+
+    Every distinct `sorted_lowercase_word` is a row of a `(signatures, 26)` letter count matrix, next to a bitmask of
+    the letters it uses. A query is a bitmask prefilter followed by one vectorized comparison of the remaining rows
+    with the rack, so it never loops over the words in Python. Words of a row are kept as `(id, word, is_proper_noun)`
+    tuples in `id` order, like in `AnagramIndex`.
+
+    The index is built lazily on first use and then kept up to date by the write endpoints. Each process holds its own
+    copy, so it also remembers the dataset version (see `anagram/cache.py`) it was built at: when the version moved on
+    because of a write it didn't see (made by another process, a job or a management command), the next query rebuilds
+    it. This process' own writes move the index to their version with `follow_write` instead. Signatures that lost all
+    their words keep their row, they just don't produce any words.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.reset()
+
+    @property
+    def is_built(self) -> bool:
+        return self._is_built
+
+    def _set_rows(self, signatures: list[str]) -> None:
+        self._signatures = signatures
+        self._row_by_signature = {signature: row for row, signature in enumerate(signatures)}
+        self._counts = letter_counts(signatures)
+        self._masks = (self._counts > 0).astype(np.uint32) @ LETTER_BITS
+        self._lengths = self._counts.sum(axis=1, dtype=np.intp)
+        self._pending = []
+
+    def build(self, version: int | None = None) -> None:
+        """(Re)load the whole index from the database, as of the given dataset version (the current one by default)."""
+        # Reads go to `default` even in a read-only view: a lagging replica may not have reached that version yet.
+        with self._lock, primary_reads():
+            # Read before the words, so a write committed meanwhile bumps the version again rather than getting lost.
+            self._version = dataset_version() if version is None else version
+            groups: dict[str, list[tuple[int, str, bool]]] = {}
+            rows = Word.objects.order_by("id").values_list("id", "sorted_lowercase_word", "word", "is_proper_noun")
+            for pk, signature, word, is_proper_noun in rows.iterator(chunk_size=10_000):
+                if is_spellable(signature):
+                    groups.setdefault(signature, []).append((pk, word, is_proper_noun))
+            self._groups = groups
+            self._set_rows(list(groups))
+            self._is_built = True
+
+    def ensure_built(self) -> None:
+        """Build the index if it isn't built yet or misses writes of other processes. Costs a single cache read."""
+        version = dataset_version()
+        if not self._is_built or self._version != version:
+            with self._lock:
+                if not self._is_built or self._version != version:
+                    self.build(version)
+
+    def follow_write(self, version: int) -> None:
+        """Move the index to the dataset version returned by `bump_dataset_version`, after a write of this process was
+        applied to it. Only done when that write is the only one since the index's version, otherwise the index misses
+        others and is rebuilt on next use."""
+        with self._lock:
+            if self._version is not None and version == self._version + 1:
+                self._version = version
+
+    def reset(self) -> None:
+        """Drop the index, it will be rebuilt from the database on next use."""
+        with self._lock:
+            self._groups = {}
+            self._set_rows([])
+            self._version = None
+            self._is_built = False
+
+    def _flush_pending(self) -> None:
+        """Append rows for signatures added since the last query, with one concatenation per array."""
+        if not self._pending:
+            return
+        pending, offset = self._pending, len(self._signatures)
+        self._signatures = self._signatures + pending
+        self._row_by_signature.update((signature, offset + i) for i, signature in enumerate(pending))
+        counts = letter_counts(pending)
+        self._counts = np.concatenate([self._counts, counts])
+        self._masks = np.concatenate([self._masks, (counts > 0).astype(np.uint32) @ LETTER_BITS])
+        self._lengths = np.concatenate([self._lengths, counts.sum(axis=1, dtype=np.intp)])
+        self._pending = []
+
+    def get_signatures(
+        self, letters: str, min_length: int = 1, exclude_proper_nouns: bool = False
+    ) -> dict[str, list[str]]:
+        """Return signatures that can be spelled from the letters (each used at most once) with their words."""
+        self.ensure_built()
+        letters = letters.lower()
+        if not is_spellable(letters):
+            return {}
+        rack = letter_counts([letters])[0]
+        rack_mask = (rack > 0).astype(np.uint32) @ LETTER_BITS
+        with self._lock:
+            self._flush_pending()
+            candidates = np.flatnonzero(
+                ((self._masks & ~rack_mask) == 0) & (self._lengths >= min_length) & (self._lengths <= len(letters))
+            )
+            matches = candidates[(self._counts[candidates] <= rack).all(axis=1)]
+            signatures = {}
+            for row in matches.tolist():
+                signature = self._signatures[row]
+                words = [
+                    word
+                    for _, word, is_proper_noun in self._groups.get(signature, ())
+                    if not (exclude_proper_nouns and is_proper_noun)
+                ]
+                if words:
+                    signatures[signature] = words
+        return signatures
+
+    def get_words(
+        self,
+        letters: str,
+        min_length: int = 1,
+        limit: int | None = None,
+        exclude_proper_nouns: bool = False,
+    ) -> list[str]:
+        """Return words that can be spelled from the letters (each used at most once), longest first."""
+        signatures = self.get_signatures(letters, min_length=min_length, exclude_proper_nouns=exclude_proper_nouns)
+        words = sorted(
+            (word for signature_words in signatures.values() for word in signature_words),
+            key=lambda word: (-len(word), word),
+        )
+        return words[:limit] if limit is not None else words
+
+    def get_anagrams_with_blanks(
+        self,
+        pattern: str,
+        blank: str = "?",
+        limit: int | None = None,
+        exclude_proper_nouns: bool = False,
+    ) -> list[str]:
+        """Return anagrams of every possible fill of the blanks in the pattern, in `id` order.
+
+        Instead of trying all 26^blanks fills, this looks for words of the pattern's length that contain all its
+        letters, which is the same single vectorized comparison however many blanks there are.
+        """
+        self.ensure_built()
+        letters = pattern.lower().replace(blank, "")
+        if letters and not is_spellable(letters):
+            return []
+        required = letter_counts([letters])[0]
+        required_mask = (required > 0).astype(np.uint32) @ LETTER_BITS
+        with self._lock:
+            self._flush_pending()
+            candidates = np.flatnonzero(
+                ((self._masks & required_mask) == required_mask) & (self._lengths == len(pattern))
+            )
+            matches = candidates[(self._counts[candidates] >= required).all(axis=1)]
+            entries = [
+                (pk, word)
+                for row in matches.tolist()
+                for pk, word, is_proper_noun in self._groups.get(self._signatures[row], ())
+                if not (exclude_proper_nouns and is_proper_noun)
+            ]
+        entries.sort()
+        return [word for _, word in entries[:limit]]
+
+    def add_words(self, words: Iterable[Word]) -> None:
+        """Add freshly created words. Ignored until the index is built, as the build will pick them up anyway."""
+        with self._lock:
+            if not self._is_built:
+                return
+            for word in words:
+                signature = word.sorted_lowercase_word
+                if not is_spellable(signature):
+                    continue
+                if signature not in self._row_by_signature and signature not in self._groups:
+                    self._pending.append(signature)
+                group = self._groups.setdefault(signature, [])
+                entry = (word.pk, word.word, word.is_proper_noun)
+                position = bisect_left(group, entry)
+                if position == len(group) or group[position][0] != word.pk:
+                    group.insert(position, entry)
+
+    def remove_word(self, signature: str, pk: int) -> None:
+        with self._lock:
+            group = self._groups.get(signature)
+            if group:
+                group[:] = [entry for entry in group if entry[0] != pk]
+
+    def remove_signature(self, signature: str) -> None:
+        with self._lock:
+            if signature in self._groups:
+                self._groups[signature] = []
+
+    def clear(self) -> None:
+        """Empty the index after all words were deleted. Unlike `reset`, the index stays built."""
+        with self._lock:
+            self._groups = {}
+            self._set_rows([])
+            self._is_built = True
+
+
+letter_index = LetterIndex()
@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from anagram.snapshot import build_snapshot
+
+
+class Command(BaseCommand):
+    help = "Write a memory-mapped snapshot of the anagram index, read by workers instead of the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", nargs="?", default=None, help="Where to write the snapshot, `ANAGRAM_SNAPSHOT_PATH` by default."
+        )
+
+    def handle(self, *args, path, **options):
+        path = path or settings.ANAGRAM_SNAPSHOT_PATH
+        if not path:
+            raise CommandError("Pass a path or set `ANAGRAM_SNAPSHOT_PATH`.")
+        started_at = time.perf_counter()
+        stats = build_snapshot(path)
+        elapsed = time.perf_counter() - started_at
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {stats.words} words in {stats.groups} anagram groups to {path} "
+                f"({stats.size / 1024 / 1024:.1f} MiB) in {elapsed:.2f}s."
+            )
+        )
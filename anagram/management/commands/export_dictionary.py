@@ -0,0 +1,35 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from anagram import export
+
+
+class Command(BaseCommand):
+    help = "Stream all words or anagram groups to a file (or stdout) as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=["words", "groups"], help="What to export.")
+        parser.add_argument("--file-format", choices=export.EXPORT_FORMATS, default=export.NDJSON)
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output while it is written.")
+        parser.add_argument("--min-group-size", type=int, default=1, help="Smallest anagram group to export.")
+        parser.add_argument("--output", "-o", help="File to write to, stdout if left out.")
+
+    def handle(self, *args, kind, file_format, gzip, min_group_size, output, **options):
+        started_at = time.perf_counter()
+        if kind == "words":
+            chunks = export.export_words(file_format)
+        else:
+            chunks = export.export_groups(file_format, min_group_size=min_group_size)
+        data = export.gzip_stream(chunks) if gzip else (chunk.encode() for chunk in chunks)
+
+        written = 0
+        with open(output, "wb") if output else open(sys.stdout.fileno(), "wb", closefd=False) as file:
+            for piece in data:
+                file.write(piece)
+                written += len(piece)
+
+        if output:
+            elapsed = time.perf_counter() - started_at
+            self.stdout.write(self.style.SUCCESS(f"Exported {kind} to {output} ({written} bytes) in {elapsed:.2f}s."))
@@ -0,0 +1,59 @@
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from anagram.cache import bump_dataset_version
+from anagram.groups import add_missing_deletions
+from anagram.ingest import copy_words, secondary_indexes_dropped, truncate_words
+from anagram.models import AnagramGroup, Word
+from anagram.snapshot import build_snapshot
+
+
+class Command(BaseCommand):
+    help = "Load words from a text file (one word per line) straight into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the word list, e.g. dictionary.txt.")
+        parser.add_argument("--truncate", action="store_true", help="Delete all existing words before loading.")
+        parser.add_argument("--batch-size", type=int, default=10_000, help="Number of words sent per COPY.")
+
+    def handle(self, *args, path, truncate, batch_size, **options):
+        started_at = time.perf_counter()
+        read = loaded = 0
+        with open(path, encoding="utf-8") as file, transaction.atomic():
+            if truncate:
+                deleted = truncate_words()
+                self.stdout.write(f"Deleted {deleted} existing words.")
+
+            def words():
+                nonlocal read
+                for line in file:
+                    if word := line.strip():
+                        read += 1
+                        yield word
+
+            # Into empty tables, the indexes and the group foreign key of the words are built once, after the load.
+            indexes = secondary_indexes_dropped(Word, AnagramGroup) if not Word.objects.exists() else nullcontext()
+            with indexes:
+                loaded = copy_words(words(), deletions=False, batch_size=batch_size)
+            self.stdout.write(f"Loaded {loaded} words.")
+            # In the same transaction, so near-anagram lookups never see groups without their deletion signatures.
+            deletions = add_missing_deletions()
+            self.stdout.write(f"Stored {deletions} deletion signatures.")
+            transaction.on_commit(bump_dataset_version)
+
+        if settings.ANAGRAM_SNAPSHOT_PATH:
+            # Workers would otherwise read every word loaded from the database on top of the old snapshot.
+            stats = build_snapshot(settings.ANAGRAM_SNAPSHOT_PATH)
+            self.stdout.write(f"Wrote a snapshot of {stats.words} words to {settings.ANAGRAM_SNAPSHOT_PATH}.")
+
+        elapsed = time.perf_counter() - started_at
+        rate = loaded / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Loaded {loaded} words in {elapsed:.2f}s ({rate:.0f} rows/s), skipped {read - loaded} duplicates."
+            )
+        )
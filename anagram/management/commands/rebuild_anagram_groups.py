@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from anagram.cache import bump_dataset_version
+from anagram.groups import check_groups, rebuild_groups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the anagram groups from the words in the database, or check them for drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report differences between the stored groups and the words, fail if there are any.",
+        )
+
+    def handle(self, *args, check, **options):
+        if check:
+            drift = check_groups()
+            if not drift:
+                self.stdout.write(self.style.SUCCESS("Anagram groups are up to date."))
+                return
+            self.stdout.write(f"Words without a group: {drift.unlinked_words}")
+            self.stdout.write(f"Words linked to a wrong group: {drift.mislinked_words}")
+            self.stdout.write(f"Groups with a wrong count: {len(drift.wrong_counts)}")
+            for signature, stored_count, actual_count in drift.wrong_counts[:20]:
+                self.stdout.write(f"  {signature}: stored {stored_count}, actual {actual_count}")
+            self.stdout.write(f"Groups without deletion signatures: {drift.groups_without_deletions}")
+            raise CommandError("Anagram groups have drifted, run `rebuild_anagram_groups` to fix them.")
+
+        started_at = time.perf_counter()
+        with transaction.atomic():
+            created = rebuild_groups()
+            transaction.on_commit(bump_dataset_version)
+        elapsed = time.perf_counter() - started_at
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} anagram groups in {elapsed:.2f}s."))
@@ -0,0 +1,249 @@
+"""Request and database metrics, exposed at `/metrics` in the Prometheus text format.
+
+`MetricsMiddleware` times every request and counts the database queries it runs (and their time), labelled with the
+route name. Metrics are kept in memory per process, like the response cache counters: under several workers each one
+reports its own, so scrape the workers one by one (or run a single process per host). Recording costs a couple of
+dictionary updates per request and a timer per query, cheap enough to leave on.
+"""
+
+import abc
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True))
+    return f"{{{pairs}}}"
+
+
+class Metric(abc.ABC):
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: dict) -> tuple:
+        return tuple(labels[name] for name in self.labels)
+
+    @abc.abstractmethod
+    def samples(self) -> list[tuple[str, tuple[str, ...], tuple, float]]:
+        """`(name, label names, label values, value)` of every sample."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines += [
+            f"{name}{_format_labels(names, values)} {_format_value(value)}"
+            for name, names, values, value in self.samples()
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._label_values(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [(self.name, self.labels, key, value) for key, value in values]
+
+
+class Histogram(Metric):
+    """Counts of observations per bucket, with bucket boundaries (upper bounds) set by a setting."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (), buckets_setting: str = ""):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(getattr(settings, buckets_setting))) + (float("inf"),)
+        # Per label values: a count per bucket (not cumulative), the sum and the count of the observations.
+        self._values: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._label_values(labels)
+        bucket = next(position for position, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0]))
+            counts[bucket] += 1
+            total[0] += value
+
+    def count(self, **labels) -> int:
+        counts, _ = self._values.get(self._label_values(labels), ([], []))
+        return sum(counts)
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        samples = []
+        bucket_labels = (*self.labels, "le")
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts, strict=True):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", bucket_labels, (*key, _format_value(bound)), cumulative))
+            samples.append((f"{self.name}_sum", self.labels, key, total))
+            samples.append((f"{self.name}_count", self.labels, key, cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register[M: Metric](self, metric: M) -> M:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self._metrics.values())
+
+
+registry = Registry()
+
+request_duration = registry.register(
+    Histogram(
+        "anagram_http_request_duration_seconds",
+        "Time spent handling requests, until the response is returned.",
+        ("route", "method"),
+        buckets_setting="ANAGRAM_METRICS_LATENCY_BUCKETS",
+    )
+)
+requests_total = registry.register(
+    Counter("anagram_http_requests_total", "Requests handled.", ("route", "method", "status"))
+)
+request_queries = registry.register(
+    Histogram(
+        "anagram_db_queries_per_request",
+        "Database queries run per request.",
+        ("route",),
+        buckets_setting="ANAGRAM_METRICS_QUERY_BUCKETS",
+    )
+)
+queries_total = registry.register(Counter("anagram_db_queries_total", "Database queries run by requests.", ("route",)))
+query_seconds_total = registry.register(
+    Counter("anagram_db_query_duration_seconds_total", "Time spent in database queries by requests.", ("route",))
+)
+words_ingested_total = registry.register(Counter("anagram_words_ingested_total", "Words inserted by the write paths."))
+jobs_total = registry.register(Counter("anagram_jobs_total", "Background jobs finished.", ("kind", "status")))
+coalesced_requests_total = registry.register(
+    Counter(
+        "anagram_coalesced_requests_total",
+        "Requests answered with the response of an identical request in flight, in this process or another one.",
+        ("source",),
+    )
+)
+
+
+@dataclass
+class QueryStats:
+    queries: int = 0
+    seconds: float = 0.0
+
+
+# Stats of the request being handled. A context variable, so queries the async views run in worker threads (through
+# `sync_to_async`, which copies the context) still count towards their request.
+_query_stats: ContextVar[QueryStats | None] = ContextVar("anagram_query_stats", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding the query to the stats of the current request, if there is one."""
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.seconds += time.perf_counter() - started_at
+
+
+def install_query_recorder(sender, connection, **kwargs) -> None:
+    """`connection_created` receiver, so every database connection reports its queries."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class MetricsMiddleware:
+    """Record the latency, status and database queries of every request, labelled with its route name."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if not settings.ANAGRAM_METRICS_ENABLED:
+            return self.get_response(request)
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started_at = time.perf_counter()
+        token = _query_stats.set(stats := QueryStats())
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        self._record(request, response, time.perf_counter() - started_at, stats)
+        return response
+
+    async def __acall__(self, request):
+        started_at = time.perf_counter()
+        token = _query_stats.set(stats := QueryStats())
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        self._record(request, response, time.perf_counter() - started_at, stats)
+        return response
+
+    @staticmethod
+    def _record(request, response, elapsed: float, stats: QueryStats) -> None:
+        match = request.resolver_match
+        route = match.view_name if match is not None else "unmatched"
+        request_duration.observe(elapsed, route=route, method=request.method)
+        requests_total.inc(route=route, method=request.method, status=response.status_code)
+        request_queries.observe(stats.queries, route=route)
+        queries_total.inc(stats.queries, route=route)
+        query_seconds_total.inc(stats.seconds, route=route)
+
+
+def metrics_view(request):
+    """All metrics in the Prometheus text format."""
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
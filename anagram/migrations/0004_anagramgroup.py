@@ -0,0 +1,52 @@
+# Generated by Django 4.2.9 on 2026-10-17 01:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, OuterRef, Subquery
+
+
+def populate_groups(apps, schema_editor):
+    AnagramGroup = apps.get_model("anagram", "AnagramGroup")
+    Word = apps.get_model("anagram", "Word")
+    rows = (
+        Word.objects.order_by()
+        .values_list("sorted_lowercase_word")
+        .annotate(count=Count("id"))
+        .values_list("sorted_lowercase_word", "count")
+    )
+    AnagramGroup.objects.bulk_create(
+        (AnagramGroup(signature=signature, count=count, length=len(signature)) for signature, count in rows.iterator()),
+        batch_size=5000,
+    )
+    Word.objects.update(
+        group=Subquery(AnagramGroup.objects.filter(signature=OuterRef("sorted_lowercase_word")).values("id")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anagram', '0003_alter_word_options_word_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnagramGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('signature', models.CharField(max_length=100, unique=True)),
+                ('count', models.IntegerField(default=0)),
+                ('length', models.IntegerField()),
+            ],
+            options={
+                'ordering': ['-count', 'signature'],
+                'indexes': [models.Index(fields=['-count', 'signature'], name='anagram_group_count_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='word',
+            name='group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='words', to='anagram.anagramgroup'),
+        ),
+        migrations.RunPython(populate_groups, migrations.RunPython.noop),
+    ]
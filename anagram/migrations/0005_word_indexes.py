@@ -0,0 +1,31 @@
+# Generated by Django 4.2.9 on 2026-10-17 01:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anagram', '0004_anagramgroup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='word',
+            name='group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='words', to='anagram.anagramgroup'),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['sorted_lowercase_word', 'id'], include=('word', 'is_proper_noun'), name='anagram_word_signature_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['word'], name='anagram_word_word_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['length'], name='anagram_word_length_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Unique words are opt-in (`ANAGRAM_UNIQUE_WORDS` setting), so the constraint is managed here instead of `Word.Meta`.
+# To enable it on an existing database: set the setting, then `make migrate anagram 0005` and `make migrate`.
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+
+UNIQUE_WORD_CONSTRAINT = "anagram_word_unique_word"
+
+
+def _constraint_exists(schema_editor, model):
+    with schema_editor.connection.cursor() as cursor:
+        constraints = schema_editor.connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return UNIQUE_WORD_CONSTRAINT in constraints
+
+
+def add_unique_word_constraint(apps, schema_editor):
+    if not settings.ANAGRAM_UNIQUE_WORDS:
+        return
+    Word = apps.get_model("anagram", "Word")
+    AnagramGroup = apps.get_model("anagram", "AnagramGroup")
+    if _constraint_exists(schema_editor, Word):
+        return
+
+    # Keep the first copy of every word and shrink the groups that lost words.
+    first_ids = Word.objects.order_by().values("word").annotate(first_id=Min("id")).values("first_id")
+    duplicates = Word.objects.exclude(pk__in=first_ids)
+    group_ids = set(duplicates.values_list("group_id", flat=True))
+    duplicates.delete()
+    group_sizes = Word.objects.filter(group=OuterRef("pk")).order_by().values("group").annotate(count=Count("id"))
+    AnagramGroup.objects.filter(pk__in=group_ids).update(count=Subquery(group_sizes.values("count")))
+
+    if schema_editor.connection.vendor == "postgresql":
+        # Postgres can't alter a table with deferred foreign key checks still pending in the transaction.
+        schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    schema_editor.add_constraint(Word, models.UniqueConstraint(fields=["word"], name=UNIQUE_WORD_CONSTRAINT))
+
+
+def remove_unique_word_constraint(apps, schema_editor):
+    Word = apps.get_model("anagram", "Word")
+    if _constraint_exists(schema_editor, Word):
+        schema_editor.remove_constraint(Word, models.UniqueConstraint(fields=["word"], name=UNIQUE_WORD_CONSTRAINT))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("anagram", "0005_word_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_unique_word_constraint, remove_unique_word_constraint),
+    ]
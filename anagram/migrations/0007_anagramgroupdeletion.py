@@ -0,0 +1,49 @@
+# Generated by Django 4.2.9 on 2026-10-17 01:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_deletions(apps, schema_editor):
+    AnagramGroup = apps.get_model("anagram", "AnagramGroup")
+    AnagramGroupDeletion = apps.get_model("anagram", "AnagramGroupDeletion")
+    if schema_editor.connection.vendor == "postgresql":
+        quote_name = schema_editor.quote_name
+        schema_editor.execute(
+            f"INSERT INTO {quote_name(AnagramGroupDeletion._meta.db_table)} (group_id, deletion) "
+            f"SELECT DISTINCT groups.id, OVERLAY(groups.signature PLACING '' FROM position FOR 1) "
+            f"FROM {quote_name(AnagramGroup._meta.db_table)} groups, GENERATE_SERIES(1, LENGTH(groups.signature)) position"
+        )
+        return
+    AnagramGroupDeletion.objects.bulk_create(
+        (
+            AnagramGroupDeletion(group_id=group_id, deletion=signature[:position] + signature[position + 1 :])
+            for group_id, signature in AnagramGroup.objects.values_list("id", "signature").iterator()
+            for position in range(len(signature))
+        ),
+        batch_size=5000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anagram', '0006_unique_word'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnagramGroupDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deletion', models.CharField(max_length=100)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='deletions', to='anagram.anagramgroup')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='anagramgroupdeletion',
+            constraint=models.UniqueConstraint(fields=('deletion', 'group'), name='anagram_group_deletion_unique'),
+        ),
+        migrations.RunPython(populate_deletions, migrations.RunPython.noop),
+    ]
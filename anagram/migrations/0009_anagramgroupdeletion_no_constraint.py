@@ -0,0 +1,23 @@
+# Generated by Django 4.2.9 on 2026-10-17 02:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anagram', '0008_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='anagramgroupdeletion',
+            name='group',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='deletions', to='anagram.anagramgroup'),
+        ),
+        migrations.AddIndex(
+            model_name='anagramgroupdeletion',
+            index=models.Index(fields=['group'], name='anagram_deletion_group_idx'),
+        ),
+    ]
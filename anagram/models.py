@@ -1,15 +1,105 @@
+import uuid
+
 from django.db import models
 
 
+class AnagramGroup(models.Model):
+    """Words sharing the same `sorted_lowercase_word`, with the group size kept up to date by every write path."""
+
+    signature = models.CharField(max_length=100, unique=True)
+    count = models.IntegerField(default=0)
+    length = models.IntegerField()
+
+    def __str__(self):
+        return self.signature
+
+    class Meta:
+        ordering = ["-count", "signature"]
+        indexes = [models.Index(fields=["-count", "signature"], name="anagram_group_count_idx")]
+
+
+class AnagramGroupDeletion(models.Model):
+    """Signature of a group with one letter deleted, used to look up near anagrams (SymSpell style).
+
+    Two groups are one letter apart when one's signature is a deletion of the other's (a letter was added or removed)
+    or when they share a deletion (a letter was substituted).
+    """
+
+    # Rows are deleted together with their group by `anagram.groups.delete_groups`. There is no database constraint:
+    # every group adds about ten rows, and checking all of them at commit cost more than inserting them.
+    group = models.ForeignKey(
+        AnagramGroup, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name="deletions"
+    )
+    deletion = models.CharField(max_length=100)
+
+    def __str__(self):
+        return self.deletion
+
+    class Meta:
+        constraints = [
+            # Also serves the `deletion IN (...)` lookups, straight from the index.
+            models.UniqueConstraint(fields=["deletion", "group"], name="anagram_group_deletion_unique"),
+        ]
+        # Named, so that `anagram.groups.add_missing_deletions` can drop and rebuild it around a full load.
+        indexes = [models.Index(fields=["group"], name="anagram_deletion_group_idx")]
+
+
 class Word(models.Model):
     word = models.CharField(max_length=100)
     sorted_word = models.CharField(max_length=100)
     sorted_lowercase_word = models.CharField(max_length=100)
     is_proper_noun = models.BooleanField(default=False)
     length = models.IntegerField()  # TODO: Could be GeneratedField (Django 5)
+    # Groups are only ever deleted once they have no words left, so nothing needs to happen to the words.
+    group = models.ForeignKey(AnagramGroup, null=True, blank=True, on_delete=models.DO_NOTHING, related_name="words")
 
     def __str__(self):
         return self.word
 
     class Meta:
         ordering = ["id"]
+        indexes = [
+            # Anagram lookups filter on the signature and return words in `id` order, straight from the index.
+            models.Index(
+                fields=["sorted_lowercase_word", "id"],
+                include=["word", "is_proper_noun"],
+                name="anagram_word_signature_idx",
+            ),
+            models.Index(fields=["word"], name="anagram_word_word_idx"),
+            models.Index(fields=["length"], name="anagram_word_length_idx"),
+        ]
+
+
+class Job(models.Model):
+    """A heavy write run in the background by a Celery worker (see `anagram/tasks.py`), with its progress."""
+
+    class Kind(models.TextChoices):
+        IMPORT_WORDS = "import_words"
+        DELETE_WORDS = "delete_words"
+        REBUILD_GROUPS = "rebuild_groups"
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        SUCCEEDED = "succeeded"
+        FAILED = "failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    # Word list of an import, deleted once the job has finished.
+    upload = models.FileField(upload_to="imports/", blank=True)
+    # Items (lines read, words deleted, groups rebuilt) processed so far, out of `total` when that is known upfront.
+    processed = models.BigIntegerField(default=0)
+    total = models.BigIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.pk}"
+
+    class Meta:
+        ordering = ["-created_at"]
@@ -0,0 +1,109 @@
+import base64
+import binascii
+import json
+
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class AnagramGroupCursorPagination(BasePagination):
+    """Keyset pagination over anagram groups ordered by `(-count, signature)`.
+
+    The cursor holds the `(count, signature)` of the last group on the page, so every page costs at most two index
+    range scans no matter how deep it is, and no total COUNT is needed. Only forward navigation is supported.
+    """
+
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        queryset = queryset.order_by("-count", "signature")
+        limit = self.page_size + 1
+        position = self.decode_cursor(request)
+        if position is None:
+            page = list(queryset[:limit])
+        else:
+            # Rest of the groups with the cursor's count, then the smaller groups. Two plain index range scans are
+            # cheaper than one `OR` condition, which the database can only apply as a filter on top of the scan.
+            count, signature = position
+            page = list(queryset.filter(count=count, signature__gt=signature)[:limit])
+            if len(page) < limit:
+                page += queryset.filter(count__lt=count)[: limit - len(page)]
+        return self._finish_page(page)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Same as `paginate_queryset`, with the async ORM."""
+        self.request = request
+        queryset = queryset.order_by("-count", "signature")
+        limit = self.page_size + 1
+        position = self.decode_cursor(request)
+        if position is None:
+            page = [group async for group in queryset[:limit]]
+        else:
+            count, signature = position
+            page = [group async for group in queryset.filter(count=count, signature__gt=signature)[:limit]]
+            if len(page) < limit:
+                page += [group async for group in queryset.filter(count__lt=count)[: limit - len(page)]]
+        return self._finish_page(page)
+
+    def _finish_page(self, page: list) -> list:
+        has_next = len(page) > self.page_size
+        page = page[: self.page_size]
+        self.next_position = (page[-1].count, page[-1].signature) if has_next else None
+        return page
+
+    def decode_cursor(self, request) -> tuple[int, str] | None:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            count, signature = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            return int(count), str(signature)
+        except (binascii.Error, UnicodeError, TypeError, ValueError) as error:
+            raise NotFound(self.invalid_cursor_message) from error
+
+    def encode_cursor(self, position: tuple[int, str]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode("ascii")
+
+    def get_next_link(self) -> str | None:
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """`PageNumberPagination` with an async `apaginate_queryset`, for views that query with the async ORM."""
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        # `count` is a cached property, filling it in keeps the paginator from running the (sync) count query itself.
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc))) from exc
+        # The page holds a lazy slice of the queryset until it is fetched here.
+        self.page.object_list = [item async for item in self.page.object_list]
+        self.request = request
+        return list(self.page)
@@ -0,0 +1,183 @@
+"""Multi-word (phrase) anagram search, e.g. "dormitory" -> "dirty room".
+
+The search itself only needs NumPy, so its top-level branches can be spread over a process pool without setting up
+Django in the worker processes.
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+
+import numpy as np
+
+ALPHABET_SIZE = 26
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PhraseSearchResult:
+    # Every phrase is a tuple of indexes into the candidate signatures.
+    phrases: list[tuple[int, ...]] = field(default_factory=list)
+    complete: bool = True
+
+
+class _StopSearch(Exception):
+    pass
+
+
+def _counts(signatures: Iterable[str]) -> np.ndarray:
+    return np.array(
+        [
+            np.bincount(np.frombuffer(signature.encode(), dtype=np.uint8) - ord("a"), minlength=ALPHABET_SIZE)
+            for signature in signatures
+        ],
+        dtype=np.int16,
+    ).reshape(-1, ALPHABET_SIZE)
+
+
+def _signature(counts: np.ndarray) -> str:
+    return "".join(chr(ord("a") + letter) * int(count) for letter, count in enumerate(counts) if count)
+
+
+def search_phrases(
+    candidates: list[str],
+    target: str,
+    max_words: int,
+    max_results: int,
+    deadline: float,
+    first_rows: Iterable[int] | None = None,
+) -> PhraseSearchResult:
+    """Find combinations of candidate signatures whose letters add up exactly to the target signature.
+
+    Candidates must be sorted by length, longest first. Combinations are generated in candidate order (a signature
+    may repeat, but never comes after a shorter one), which avoids permutations of the same phrase and lets the search
+    stop early: once the current word is too short to fill the remaining letters with the words left, so are all the
+    words after it. The last word is looked up by its signature instead of being searched for. `deadline` is a
+    `time.time()` value, the search stops there (or at `max_results` phrases) and returns what it found so far, with
+    `complete` unset. `first_rows` restricts the first word to some candidates, so that top-level branches can be
+    searched in parallel.
+    """
+    result = PhraseSearchResult()
+    if not candidates:
+        return result
+    counts = _counts(candidates)
+    lengths = counts.sum(axis=1)
+    row_by_signature = {signature: row for row, signature in enumerate(candidates)}
+    first_rows = np.fromiter(first_rows, dtype=np.intp) if first_rows is not None else None
+    chosen: list[int] = []
+
+    def visit(rows: np.ndarray, remaining: np.ndarray, remaining_length: int) -> None:
+        if time.time() > deadline:
+            raise _StopSearch
+        words_left = max_words - len(chosen)
+        if words_left == 1:
+            row = row_by_signature.get(_signature(remaining))
+            if row is not None and (chosen or first_rows is None or row in first_rows) and row >= rows[0]:
+                result.phrases.append((*chosen, row))
+            return
+        rows = rows[(counts[rows] <= remaining).all(axis=1)]
+        branches = rows if chosen or first_rows is None else rows[np.isin(rows, first_rows)]
+        for row in branches.tolist():
+            length = int(lengths[row])
+            if length * words_left < remaining_length:
+                break
+            chosen.append(row)
+            if length == remaining_length:
+                result.phrases.append(tuple(chosen))
+            else:
+                visit(rows[rows >= row], remaining - counts[row], remaining_length - length)
+            chosen.pop()
+            if len(result.phrases) >= max_results:
+                raise _StopSearch
+
+    try:
+        visit(np.arange(len(candidates)), _counts([target])[0], len(target))
+    except _StopSearch:
+        result.complete = False
+    result.phrases = result.phrases[:max_results]
+    return result
+
+
+# Pools by number of processes.
+_executors: dict[int, ProcessPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _ready() -> None:
+    """Run by every new pool process, so it has imported this module (and NumPy) before the first search."""
+
+
+def start_workers(workers: int) -> None:
+    """Start the pool of `workers` processes used by `parallel_search_phrases` unless it runs already, and wait until
+    all of them are up. Call it before a search's time budget starts, starting a pool takes about a second."""
+    if workers > 1:
+        _get_executor(workers)
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    with _executors_lock:
+        executor = _executors.get(workers)
+        if executor is None:
+            # Forking a web worker copies the state of its other threads (e.g. a lock held by one of them) into a
+            # child that never runs them. Workers are forked from a single threaded server process instead.
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"))
+            # Processes are started on demand, one per task submitted while none is idle.
+            for future in [executor.submit(_ready) for _ in range(workers)]:
+                future.result()
+            _executors[workers] = executor
+        return executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    """Drop a broken pool, a new one is started by the next search."""
+    with _executors_lock:
+        for workers, pool in list(_executors.items()):
+            if pool is executor:
+                del _executors[workers]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def parallel_search_phrases(
+    candidates: list[str],
+    target: str,
+    max_words: int,
+    max_results: int,
+    deadline: float,
+    workers: int,
+) -> PhraseSearchResult:
+    """Like `search_phrases`, with the first words dealt round-robin over a pool of `workers` processes. When the pool
+    broke (e.g. a worker got killed), the search runs in this process instead."""
+    if workers <= 1 or len(candidates) < workers:
+        return search_phrases(candidates, target, max_words, max_results, deadline)
+
+    # Longer first words have the biggest subtrees, dealing them round-robin spreads them over all workers.
+    chunks = [range(worker, len(candidates), workers) for worker in range(workers)]
+    result = PhraseSearchResult()
+    executor = None
+    try:
+        executor = _get_executor(workers)
+        futures = [
+            executor.submit(search_phrases, candidates, target, max_words, max_results, deadline, chunk)
+            for chunk in chunks
+        ]
+        for future in futures:
+            partial = future.result()
+            result.phrases.extend(partial.phrases)
+            result.complete = result.complete and partial.complete
+    except BrokenProcessPool:
+        logger.warning("The phrase search pool is broken, searching in process.", exc_info=True)
+        if executor is not None:
+            _discard_executor(executor)
+        return search_phrases(candidates, target, max_words, max_results, deadline)
+    result.phrases.sort()
+    if len(result.phrases) > max_results:
+        result.phrases = result.phrases[:max_results]
+        # Some worker may have stopped at the limit before reaching phrases that sort before the ones kept.
+        result.complete = False
+    return result
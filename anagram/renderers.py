@@ -0,0 +1,74 @@
+"""Faster JSON and MessagePack renderers and parsers, picked by content negotiation (see `REST_FRAMEWORK`).
+
+`ORJSONRenderer` replaces DRF's `JSONRenderer` and renders the same compact UTF-8 JSON, but with `orjson`, several
+times faster on the big nested lists of `anagram-groups` pages and batch lookups. The output is the same byte for byte
+except for floats: some are spelled differently (`0.00001` for `1e-05`, the same value), and NaN and infinities
+become `null` instead of failing the response. Clients that send
+`Accept: application/msgpack` get MessagePack instead: smaller, and cheaper to decode. Types neither library knows
+(e.g. `Decimal` or lazy translations) are converted by DRF's JSON encoder, like in `JSONRenderer`.
+"""
+
+import msgpack
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+LINE_SEPARATOR = "\u2028".encode()
+PARAGRAPH_SEPARATOR = "\u2029".encode()
+
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """`JSONRenderer` using `orjson`. Indented output (`Accept: application/json; indent=4`, the browsable API) is left
+    to `JSONRenderer`, `orjson` only indents by 2 spaces. So is data `orjson` can't render (non-string keys, integers
+    beyond 64 bits)."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, default=_encoder.default)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Like `JSONRenderer`, escape the two line terminators JavaScript doesn't allow in strings.
+        return content.replace(LINE_SEPARATOR, b"\\u2028").replace(PARAGRAPH_SEPARATOR, b"\\u2029")
+
+
+class ORJSONParser(JSONParser):
+    """`JSONParser` using `orjson`."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}") from exc
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = MSGPACK_MEDIA_TYPE
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_encoder.default)
+
+
+class MessagePackParser(BaseParser):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read())
+        # Malformed input mostly raises `ValueError` subclasses, but nothing promises only those: anything `unpackb`
+        # raises on a request body is the client's fault.
+        except Exception as exc:
+            raise ParseError(f"MessagePack parse error - {exc}") from exc
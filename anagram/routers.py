@@ -0,0 +1,88 @@
+"""Read/write database routing: read-only views read from `ANAGRAM_REPLICA_DATABASE`, everything else uses `default`.
+
+Views opt in with `@read_only`, which routes their reads to the replica while they run and exempts their requests from
+`ATOMIC_REQUESTS` (see `NonAtomicReadsMixin`), so a lookup never opens a transaction, or even a connection, on the
+primary. Writes, and reads made by write requests, stay on `default`: a write request reads its own writes.
+
+The replica may lag behind the primary, so a read right after a write can miss it. That is fine for a single response,
+but not for what outlives it: a response cached or tagged with an ETag under the new dataset version, or an in-process
+index built as of it, would keep missing the write until the next one. Those reads run in `primary_reads` blocks and
+go to `default`, so with the response cache or ETags enabled only the uncached read endpoints use the replica.
+"""
+
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import transaction
+
+# Set while a read-only view runs. A context variable, so the async ORM's worker threads (`sync_to_async` copies the
+# context) route the same way as the view that started them.
+_replica_reads: ContextVar[bool] = ContextVar("anagram_replica_reads", default=False)
+
+
+@contextmanager
+def replica_reads():
+    """Route the reads run inside the block to the replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Route the reads run inside the block to `default`, even in a read-only view."""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def read_only(view_method):
+    """Mark a view method as read-only: its reads go to the replica and its requests run outside of a transaction."""
+
+    @functools.wraps(view_method)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view_method(*args, **kwargs)
+
+    wrapper.read_only = True
+    return wrapper
+
+
+class NonAtomicReadsMixin:
+    """Viewset mixin exempting routes whose actions are all `@read_only` from `ATOMIC_REQUESTS`."""
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        handlers = [getattr(cls, name) for name in (actions or {}).values()]
+        if handlers and all(getattr(handler, "read_only", False) for handler in handlers):
+            return transaction.non_atomic_requests(view)
+        return view
+
+
+class ReplicaRouter:
+    """Database router sending the reads of `@read_only` views to `ANAGRAM_REPLICA_DATABASE`."""
+
+    def db_for_read(self, model, **hints):
+        if settings.ANAGRAM_REPLICA_DATABASE and _replica_reads.get():
+            return settings.ANAGRAM_REPLICA_DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as `default`.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary.
+        if db == settings.ANAGRAM_REPLICA_DATABASE:
+            return False
+        return None
@@ -1,6 +1,9 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 
-from anagram.models import Word
+from anagram.export import EXPORT_FORMATS, NDJSON
+from anagram.models import Job, Word
 
 
 class WordSerializer(serializers.ModelSerializer):
@@ -13,6 +16,105 @@ class AnagramsListSerializer(serializers.Serializer):
     anagrams = serializers.ListField(child=serializers.CharField(max_length=100))
 
 
+class BatchAnagramsRequestSerializer(serializers.Serializer):
+    words = serializers.ListField(child=serializers.CharField(max_length=100), allow_empty=False)
+
+    def validate_words(self, value):
+        max_words = settings.ANAGRAM_BATCH_MAX_WORDS
+        if len(value) > max_words:
+            raise serializers.ValidationError(f"At most {max_words} words can be looked up at once.")
+        return value
+
+
+class WordAnagramsSerializer(AnagramsListSerializer):
+    word = serializers.CharField(max_length=100)
+
+
+class BatchAnagramsSerializer(serializers.Serializer):
+    results = WordAnagramsSerializer(many=True)
+
+
+class ExportRequestSerializer(serializers.Serializer):
+    # Not `format`, which DRF reserves for picking a renderer.
+    file_format = serializers.ChoiceField(choices=EXPORT_FORMATS, default=NDJSON)
+    gzip = serializers.BooleanField(default=False)
+
+
+class GroupExportRequestSerializer(ExportRequestSerializer):
+    min_group_size = serializers.IntegerField(min_value=1, default=1)
+
+
+class BulkInsertResultSerializer(serializers.Serializer):
+    inserted = serializers.IntegerField()
+    skipped = serializers.IntegerField()
+
+
+class WordListUploadSerializer(serializers.Serializer):
+    file = serializers.FileField()
+
+
+class ImportErrorSerializer(serializers.Serializer):
+    line = serializers.IntegerField()
+    error = serializers.CharField()
+
+
+class ImportSummarySerializer(serializers.Serializer):
+    lines = serializers.IntegerField()
+    inserted = serializers.IntegerField()
+    duplicates = serializers.IntegerField()
+    rejected = serializers.IntegerField()
+    errors = ImportErrorSerializer(many=True)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField(help_text="Share of the items processed, when their total is known.")
+    elapsed = serializers.SerializerMethodField(help_text="Seconds the job has been running (or ran for).")
+    throughput = serializers.SerializerMethodField(help_text="Items processed per second.")
+
+    class Meta:
+        model = Job
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "processed",
+            "total",
+            "progress",
+            "elapsed",
+            "throughput",
+            "result",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+
+    def get_progress(self, job) -> float | None:
+        if job.status == Job.Status.SUCCEEDED:
+            return 1.0
+        if not job.total:
+            return None
+        return min(job.processed / job.total, 1.0)
+
+    def get_elapsed(self, job) -> float | None:
+        if job.started_at is None:
+            return None
+        return ((job.finished_at or timezone.now()) - job.started_at).total_seconds()
+
+    def get_throughput(self, job) -> float | None:
+        elapsed = self.get_elapsed(job)
+        if not elapsed:
+            return None
+        return round(job.processed / elapsed, 1)
+
+
+class CacheStatsSerializer(serializers.Serializer):
+    enabled = serializers.BooleanField()
+    dataset_version = serializers.IntegerField()
+    hits = serializers.IntegerField()
+    misses = serializers.IntegerField()
+
+
 class SimpleWordSerializer(serializers.Serializer):
     word = serializers.CharField(max_length=100)
 
@@ -39,6 +141,41 @@ class MostAnagramsSerializer(serializers.Serializer):
     words = serializers.ListField(child=serializers.CharField(max_length=100))
 
 
+class NearAnagramsSerializer(serializers.Serializer):
+    added = serializers.ListField(child=serializers.CharField(max_length=100))
+    removed = serializers.ListField(child=serializers.CharField(max_length=100))
+    substituted = serializers.ListField(child=serializers.CharField(max_length=100))
+
+
+class WordsFromLettersSerializer(serializers.Serializer):
+    words = serializers.ListField(child=serializers.CharField(max_length=100))
+
+
+class PhraseAnagramsRequestSerializer(serializers.Serializer):
+    phrase = serializers.CharField(max_length=100)
+    max_words = serializers.IntegerField(min_value=1, default=3)
+    max_results = serializers.IntegerField(min_value=1, default=100)
+    min_length = serializers.IntegerField(min_value=1, default=2)
+    exclude_proper_nouns = serializers.BooleanField(default=False)
+
+    def validate_phrase(self, value):
+        letters = "".join(character for character in value.lower() if not character.isspace())
+        if not (letters.isascii() and letters.isalpha()):
+            raise serializers.ValidationError("Phrase can only contain letters a-z and spaces.")
+        return value
+
+    def validate_max_words(self, value):
+        return min(value, settings.ANAGRAM_PHRASE_MAX_WORDS)
+
+    def validate_max_results(self, value):
+        return min(value, settings.ANAGRAM_PHRASE_MAX_RESULTS)
+
+
+class PhraseAnagramsSerializer(serializers.Serializer):
+    phrases = serializers.ListField(child=serializers.CharField())
+    complete = serializers.BooleanField()
+
+
 class WordAnagramCountSerializer(serializers.Serializer):
     word = serializers.CharField(max_length=100)
     anagrams_count = serializers.IntegerField()
@@ -0,0 +1,210 @@
+"""Compact on-disk snapshot of the anagram index, memory-mapped by every worker.
+
+Built from the `Word` table by the `build_anagram_snapshot` command. Workers `mmap` the file read-only instead of
+loading the dictionary from Postgres, so opening it takes milliseconds and its pages live in the page cache once per
+host, shared by all workers. Lookups binary search the sorted signatures straight in the mapped file.
+
+Layout (native byte order, so build the snapshot on the host that reads it), every section 8 byte aligned:
+
+- header: magic, number of groups, number of words, highest word id (`HEADER`)
+- signature offsets: `groups + 1` uint32 offsets into the signature blob
+- group offsets: `groups + 1` uint32 positions in the word arrays, where each group's words start
+- word ids: `words` int64, grouped by signature and in `id` order within a group
+- proper noun flags: `words` uint8
+- word offsets: `words + 1` uint32 offsets into the word blob
+- signature blob: UTF-8 signatures sorted by their bytes
+- word blob: UTF-8 words
+"""
+
+import array
+import mmap
+import os
+import struct
+import tempfile
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from django.db.models import Count, Max
+
+from anagram.models import Word
+
+MAGIC = b"ANAGSNP1"
+HEADER = struct.Struct("=8sQQQ")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+@dataclass
+class SnapshotStats:
+    groups: int
+    words: int
+    max_word_id: int
+    size: int
+
+
+def _align(position: int) -> int:
+    return (position + 7) & ~7
+
+
+def _layout(groups: int, words: int, signature_bytes: int) -> list[int]:
+    """Start positions of the sections, followed by the position where the word blob starts."""
+    positions = []
+    position = HEADER.size
+    for size in (4 * (groups + 1), 4 * (groups + 1), 8 * words, words, 4 * (words + 1), signature_bytes):
+        positions.append(position)
+        position = _align(position + size)
+    positions.append(position)
+    return positions
+
+
+def dataset_fingerprint() -> tuple[int, int]:
+    """`(number of words, highest word id)`, used to tell whether a snapshot still matches the `Word` table."""
+    stats = Word.objects.aggregate(words=Count("id"), max_word_id=Max("id"))
+    return stats["words"], stats["max_word_id"] or 0
+
+
+def build_snapshot(path: str | os.PathLike) -> SnapshotStats:
+    """Write a snapshot of the `Word` table to `path`.
+
+    The file is written next to `path` and then renamed over it, so workers that have the old snapshot mapped keep
+    reading it until they reopen.
+    """
+    groups: dict[bytes, list[tuple[int, bytes, bool]]] = {}
+    max_word_id = 0
+    rows = Word.objects.order_by("id").values_list("id", "sorted_lowercase_word", "word", "is_proper_noun")
+    for pk, signature, word, is_proper_noun in rows.iterator(chunk_size=10_000):
+        groups.setdefault(signature.encode(), []).append((pk, word.encode(), is_proper_noun))
+        max_word_id = pk
+
+    signature_offsets, group_offsets, word_offsets = (
+        array.array("I", [0]),
+        array.array("I", [0]),
+        array.array("I", [0]),
+    )
+    word_ids, flags = array.array("q"), array.array("B")
+    signature_blob, word_blob = bytearray(), bytearray()
+    for signature in sorted(groups):
+        signature_blob += signature
+        signature_offsets.append(len(signature_blob))
+        for pk, word, is_proper_noun in groups[signature]:
+            word_ids.append(pk)
+            flags.append(is_proper_noun)
+            word_blob += word
+            word_offsets.append(len(word_blob))
+        group_offsets.append(len(word_ids))
+
+    positions = _layout(len(groups), len(word_ids), len(signature_blob))
+    sections = [signature_offsets, group_offsets, word_ids, flags, word_offsets, signature_blob, word_blob]
+    path = Path(path)
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", delete=False) as file:
+        try:
+            file.write(HEADER.pack(MAGIC, len(groups), len(word_ids), max_word_id))
+            for position, section in zip(positions, sections, strict=True):
+                file.write(b"\0" * (position - file.tell()))
+                file.write(section)
+            size = file.tell()
+            file.flush()
+            os.fsync(file.fileno())
+        except BaseException:
+            os.unlink(file.name)
+            raise
+    os.replace(file.name, path)
+    return SnapshotStats(groups=len(groups), words=len(word_ids), max_word_id=max_word_id, size=size)
+
+
+class AnagramSnapshot:
+    """Read-only view of a snapshot file, memory-mapped and searched in place."""
+
+    def __init__(self, path: str | os.PathLike):
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                raise SnapshotError(f"{path} is truncated.")
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: list[memoryview] = []
+        try:
+            magic, self.groups, self.words, self.max_word_id = HEADER.unpack_from(self._mmap)
+            if magic != MAGIC:
+                raise SnapshotError(f"{path} is not an anagram snapshot.")
+            groups, words = self.groups, self.words
+            self._check_size(path, HEADER.size + 4 * (groups + 1))
+            self._signature_offsets = self._section(HEADER.size, 4 * (groups + 1), "I")
+            positions = _layout(groups, words, self._signature_offsets[groups])
+            self._check_size(path, positions[5])
+            self._group_offsets = self._section(positions[1], 4 * (groups + 1), "I")
+            self._word_ids = self._section(positions[2], 8 * words, "q")
+            self._flags = self._section(positions[3], words, "B")
+            self._word_offsets = self._section(positions[4], 4 * (words + 1), "I")
+            self._signatures_start, self._words_start = positions[5], positions[6]
+            self._check_size(path, self._words_start + self._word_offsets[words])
+        except BaseException:
+            self.close()
+            raise
+
+    def _check_size(self, path, size: int) -> None:
+        if len(self._mmap) < size:
+            raise SnapshotError(f"{path} is truncated.")
+
+    def _section(self, start: int, size: int, item_format: str) -> memoryview:
+        """A section of the file as a typed array, without copying it."""
+        view = memoryview(self._mmap)[start : start + size]
+        self._views.append(view)
+        self._views.append(typed := view.cast(item_format))
+        return typed
+
+    @property
+    def fingerprint(self) -> tuple[int, int]:
+        """Same as `dataset_fingerprint` for the table the snapshot was built from."""
+        return self.words, self.max_word_id
+
+    def get_group(self, signature: str) -> list[tuple[int, str, bool]]:
+        """`(id, word, is_proper_noun)` of the words with the signature, in `id` order."""
+        target = signature.encode()
+        # Binary search with everything in locals, it runs ~18 steps per lookup on the whole dictionary.
+        data, offsets, start = self._mmap, self._signature_offsets, self._signatures_start
+        low, high = 0, self.groups
+        while low < high:
+            middle = (low + high) // 2
+            if data[start + offsets[middle] : start + offsets[middle + 1]] < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.groups or data[start + offsets[low] : start + offsets[low + 1]] != target:
+            return []
+        start = self._words_start
+        offsets = self._word_offsets
+        return [
+            (
+                self._word_ids[position],
+                self._mmap[start + offsets[position] : start + offsets[position + 1]].decode(),
+                bool(self._flags[position]),
+            )
+            for position in range(self._group_offsets[low], self._group_offsets[low + 1])
+        ]
+
+    def words_per_id_range(self, bits: int) -> dict[int, int]:
+        """Number of words per range of `2 ** bits` ids, keyed by `id >> bits`."""
+        id_ranges, counts = np.unique(np.frombuffer(self._word_ids, dtype=np.int64) >> bits, return_counts=True)
+        return dict(zip(id_ranges.tolist(), counts.tolist(), strict=True))
+
+    def ids_in_ranges(self, id_ranges: Iterable[int], bits: int) -> set[int]:
+        """Ids of the words in the given ranges of `2 ** bits` ids, see `words_per_id_range`."""
+        ids = np.frombuffer(self._word_ids, dtype=np.int64)
+        return set(ids[np.isin(ids >> bits, list(id_ranges))].tolist())
+
+    def signatures_of(self, word_ids: Iterable[int]) -> set[str]:
+        """Signatures of the groups holding any of the given words."""
+        positions = np.flatnonzero(np.isin(np.frombuffer(self._word_ids, dtype=np.int64), list(word_ids)))
+        groups = np.searchsorted(np.frombuffer(self._group_offsets, dtype=np.uint32), positions, side="right") - 1
+        data, offsets, start = self._mmap, self._signature_offsets, self._signatures_start
+        return {data[start + offsets[group] : start + offsets[group + 1]].decode() for group in groups.tolist()}
+
+    def close(self) -> None:
+        # The mapping can only be closed once no views point into it.
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
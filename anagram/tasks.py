@@ -0,0 +1,145 @@
+"""Heavy writes run in the background by a Celery worker, so they don't tie up HTTP workers for minutes.
+
+Views create a `Job` row and queue it with `enqueue_job`; `run_job` then runs it and records its progress, result and
+errors on the row, which `/jobs/<id>/` reports. Every job commits its work in batches, so progress is visible while it
+runs and the tables stay consistent at every commit.
+"""
+
+import logging
+from dataclasses import asdict
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from anagram.cache import bump_dataset_version
+from anagram.groups import delete_groups, rebuild_groups, release_groups
+from anagram.ingest import (
+    ImportSummary,
+    bump_indexed_dataset_version,
+    import_word_list,
+    on_words_created,
+    on_words_deleted,
+)
+from anagram.metrics import jobs_total
+from anagram.models import AnagramGroup, Job, Word
+from anagram.snapshot import build_snapshot
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_REFRESH_KEY = "anagram:snapshot-refresh"
+
+
+def enqueue_job(job: Job) -> None:
+    """Queue a saved job once the current transaction commits, so the worker is sure to find its row."""
+    transaction.on_commit(lambda: run_job.delay(str(job.pk)))
+
+
+def _update(job: Job, **fields) -> None:
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.save(update_fields=list(fields))
+
+
+def import_words(job: Job) -> dict:
+    """Import the uploaded word list (see `import_word_list`), counting lines read as progress."""
+
+    def on_progress(summary: ImportSummary) -> None:
+        _update(job, processed=summary.lines, result=asdict(summary))
+
+    with job.upload.open("rb") as file:
+        summary = import_word_list(
+            file, batch_size=settings.ANAGRAM_IMPORT_BATCH_SIZE, on_insert=on_words_created, on_progress=on_progress
+        )
+    _update(job, processed=summary.lines)
+    return asdict(summary)
+
+
+def delete_words(job: Job) -> dict:
+    """Delete all words, a batch of `ANAGRAM_DELETE_BATCH_SIZE` per transaction, shrinking their groups as it goes."""
+    _update(job, total=Word.objects.count())
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Word.objects.order_by("id").values_list("id", "sorted_lowercase_word", "group_id")[
+                    : settings.ANAGRAM_DELETE_BATCH_SIZE
+                ]
+            )
+            if not rows:
+                break
+            Word.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+            release_groups(group_id for _, _, group_id in rows)
+            on_words_deleted([(pk, signature) for pk, signature, _ in rows])
+        deleted += len(rows)
+        _update(job, processed=deleted)
+    with transaction.atomic():
+        # Groups emptied above are already gone, this drops the ones that never got a word. Words added since the last
+        # batch (and their groups) are kept, as are the in-process indexes, which the batches kept up to date.
+        delete_groups(AnagramGroup.objects.filter(~Exists(Word.objects.filter(group=OuterRef("pk")))))
+        transaction.on_commit(bump_indexed_dataset_version)
+    return {"deleted": deleted}
+
+
+def rebuild_anagram_groups(job: Job) -> dict:
+    """Rebuild the anagram groups from the words (see `rebuild_groups`), in a single transaction."""
+    with transaction.atomic():
+        created = rebuild_groups()
+        transaction.on_commit(bump_dataset_version)
+    _update(job, processed=created, total=created)
+    return {"groups": created}
+
+
+JOB_RUNNERS = {
+    Job.Kind.IMPORT_WORDS: import_words,
+    Job.Kind.DELETE_WORDS: delete_words,
+    Job.Kind.REBUILD_GROUPS: rebuild_anagram_groups,
+}
+
+
+@shared_task
+def run_job(job_id: str) -> None:
+    """Run a pending job, recording when it started and finished, and its result or error."""
+    job = Job.objects.get(pk=job_id)
+    if job.status != Job.Status.PENDING:
+        logger.warning("Job %s is already %s, not running it again.", job.pk, job.status)
+        return
+    _update(job, status=Job.Status.RUNNING, started_at=timezone.now())
+    try:
+        result = JOB_RUNNERS[job.kind](job)
+    except Exception as exc:
+        logger.exception("Job %s failed.", job.pk)
+        _update(job, status=Job.Status.FAILED, error=f"{type(exc).__name__}: {exc}", finished_at=timezone.now())
+    else:
+        _update(job, status=Job.Status.SUCCEEDED, result=result, finished_at=timezone.now())
+    finally:
+        jobs_total.inc(kind=job.kind, status=job.status)
+        if job.upload:
+            job.upload.delete(save=False)
+            _update(job, upload="")
+
+
+def schedule_snapshot_refresh() -> None:
+    """Queue a `refresh_snapshot` in `ANAGRAM_SNAPSHOT_REFRESH_DELAY` seconds unless one is queued already, so a burst
+    of writes rewrites the snapshot once. Call it once the write is committed."""
+    if not settings.ANAGRAM_SNAPSHOT_PATH:
+        return
+    delay = settings.ANAGRAM_SNAPSHOT_REFRESH_DELAY
+    # The key expires on its own in case the queued task gets lost.
+    if caches[settings.ANAGRAM_CACHE_ALIAS].add(SNAPSHOT_REFRESH_KEY, True, timeout=delay + 600):
+        refresh_snapshot.apply_async(countdown=delay)
+
+
+@shared_task
+def refresh_snapshot() -> None:
+    """Rewrite the snapshot at `ANAGRAM_SNAPSHOT_PATH` from the `Word` table. Workers pick it up on their next index
+    build, until then they read the words changed since their snapshot from the database."""
+    # Writes committed from now on may not make it into the file, let them queue another refresh.
+    caches[settings.ANAGRAM_CACHE_ALIAS].delete(SNAPSHOT_REFRESH_KEY)
+    if not settings.ANAGRAM_SNAPSHOT_PATH:
+        return
+    stats = build_snapshot(settings.ANAGRAM_SNAPSHOT_PATH)
+    logger.info("Refreshed the anagram snapshot: %d words in %d groups.", stats.words, stats.groups)
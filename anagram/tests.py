@@ -1,8 +1,56 @@
+import asyncio
+import csv
+import gzip
+import importlib
+import io
+import itertools
+import json
+import os
+import random
+import string
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from decimal import Decimal
+from types import SimpleNamespace
+from urllib.parse import unquote
+
+import brotli
+import msgpack
 import pytest
-from django.urls import reverse
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, resolve, reverse
 from model_bakery.baker import make
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.utils.serializer_helpers import ReturnList
+from rest_framework.viewsets import GenericViewSet
 
-from anagram.models import Word
+from anagram import export, metrics, phrases, tasks, views
+from anagram.budgets import QueryBudget
+from anagram.cache import bump_dataset_version, cached_response, dataset_version, single_flight
+from anagram.compression import choose_encoding
+from anagram.groups import check_groups, delete_groups, deletion_signatures, link_groups
+from anagram.helpers import calculate_median
+from anagram.index import anagram_index
+from anagram.ingest import build_word, copy_words, insert_words
+from anagram.letters import letter_index
+from anagram.models import AnagramGroup, AnagramGroupDeletion, Job, Word
+from anagram.pagination import AnagramGroupCursorPagination
+from anagram.renderers import MessagePackRenderer, ORJSONRenderer
+from anagram.routers import primary_reads, replica_reads
+from anagram.snapshot import AnagramSnapshot, SnapshotError, build_snapshot, dataset_fingerprint
+from anagram.views import AnagramViewSet, WordAPIView, WordViewSet
 
 
 @pytest.mark.django_db
@@ -29,6 +77,48 @@ class TestWordBasicCRUDAPI:
         assert Word.objects.count() == 3
         assert Word.objects.filter(word="foo").exists()
 
+    def test_bulk_add_words_to_corpus(self, client, django_assert_max_num_queries):
+        # Setup.
+        make(Word, word="foo")
+        payload = {"anagrams": ["foo", "bar", "Baz", "bar", "oof"]}
+
+        # Do.
+        url = f"{reverse('words')}?bulk=true"
+        with django_assert_max_num_queries(8):
+            response = client.post(url, payload, content_type="application/json")
+
+        # Check.
+        assert response.status_code == 201
+        assert response.data == {"inserted": 3, "skipped": 2}
+        assert Word.objects.count() == 4
+        baz = Word.objects.get(word="Baz")
+        assert (baz.sorted_word, baz.sorted_lowercase_word, baz.is_proper_noun, baz.length) == ("Baz", "abz", True, 3)
+
+    def test_bulk_add_words_keeps_groups_consistent(self, client):
+        # Setup.
+        copy_words(["read", "foo"])
+
+        # Do.
+        response = client.post(
+            reverse("words"),
+            {"anagrams": ["dear", "bar", "Dare", "rab", "read", "bar"]},
+            content_type="application/json",
+        )
+
+        # Check: existing groups grew, new ones were created with their count and deletions.
+        assert response.status_code == 201
+        assert list(Word.objects.order_by("pk").values_list("word", flat=True)) == [
+            "read",
+            "foo",
+            "dear",
+            "bar",
+            "Dare",
+            "rab",
+        ]
+        assert AnagramGroup.objects.get(signature="ader").count == 3
+        assert AnagramGroup.objects.get(signature="abr").count == 2
+        assert not check_groups()
+
     def test_delete_all_words_from_corpus(self, client):
         # Setup.
         make(Word, _quantity=3)
@@ -180,6 +270,16 @@ class TestWordAdvancedAPI:
         assert response.data["median_word_length"] == test["expected"]["median_word_length"]
         assert response.data["average_word_length"] == test["expected"]["average_word_length"]
 
+    def test_get_corpus_length_stats_runs_a_single_query(self, client, django_assert_num_queries):
+        # Setup.
+        self._setup_words(client, ["fo", "bard", "bazinga", "ofo", "rab", "zab", "oof", "successful"])
+
+        # Do & Check: only the histogram query, read views run outside of a transaction.
+        url = reverse("words-get-word-length-statistics")
+        with django_assert_num_queries(1):
+            response = client.get(url, content_type="application/json")
+        assert response.data["median_word_length"] == 3.0
+
     @pytest.mark.parametrize(
         "test",
         [
@@ -443,3 +543,2653 @@ class TestWordAdvancedAPI:
         assert not Word.objects.filter(word="Foo").exists()
         assert Word.objects.filter(word="bar").exists()
         assert Word.objects.filter(word="zab").exists()
+
+
+@pytest.mark.django_db
+class TestAnagramIndex:
+    @pytest.fixture(autouse=True)
+    def _enable_index(self, settings):
+        settings.ANAGRAM_INDEX_ENABLED = True
+        anagram_index.reset()
+        yield
+        anagram_index.reset()
+
+    @staticmethod
+    def _setup_words(client, words, django_capture_on_commit_callbacks):
+        """Helper method to set up words in the database."""
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse("words"), {"anagrams": words}, content_type="application/json")
+        assert Word.objects.count() == len(words)
+        return words
+
+    @staticmethod
+    def _get_anagrams(client, word, query=""):
+        url = reverse("anagrams-get-anagrams-for-word", kwargs={"word": word})
+        response = client.get(f"{url}{query}", content_type="application/json")
+        assert response.status_code == 200, response.data
+        return response.data["anagrams"]
+
+    @pytest.mark.parametrize(
+        "word,query",
+        [
+            ("food", ""),
+            ("Food", ""),
+            ("oof", ""),
+            ("zzz", ""),
+            ("food", "?limit=1"),
+            ("food", "?limit=0"),
+            ("food", "?exclude_proper_nouns=true"),
+            ("food", "?exclude_proper_nouns=false"),
+            ("doof", "?exclude_proper_nouns=true&limit=1"),
+        ],
+    )
+    def test_index_matches_database(self, client, settings, django_capture_on_commit_callbacks, word, query):
+        # Setup.
+        self._setup_words(
+            client, ["food", "Food", "Doof", "doof", "rab", "zab", "oof"], django_capture_on_commit_callbacks
+        )
+
+        # Do.
+        from_index = self._get_anagrams(client, word, query)
+        settings.ANAGRAM_INDEX_ENABLED = False
+        from_database = self._get_anagrams(client, word, query)
+
+        # Check.
+        assert from_index == from_database
+
+    def test_index_is_built_once_and_serves_without_word_queries(self, client):
+        # Setup.
+        make(Word, word="dear", sorted_lowercase_word="ader")
+        make(Word, word="read", sorted_lowercase_word="ader")
+
+        # Do & Check.
+        assert self._get_anagrams(client, "dare") == ["dear", "read"]
+        assert anagram_index.is_built
+        with CaptureQueriesContext(connection) as queries:
+            assert self._get_anagrams(client, "dear") == ["read"]
+        assert not [query for query in queries if "anagram_word" in query["sql"]]
+
+    def test_index_follows_writes(self, client, django_capture_on_commit_callbacks):
+        # Setup.
+        self._setup_words(client, ["foo", "ofo", "oof", "bar", "rab"], django_capture_on_commit_callbacks)
+        assert self._get_anagrams(client, "foo") == ["ofo", "oof"]
+
+        # Do & Check: add.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse("words"), {"anagrams": ["Foo", "foo"]}, content_type="application/json")
+        assert self._get_anagrams(client, "foo") == ["ofo", "oof", "Foo"]
+
+        # Do & Check: delete single word.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.delete(reverse("words-delete-word", kwargs={"word": "ofo"}))
+        assert self._get_anagrams(client, "foo") == ["oof", "Foo"]
+
+        # Do & Check: delete word and its anagrams.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.delete(reverse("anagrams-delete-word-and-anagrams", kwargs={"word": "bar"}))
+        assert self._get_anagrams(client, "bar") == []
+        assert self._get_anagrams(client, "foo") == ["oof", "Foo"]
+
+        # Do & Check: delete all.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.delete(reverse("words"))
+        assert self._get_anagrams(client, "foo") == []
+        assert anagram_index.is_built
+
+    def test_own_writes_dont_rebuild_the_index(self, client, django_capture_on_commit_callbacks):
+        # Setup.
+        self._setup_words(client, ["foo", "ofo"], django_capture_on_commit_callbacks)
+        self._get_anagrams(client, "foo")
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse("words"), {"anagrams": ["oof"]}, content_type="application/json")
+
+        # Do.
+        with CaptureQueriesContext(connection) as queries:
+            anagrams = self._get_anagrams(client, "foo")
+
+        # Check.
+        assert anagrams == ["ofo", "oof"]
+        assert not [query for query in queries if "anagram_word" in query["sql"]]
+
+    @pytest.mark.parametrize("url", ["anagrams-get-anagrams-for-word", "anagrams-get-anagrams-for-words"])
+    def test_writes_of_other_processes_rebuild_the_index(self, client, url):
+        # Setup.
+        copy_words(["foo", "ofo"])
+        assert self._get_anagrams(client, "foo") == ["ofo"]
+
+        # Do: words written by another process only bump the dataset version in the shared cache.
+        copy_words(["oof"])
+        bump_dataset_version()
+        if url == "anagrams-get-anagrams-for-word":
+            anagrams = self._get_anagrams(client, "foo")
+        else:
+            response = client.post(reverse(url), {"words": ["foo"]}, content_type="application/json")
+            anagrams = response.data["results"][0]["anagrams"]
+
+        # Check.
+        assert anagrams == ["ofo", "oof"]
+
+
+@pytest.mark.django_db
+class TestAnagramSnapshot:
+    words = ["read", "dear", "Dare", "café", "face", "Ecaf", "zzz", "a", "Read"]
+
+    @pytest.fixture
+    def snapshot_path(self, settings, tmp_path):
+        settings.ANAGRAM_SNAPSHOT_PATH = tmp_path / "anagram-index.snapshot"
+        anagram_index.reset()
+        yield settings.ANAGRAM_SNAPSHOT_PATH
+        anagram_index.reset()
+
+    def test_snapshot_matches_database(self, snapshot_path):
+        # Setup.
+        copy_words(self.words)
+
+        # Do.
+        stats = build_snapshot(snapshot_path)
+        snapshot = AnagramSnapshot(snapshot_path)
+
+        # Check.
+        assert (stats.words, stats.groups) == (len(self.words), 5)
+        assert snapshot.fingerprint == dataset_fingerprint()
+        for signature in ["ader", "acfé", "acef", "zzz", "a", "", "b", "zzzz", "ébc"]:
+            expected = list(
+                Word.objects.filter(sorted_lowercase_word=signature).values_list("id", "word", "is_proper_noun")
+            )
+            assert snapshot.get_group(signature) == expected
+        snapshot.close()
+
+    def test_empty_snapshot(self, snapshot_path):
+        # Do.
+        build_snapshot(snapshot_path)
+
+        # Check.
+        assert AnagramSnapshot(snapshot_path).get_group("ader") == []
+
+    def test_index_is_served_from_snapshot(self, snapshot_path):
+        # Setup.
+        copy_words(self.words)
+        build_snapshot(snapshot_path)
+
+        # Do.
+        with CaptureQueriesContext(connection) as queries:
+            anagram_index.build()
+
+        # Check: a single aggregate query checks the snapshot is up to date, no words are loaded.
+        assert len(queries) == 1
+        assert "COUNT" in queries[0]["sql"]
+        assert anagram_index.get_anagrams("dare") == ["read", "dear", "Dare", "Read"]
+        assert anagram_index.get_anagrams("read", exclude_proper_nouns=True, limit=1) == ["dear"]
+        assert anagram_index.get_anagrams("face") == ["Ecaf"]
+        assert anagram_index.get_anagrams("éfac") == ["café"]
+
+    def test_index_follows_writes_over_snapshot(self, client, snapshot_path, django_capture_on_commit_callbacks):
+        # Setup.
+        copy_words(["foo", "ofo", "oof", "bar", "rab"])
+        build_snapshot(snapshot_path)
+        assert anagram_index.get_anagrams("foo") == ["ofo", "oof"]
+
+        # Do & Check: add.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse("words"), {"anagrams": ["Foo", "foo"]}, content_type="application/json")
+        assert anagram_index.get_anagrams("foo") == ["ofo", "oof", "Foo"]
+
+        # Do & Check: delete single word.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.delete(reverse("words-delete-word", kwargs={"word": "ofo"}))
+        assert anagram_index.get_anagrams("foo") == ["oof", "Foo"]
+
+        # Do & Check: delete word and its anagrams.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.delete(reverse("anagrams-delete-word-and-anagrams", kwargs={"word": "bar"}))
+        assert anagram_index.get_anagrams("bar") == []
+
+        # Do & Check: delete all.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.delete(reverse("words"))
+        assert anagram_index.get_anagrams("foo") == []
+        assert anagram_index.is_built
+
+    def test_index_reads_changes_since_snapshot(self, snapshot_path):
+        # Setup.
+        copy_words(["read", "dear", "dare", "zzz", "abc", "cab", "face"])
+        build_snapshot(snapshot_path)
+        Word.objects.filter(word__in=["dear", "zzz", "abc"]).delete()
+        copy_words(["Read", "bca", "xyz"])
+
+        # Do.
+        with CaptureQueriesContext(connection) as queries:
+            anagram_index.build()
+
+        # Check: one aggregate, the signatures of the added words, the words per id range, the ids in the ranges that
+        # lost words, then the changed groups. The other groups still come from the snapshot.
+        assert len(queries) == 5
+        assert anagram_index.get_anagrams("read") == ["dare", "Read"]
+        assert anagram_index.get_anagrams("zzz") == []
+        assert anagram_index.get_anagrams("abc") == ["cab", "bca"]
+        assert anagram_index.get_anagrams("zyx") == ["xyz"]
+        assert anagram_index.get_anagrams("cafe") == ["face"]
+
+    def test_snapshot_without_any_word_left_is_ignored(self, snapshot_path):
+        # Setup.
+        copy_words(["read", "dear"])
+        build_snapshot(snapshot_path)
+        Word.objects.all().delete()
+        copy_words(["dare", "read"])
+
+        # Do.
+        anagram_index.build()
+
+        # Check.
+        assert anagram_index.get_anagrams("dear") == ["dare", "read"]
+
+    def test_writes_refresh_snapshot(self, client, snapshot_path, django_capture_on_commit_callbacks):
+        # Setup.
+        copy_words(["read", "dear"])
+        build_snapshot(snapshot_path)
+
+        # Do: Celery runs the refresh straight away in tests.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse("words"), {"anagrams": ["dare"]}, content_type="application/json")
+        with django_capture_on_commit_callbacks(execute=True):
+            client.delete(reverse("words-delete-word", kwargs={"word": "read"}))
+
+        # Check.
+        snapshot = AnagramSnapshot(snapshot_path)
+        assert snapshot.fingerprint == dataset_fingerprint()
+        assert [word for _, word, _ in snapshot.get_group("ader")] == ["dear", "dare"]
+        snapshot.close()
+
+    def test_snapshot_refresh_is_queued_once_per_burst(self, settings, snapshot_path, monkeypatch):
+        # Setup.
+        queued = []
+        monkeypatch.setattr(tasks.refresh_snapshot, "apply_async", lambda **kwargs: queued.append(kwargs))
+        cache.delete(tasks.SNAPSHOT_REFRESH_KEY)
+
+        # Do.
+        tasks.schedule_snapshot_refresh()
+        tasks.schedule_snapshot_refresh()
+        tasks.refresh_snapshot()
+        tasks.schedule_snapshot_refresh()
+
+        # Check: a write committed while the refresh runs queues another one.
+        delay = settings.ANAGRAM_SNAPSHOT_REFRESH_DELAY
+        assert queued == [{"countdown": delay}, {"countdown": delay}]
+        assert AnagramSnapshot(snapshot_path).words == 0
+        cache.delete(tasks.SNAPSHOT_REFRESH_KEY)
+
+    def test_load_dictionary_writes_snapshot(self, snapshot_path, tmp_path):
+        # Setup.
+        path = tmp_path / "dictionary.txt"
+        path.write_text("read\ndear\n")
+
+        # Do.
+        call_command("load_dictionary", str(path), stdout=io.StringIO())
+
+        # Check.
+        assert AnagramSnapshot(snapshot_path).fingerprint == dataset_fingerprint()
+
+    @pytest.mark.parametrize("content", [b"", b"not a snapshot at all, just some text", b"truncate"])
+    def test_broken_snapshot_is_ignored(self, snapshot_path, content):
+        # Setup.
+        copy_words(["read", "dear"])
+        build_snapshot(snapshot_path)
+        if content == b"truncate":
+            content = snapshot_path.read_bytes()[:-1]
+        snapshot_path.write_bytes(content)
+
+        # Do.
+        with pytest.raises(SnapshotError):
+            AnagramSnapshot(snapshot_path)
+        anagram_index.build()
+
+        # Check.
+        assert anagram_index.get_anagrams("read") == ["dear"]
+
+    def test_missing_snapshot_is_ignored(self, snapshot_path):
+        # Setup.
+        copy_words(["read", "dear"])
+
+        # Do.
+        anagram_index.build()
+
+        # Check.
+        assert anagram_index.get_anagrams("read") == ["dear"]
+
+    def test_command(self, settings, snapshot_path):
+        # Setup.
+        copy_words(["read", "dear"])
+        output = io.StringIO()
+
+        # Do.
+        call_command("build_anagram_snapshot", stdout=output)
+
+        # Check.
+        assert "Wrote 2 words in 1 anagram groups" in output.getvalue()
+        assert AnagramSnapshot(snapshot_path).get_group("ader") == list(
+            Word.objects.values_list("id", "word", "is_proper_noun")
+        )
+        settings.ANAGRAM_SNAPSHOT_PATH = None
+        with pytest.raises(CommandError):
+            call_command("build_anagram_snapshot")
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+    @pytest.fixture(autouse=True)
+    def _enable_cache(self, settings):
+        settings.ANAGRAM_CACHE_ENABLED = True
+        cache.clear()
+        cached_response.reset_stats()
+        yield
+        cache.clear()
+        cached_response.reset_stats()
+
+    @staticmethod
+    def _write(client, django_capture_on_commit_callbacks, method, url, payload=None):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = getattr(client, method)(url, payload, content_type="application/json")
+        assert response.status_code in (201, 204)
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            reverse("words-get-word-length-statistics"),
+            reverse("words-get-biggest-anagram-group"),
+            f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=2",
+            reverse("anagrams-get-anagrams-for-word", kwargs={"word": "foo"}),
+        ],
+    )
+    def test_repeated_reads_are_served_from_cache(self, client, url):
+        # Setup.
+        make(Word, word="foo", sorted_lowercase_word="foo")
+        make(Word, word="oof", sorted_lowercase_word="foo")
+        call_command("rebuild_anagram_groups", stdout=io.StringIO())
+        first = client.get(url)
+
+        # Do.
+        with CaptureQueriesContext(connection) as queries:
+            second = client.get(url)
+
+        # Check.
+        assert first.status_code == second.status_code == 200
+        assert second.data == first.data
+        assert not [query for query in queries if "anagram_" in query["sql"]]
+        assert (cached_response.stats.hits, cached_response.stats.misses) == (1, 1)
+
+    def test_async_responses_keep_their_content_type(self):
+        # Setup.
+        class View:
+            @cached_response
+            async def get(self, request):
+                return HttpResponse(msgpack.packb(["foo"]), content_type="application/msgpack")
+
+        async_to_sync(View().get)(RequestFactory().get("/msgpack/"))
+
+        # Do.
+        response = async_to_sync(View().get)(RequestFactory().get("/msgpack/"))
+
+        # Check.
+        assert response["Content-Type"] == "application/msgpack"
+        assert msgpack.unpackb(response.content) == ["foo"]
+        assert (cached_response.stats.hits, cached_response.stats.misses) == (1, 1)
+
+    def test_media_type_is_part_of_the_key(self, client):
+        # Setup.
+        make(Word, word="foo", sorted_lowercase_word="foo")
+        make(Word, word="oof", sorted_lowercase_word="foo")
+        url = reverse("anagrams-get-anagrams-for-word", kwargs={"word": "foo"})
+        client.get(url)
+
+        # Do.
+        response = client.get(url, HTTP_ACCEPT="application/msgpack")
+
+        # Check.
+        assert msgpack.unpackb(response.content) == {"anagrams": ["oof"]}
+        assert (cached_response.stats.hits, cached_response.stats.misses) == (0, 2)
+
+    def test_query_parameters_are_part_of_the_key(self, client):
+        # Setup.
+        make(Word, word="foo", sorted_lowercase_word="foo")
+        make(Word, word="Oof", sorted_lowercase_word="foo", is_proper_noun=True)
+        url = reverse("anagrams-get-anagrams-for-word", kwargs={"word": "ofo"})
+
+        # Do & Check.
+        assert client.get(url).data["anagrams"] == ["foo", "Oof"]
+        assert client.get(f"{url}?exclude_proper_nouns=true").data["anagrams"] == ["foo"]
+        assert client.get(f"{url}?limit=1").data["anagrams"] == ["foo"]
+        assert cached_response.stats.misses == 3
+
+    def test_errors_are_not_cached(self, client):
+        # Do.
+        url = f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=1"
+        responses = [client.get(url), client.get(url)]
+
+        # Check.
+        assert [response.status_code for response in responses] == [400, 400]
+        assert cached_response.stats.misses == 2
+
+    def test_writes_invalidate_cached_responses(self, client, django_capture_on_commit_callbacks):
+        # Setup.
+        stats_url = reverse("words-get-word-length-statistics")
+        biggest_url = reverse("words-get-biggest-anagram-group")
+        anagrams_url = reverse("anagrams-get-anagrams-for-word", kwargs={"word": "foo"})
+        self._write(client, django_capture_on_commit_callbacks, "post", reverse("words"), {"anagrams": ["foo", "bar"]})
+        assert client.get(stats_url).data["total_words"] == 2
+        assert client.get(anagrams_url).data["anagrams"] == []
+
+        # Do & Check: add.
+        payload = {"anagrams": ["oof", "ofo"]}
+        self._write(client, django_capture_on_commit_callbacks, "post", f"{reverse('words')}?bulk=true", payload)
+        assert client.get(stats_url).data["total_words"] == 4
+        assert client.get(biggest_url).data == {"count": 3, "words": ["foo", "oof", "ofo"]}
+        assert client.get(anagrams_url).data["anagrams"] == ["oof", "ofo"]
+
+        # Do & Check: delete single word.
+        url = reverse("words-delete-word", kwargs={"word": "ofo"})
+        self._write(client, django_capture_on_commit_callbacks, "delete", url)
+        assert client.get(stats_url).data["total_words"] == 3
+        assert client.get(anagrams_url).data["anagrams"] == ["oof"]
+
+        # Do & Check: delete word and its anagrams.
+        url = reverse("anagrams-delete-word-and-anagrams", kwargs={"word": "foo"})
+        self._write(client, django_capture_on_commit_callbacks, "delete", url)
+        assert client.get(biggest_url).data == {"count": 1, "words": ["bar"]}
+
+        # Do & Check: delete all.
+        self._write(client, django_capture_on_commit_callbacks, "delete", reverse("words"))
+        assert client.get(stats_url).data["total_words"] == 0
+        assert cached_response.stats.hits == 0
+
+    def test_commands_bump_dataset_version(self, tmp_path, django_capture_on_commit_callbacks):
+        # Setup.
+        path = tmp_path / "dictionary.txt"
+        path.write_text("dear\nread\n", encoding="utf-8")
+        versions = [dataset_version()]
+
+        # Do.
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command("load_dictionary", str(path), stdout=io.StringIO())
+        versions.append(dataset_version())
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command("rebuild_anagram_groups", stdout=io.StringIO())
+        versions.append(dataset_version())
+
+        # Check.
+        assert versions[0] < versions[1] < versions[2]
+
+    def test_evicted_version_is_never_reused(self):
+        # Setup.
+        version = dataset_version()
+
+        # Do.
+        cache.clear()
+
+        # Check.
+        assert dataset_version() > version
+
+    def test_cache_statistics(self, client):
+        # Setup.
+        url = reverse("words-get-biggest-anagram-group")
+        client.get(url)
+        client.get(url)
+
+        # Do.
+        response = client.get(reverse("words-get-cache-statistics"))
+
+        # Check.
+        assert response.status_code == 200
+        assert response.data == {"enabled": True, "dataset_version": dataset_version(), "hits": 1, "misses": 1}
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    @pytest.fixture(autouse=True)
+    def _enable_etags(self, settings):
+        settings.ANAGRAM_ETAG_ENABLED = True
+        cache.clear()
+        yield
+        cache.clear()
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            reverse("words-get-word-length-statistics"),
+            reverse("words-get-biggest-anagram-group"),
+            f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=2",
+            reverse("anagrams-get-anagrams-for-word", kwargs={"word": "foo"}),
+        ],
+    )
+    def test_matching_etag_skips_the_view(self, client, url):
+        # Setup.
+        make(Word, word="foo", sorted_lowercase_word="foo")
+        make(Word, word="oof", sorted_lowercase_word="foo")
+        call_command("rebuild_anagram_groups", stdout=io.StringIO())
+        etag = client.get(url)["ETag"]
+
+        # Do.
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        # Check.
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+        assert not response.content
+        assert not [query for query in queries if "anagram_" in query["sql"]]
+
+    def test_etag_depends_on_query_parameters(self, client):
+        # Setup.
+        url = reverse("words-get-anagram-groups-of-at-least-size-x")
+        etag = client.get(f"{url}?min_group_size=2")["ETag"]
+
+        # Do.
+        response = client.get(f"{url}?min_group_size=3", HTTP_IF_NONE_MATCH=etag)
+
+        # Check.
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+
+    def test_etag_depends_on_media_type(self, client):
+        # Setup.
+        url = reverse("words-get-word-length-statistics")
+        etag = client.get(url)["ETag"]
+
+        # Do.
+        response = client.get(url, HTTP_ACCEPT="application/msgpack", HTTP_IF_NONE_MATCH=etag)
+
+        # Check.
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/msgpack"
+        assert "Accept" in response["Vary"]
+        assert response["ETag"] != etag
+        assert (
+            client.get(url, HTTP_ACCEPT="application/msgpack", HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+        )
+
+    def test_writes_change_the_etag(self, client, django_capture_on_commit_callbacks):
+        # Setup.
+        url = reverse("words-get-word-length-statistics")
+        etag = client.get(url)["ETag"]
+
+        # Do.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse("words"), {"anagrams": ["foo"]}, content_type="application/json")
+        response = client.get(url, HTTP_IF_NONE_MATCH=f'"other", {etag}')
+
+        # Check.
+        assert response.status_code == 200
+        assert response.data["total_words"] == 1
+        assert response["ETag"] != etag
+        assert client.get(url, HTTP_IF_NONE_MATCH=f'"other", {response["ETag"]}').status_code == 304
+
+    def test_errors_have_no_etag(self, client):
+        # Do.
+        response = client.get(f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=1")
+
+        # Check.
+        assert response.status_code == 400
+        assert not response.has_header("ETag")
+
+    def test_disabled(self, client, settings):
+        # Setup.
+        settings.ANAGRAM_ETAG_ENABLED = False
+
+        # Do.
+        response = client.get(reverse("words-get-word-length-statistics"), HTTP_IF_NONE_MATCH="*")
+
+        # Check.
+        assert response.status_code == 200
+        assert not response.has_header("ETag")
+
+
+class TestSingleFlight:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+
+    @staticmethod
+    def _view(calls: list, delay: float = 0.2, fail: bool = False):
+        """A slow view counting its calls."""
+
+        class View:
+            @single_flight
+            def get(self, request):
+                calls.append(request)
+                time.sleep(delay)
+                if fail:
+                    raise ValueError("Boom.")
+                return Response({"calls": len(calls)})
+
+        return View()
+
+    def test_concurrent_requests_run_the_view_once(self):
+        # Setup.
+        calls = []
+        view = self._view(calls)
+        before = metrics.coalesced_requests_total.value(source="process")
+
+        # Do.
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(lambda _: view.get(RequestFactory().get("/stats/")), range(8)))
+
+        # Check.
+        assert len(calls) == 1
+        assert [response.data for response in responses] == [{"calls": 1}] * 8
+        assert metrics.coalesced_requests_total.value(source="process") == before + 7
+
+    def test_different_requests_are_not_coalesced(self):
+        # Setup.
+        calls = []
+        view = self._view(calls)
+
+        # Do.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(lambda url: view.get(RequestFactory().get(url)), ["/stats/?a=1", "/stats/?a=2"]))
+
+        # Check.
+        assert len(calls) == 2
+
+    def test_requests_run_the_view_themselves_when_the_leader_fails(self):
+        # Setup.
+        calls = []
+        view = self._view(calls, fail=True)
+
+        # Do.
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(view.get, RequestFactory().get("/stats/")) for _ in range(3)]
+
+        # Check.
+        assert len(calls) == 3
+        assert all(isinstance(future.exception(), ValueError) for future in futures)
+
+    def test_response_of_another_process_is_shared(self):
+        # Setup: another process holds the lock and has published its response.
+        calls = []
+        view = self._view(calls)
+        request = RequestFactory().get("/stats/")
+        key = single_flight.make_key("TestSingleFlight._view.<locals>.View.get", request)
+        cache.set(f"{key}:lock", "other")
+        cache.set(f"{key}:other", {"calls": 42})
+        before = metrics.coalesced_requests_total.value(source="cache")
+
+        # Do.
+        response = view.get(request)
+
+        # Check.
+        assert calls == []
+        assert response.data == {"calls": 42}
+        assert metrics.coalesced_requests_total.value(source="cache") == before + 1
+
+    def test_lock_of_another_process_that_expires_without_a_response(self, settings):
+        # Setup.
+        settings.ANAGRAM_COALESCE_POLL_INTERVAL = 0.01
+        calls = []
+        view = self._view(calls, delay=0)
+        request = RequestFactory().get("/stats/")
+        key = single_flight.make_key("TestSingleFlight._view.<locals>.View.get", request)
+        cache.set(f"{key}:lock", "other", timeout=0.1)
+
+        # Do.
+        response = view.get(request)
+
+        # Check.
+        assert len(calls) == 1
+        assert response.data == {"calls": 1}
+        assert cache.get(f"{key}:lock") is None
+
+    def test_concurrent_coroutines_run_the_view_once(self):
+        # Setup.
+        calls = []
+
+        class View:
+            @single_flight
+            async def get(self, request):
+                calls.append(request)
+                await asyncio.sleep(0.1)
+                return HttpResponse(b'{"calls": 1}', content_type="application/json")
+
+        async def get_all():
+            return await asyncio.gather(*(View().get(RequestFactory().get("/stats/")) for _ in range(5)))
+
+        # Do.
+        responses = async_to_sync(get_all)()
+
+        # Check.
+        assert len(calls) == 1
+        assert [response.content for response in responses] == [b'{"calls": 1}'] * 5
+
+    def test_disabled(self, settings):
+        # Setup.
+        settings.ANAGRAM_COALESCE_ENABLED = False
+        calls = []
+        view = self._view(calls, delay=0.1)
+
+        # Do.
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            list(executor.map(lambda _: view.get(RequestFactory().get("/stats/")), range(3)))
+
+        # Check.
+        assert len(calls) == 3
+
+
+@pytest.mark.django_db
+class TestBatchAnagrams:
+    url = reverse("anagrams-get-anagrams-for-words")
+
+    @pytest.fixture(autouse=True)
+    def _words(self):
+        for word in ["foo", "Oof", "ofo", "bar", "rab", "baz"]:
+            make(Word, word=word, sorted_lowercase_word="".join(sorted(word.lower())), is_proper_noun=word.istitle())
+
+    @pytest.mark.parametrize("index_enabled", [False, True])
+    @pytest.mark.parametrize(
+        "query,expected",
+        [
+            ("", {"foo": ["Oof", "ofo"], "abr": ["bar", "rab"], "zzz": [], "rab": ["bar"]}),
+            ("?limit=1", {"foo": ["Oof"], "abr": ["bar"], "zzz": [], "rab": ["bar"]}),
+            ("?exclude_proper_nouns=true", {"foo": ["ofo"], "abr": ["bar", "rab"], "zzz": [], "rab": ["bar"]}),
+        ],
+    )
+    def test_batch_matches_single_word_lookups(self, client, settings, index_enabled, query, expected):
+        # Setup.
+        settings.ANAGRAM_INDEX_ENABLED = index_enabled
+        anagram_index.reset()
+        payload = {"words": ["foo", "abr", "zzz", "rab"]}
+
+        # Do.
+        response = client.post(f"{self.url}{query}", payload, content_type="application/json")
+
+        # Check.
+        assert response.status_code == 200
+        assert response.data == {
+            "results": [{"word": word, "anagrams": anagrams} for word, anagrams in expected.items()]
+        }
+        for word, anagrams in expected.items():
+            single_url = reverse("anagrams-get-anagrams-for-word", kwargs={"word": word})
+            assert client.get(f"{single_url}{query}").data["anagrams"] == anagrams
+        anagram_index.reset()
+
+    def test_batch_uses_a_single_query(self, client):
+        # Setup.
+        payload = {"words": ["foo", "bar", "baz", "oof", "zzz"] * 100}
+
+        # Do.
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(self.url, payload, content_type="application/json")
+
+        # Check.
+        assert response.status_code == 200
+        assert len(response.data["results"]) == 500
+        assert len([query for query in queries if "anagram_word" in query["sql"]]) == 1
+
+    @pytest.mark.parametrize("words", [[], ["foo"] * 4])
+    def test_batch_size_is_limited(self, client, settings, words):
+        # Setup.
+        settings.ANAGRAM_BATCH_MAX_WORDS = 3
+
+        # Do.
+        response = client.post(self.url, {"words": words}, content_type="application/json")
+
+        # Check.
+        assert response.status_code == 400
+        assert "words" in response.data
+
+
+@pytest.mark.django_db
+class TestWordsFromLetters:
+    words = ["a", "at", "tea", "eat", "Tate", "treat", "rate", "tear", "eater", "retreat", "x-ray", "zebra"]
+
+    @pytest.fixture(autouse=True)
+    def _reset_index(self):
+        letter_index.reset()
+        yield
+        letter_index.reset()
+
+    @staticmethod
+    def _get_words(client, letters, query=""):
+        url = reverse("anagrams-get-words-from-letters", kwargs={"letters": letters})
+        response = client.get(f"{url}{query}")
+        assert response.status_code == 200, response.data
+        return response.data["words"]
+
+    @pytest.mark.parametrize(
+        "letters,query",
+        [
+            ("eatr", ""),
+            ("TREATE", ""),
+            ("retreat", "?min_length=5"),
+            ("retreat", "?limit=3"),
+            ("retreat", "?exclude_proper_nouns=true"),
+            ("xray", ""),
+            ("q", ""),
+        ],
+    )
+    def test_matches_brute_force(self, client, letters, query):
+        # Setup.
+        copy_words(self.words)
+        params = dict(part.split("=") for part in query.lstrip("?").split("&") if part)
+
+        # Do.
+        words = self._get_words(client, letters, query)
+
+        # Check.
+        rack = Counter(letters.lower())
+        expected = [
+            word
+            for word in self.words
+            if word.isalpha()
+            and not Counter(word.lower()) - rack
+            and len(word) >= int(params.get("min_length", 1))
+            and not (params.get("exclude_proper_nouns") and word.istitle())
+        ]
+        expected.sort(key=lambda word: (-len(word), word))
+        assert words == expected[: int(params["limit"])] if "limit" in params else words == expected
+
+    def test_follows_writes(self, client, django_capture_on_commit_callbacks):
+        # Setup.
+        copy_words(["tea", "eat", "ate"])
+        assert self._get_words(client, "eatr") == ["ate", "eat", "tea"]
+
+        # Do & Check: add.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse("words"), {"anagrams": ["rate", "at"]}, content_type="application/json")
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(f"{reverse('words')}?bulk=true", {"anagrams": ["tear"]}, content_type="application/json")
+        assert self._get_words(client, "eatr") == ["rate", "tear", "ate", "eat", "tea", "at"]
+
+        # Do & Check: delete single word.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.delete(reverse("words-delete-word", kwargs={"word": "tea"}))
+        assert self._get_words(client, "eatr") == ["rate", "tear", "ate", "eat", "at"]
+
+        # Do & Check: delete word and its anagrams.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.delete(reverse("anagrams-delete-word-and-anagrams", kwargs={"word": "rate"}))
+        assert self._get_words(client, "eatr") == ["ate", "eat", "at"]
+
+        # Do & Check: words come back after their signature was deleted.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse("words"), {"anagrams": ["rate"]}, content_type="application/json")
+        assert self._get_words(client, "eatr") == ["rate", "ate", "eat", "at"]
+
+        # Do & Check: delete all.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.delete(reverse("words"))
+        assert self._get_words(client, "eatr") == []
+        assert letter_index.is_built
+
+    def test_index_is_built_once(self, client):
+        # Setup.
+        copy_words(["tea", "eat"])
+        self._get_words(client, "tea")
+
+        # Do.
+        with CaptureQueriesContext(connection) as queries:
+            words = self._get_words(client, "eat")
+
+        # Check.
+        assert words == ["eat", "tea"]
+        assert not [query for query in queries if "anagram_word" in query["sql"]]
+
+    def test_own_writes_dont_rebuild_the_index(self, client, django_capture_on_commit_callbacks):
+        # Setup.
+        copy_words(["tea", "eat"])
+        self._get_words(client, "tea")
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse("words"), {"anagrams": ["ate"]}, content_type="application/json")
+
+        # Do.
+        with CaptureQueriesContext(connection) as queries:
+            words = self._get_words(client, "eat")
+
+        # Check.
+        assert words == ["ate", "eat", "tea"]
+        assert not [query for query in queries if "anagram_word" in query["sql"]]
+
+    def test_writes_of_other_processes_rebuild_the_index(self, client):
+        # Setup.
+        copy_words(["tea", "eat"])
+        self._get_words(client, "tea")
+
+        # Do: words written by another process only bump the dataset version in the shared cache.
+        copy_words(["ate"])
+        bump_dataset_version()
+        words = self._get_words(client, "eat")
+
+        # Check.
+        assert words == ["ate", "eat", "tea"]
+
+    def test_only_letters_are_accepted(self, client):
+        # Do.
+        response = client.get("/anagrams/from-letters/ab1/")
+
+        # Check.
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestBlankAnagrams:
+    words = ["read", "dear", "Dare", "road", "bead", "reads", "red", "rd-a", "zzzz", "ride"]
+
+    @pytest.fixture(autouse=True)
+    def _words(self):
+        letter_index.reset()
+        copy_words(self.words)
+        yield
+        letter_index.reset()
+
+    @staticmethod
+    def _get_anagrams(client, pattern, query=""):
+        url = reverse("anagrams-get-anagrams-for-word", kwargs={"word": pattern})
+        return client.get(f"{url}{query}")
+
+    @pytest.mark.parametrize("pattern", ["re?d", "?ear", "r??d", "???", "d?", "?"])
+    def test_matches_every_fill(self, client, pattern):
+        # Setup.
+        fills = [pattern]
+        while "?" in fills[0]:
+            fills = [fill.replace("?", letter, 1) for fill in fills for letter in string.ascii_lowercase]
+        signatures = {"".join(sorted(fill)) for fill in fills}
+        expected = list(
+            Word.objects.filter(sorted_lowercase_word__in=signatures).order_by("id").values_list("word", flat=True)
+        )
+
+        # Do.
+        response = self._get_anagrams(client, pattern)
+
+        # Check.
+        assert response.status_code == 200
+        assert response.data["anagrams"] == expected
+
+    @pytest.mark.parametrize(
+        "query,expected",
+        [
+            ("?limit=2", ["read", "dear"]),
+            ("?exclude_proper_nouns=true", ["read", "dear", "bead"]),
+            ("?limit=10", ["read", "dear", "Dare"]),
+        ],
+    )
+    def test_options(self, client, settings, query, expected):
+        # Setup.
+        settings.ANAGRAM_MAX_BLANK_RESULTS = 3
+
+        # Do.
+        response = self._get_anagrams(client, "d?ea", query)
+
+        # Check.
+        assert response.status_code == 200
+        assert response.data["anagrams"] == expected
+
+    def test_number_of_blanks_is_limited(self, client, settings):
+        # Setup.
+        settings.ANAGRAM_MAX_BLANKS = 2
+
+        # Do.
+        response = self._get_anagrams(client, "r???")
+
+        # Check.
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestPhraseAnagrams:
+    url = reverse("anagrams-get-phrase-anagrams")
+    words = ["dirty", "room", "moor", "dormitory", "dorm", "I", "toy", "try", "rid", "or", "my", "Tom", "dry", "riot"]
+
+    @pytest.fixture(autouse=True)
+    def _words(self):
+        letter_index.reset()
+        copy_words(self.words)
+        yield
+        letter_index.reset()
+
+    def _brute_force(self, phrase, max_words, min_length=2):
+        target = Counter(phrase.replace(" ", "").lower())
+        words = [word for word in self.words if len(word) >= min_length]
+        phrases = set()
+        for size in range(1, max_words + 1):
+            for combination in itertools.combinations_with_replacement(words, size):
+                if Counter("".join(combination).lower()) == target and sorted(combination) != sorted(phrase.split()):
+                    phrases.add(" ".join(sorted(combination)))
+        return phrases
+
+    @pytest.mark.parametrize("workers", [0, 2])
+    @pytest.mark.parametrize(
+        "phrase,max_words", [("dormitory", 1), ("dormitory", 2), ("dormitory", 3), ("dirty room", 4)]
+    )
+    def test_matches_brute_force(self, client, settings, workers, phrase, max_words):
+        # Setup.
+        settings.ANAGRAM_PHRASE_WORKERS = workers
+
+        # Do.
+        response = client.get(self.url, {"phrase": phrase, "max_words": max_words})
+
+        # Check.
+        assert response.status_code == 200
+        assert response.data["complete"]
+        phrases = response.data["phrases"]
+        assert len(phrases) == len(set(phrases))
+        assert {" ".join(sorted(phrase.split())) for phrase in phrases} == self._brute_force(phrase, max_words)
+
+    def test_broken_pool_falls_back_to_searching_in_process(self, client, settings):
+        # Setup.
+        settings.ANAGRAM_PHRASE_WORKERS = 2
+        expected = client.get(self.url, {"phrase": "dormitory"}).data["phrases"]
+        broken_executor = phrases._executors[2]
+        for process in list(broken_executor._processes.values()):
+            process.kill()
+
+        # Do.
+        response = client.get(self.url, {"phrase": "dormitory"})
+
+        # Check.
+        assert response.status_code == 200
+        assert response.data["phrases"] == expected
+        assert phrases._executors.get(2) is not broken_executor
+        assert client.get(self.url, {"phrase": "dormitory"}).data["phrases"] == expected
+        assert phrases._executors[2] is not None
+
+    def test_starting_the_pool_doesnt_take_from_the_time_budget(self, client, settings):
+        # Setup: starting the processes alone takes longer than the budget.
+        settings.ANAGRAM_PHRASE_WORKERS = 2
+        settings.ANAGRAM_PHRASE_TIME_BUDGET = 1
+        for executor in phrases._executors.values():
+            executor.shutdown()
+        phrases._executors.clear()
+
+        # Do.
+        response = client.get(self.url, {"phrase": "dormitory", "max_words": 3})
+
+        # Check.
+        assert response.data["complete"]
+        assert {" ".join(sorted(phrase.split())) for phrase in response.data["phrases"]} == self._brute_force(
+            "dormitory", 3
+        )
+
+    def test_pools_are_kept_per_number_of_workers(self, client, settings):
+        # Do.
+        for workers in [2, 3]:
+            settings.ANAGRAM_PHRASE_WORKERS = workers
+            client.get(self.url, {"phrase": "dormitory"})
+
+        # Check.
+        assert {workers: executor._max_workers for workers, executor in phrases._executors.items()} == {2: 2, 3: 3}
+        phrases._executors.pop(3).shutdown()
+
+    def test_options(self, client):
+        # Do.
+        response = client.get(self.url, {"phrase": "dormitory", "min_length": 3, "exclude_proper_nouns": True})
+
+        # Check.
+        assert response.status_code == 200
+        assert sorted(response.data["phrases"]) == ["dirty moor", "dirty room"]
+
+    def test_results_are_limited(self, client, settings):
+        # Setup.
+        settings.ANAGRAM_PHRASE_MAX_RESULTS = 2
+
+        # Do.
+        response = client.get(self.url, {"phrase": "dormitory", "max_results": 10})
+
+        # Check.
+        assert response.status_code == 200
+        assert len(response.data["phrases"]) == 2
+        assert not response.data["complete"]
+
+    def test_spelling_out_phrases_stops_after_the_results(self, client, settings, monkeypatch):
+        # Setup: a single row of signatures spells out 120 * 12 phrases, with time enough to spell them all out. Words
+        # already stored are left out, a second copy of `room` would make the phrase itself come up twice.
+        settings.ANAGRAM_PHRASE_TIME_BUDGET = 60
+        copy_words(
+            (
+                {"".join(word) for word in itertools.permutations("dirty")}
+                | {"".join(word) for word in itertools.permutations("room")}
+            )
+            - set(self.words)
+        )
+        spelled = []
+        product = itertools.product
+        monkeypatch.setattr(
+            itertools, "product", lambda *groups: (spelled.append(words) or words for words in product(*groups))
+        )
+
+        # Do.
+        response = client.get(self.url, {"phrase": "dirty room", "max_words": 2, "max_results": 5})
+
+        # Check: besides the results, only the phrase itself (skipped) and one more phrase, which tells the results are
+        # incomplete, are spelled out.
+        assert len(response.data["phrases"]) == 5
+        assert not response.data["complete"]
+        assert len(spelled) == 7
+
+    def test_spelling_out_phrases_stops_at_the_deadline(self, client, monkeypatch):
+        # Setup: the clock of the view jumps past the deadline once the search started.
+        clock = iter([time.time()])
+        monkeypatch.setattr(views, "time", SimpleNamespace(time=lambda: next(clock, time.time() + 60)))
+
+        # Do.
+        response = client.get(self.url, {"phrase": "dormitory"})
+
+        # Check.
+        assert response.data == {"phrases": [], "complete": False}
+
+    def test_time_budget_returns_partial_results(self, client, settings):
+        # Setup.
+        settings.ANAGRAM_PHRASE_TIME_BUDGET = 0
+
+        # Do.
+        response = client.get(self.url, {"phrase": "dormitory"})
+
+        # Check.
+        assert response.status_code == 200
+        assert response.data == {"phrases": [], "complete": False}
+
+    @pytest.mark.parametrize("phrase", ["", "dorm1tory", "   "])
+    def test_invalid_phrase(self, client, phrase):
+        # Do.
+        response = client.get(self.url, {"phrase": phrase})
+
+        # Check.
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestNearAnagrams:
+    words = ["read", "dear", "Dare", "red", "bread", "beard", "road", "dead", "reads", "ear", "a", "b"]
+
+    @staticmethod
+    def _get_near_anagrams(client, word, query=""):
+        url = reverse("anagrams-get-near-anagrams", kwargs={"word": word})
+        response = client.get(f"{url}{query}")
+        assert response.status_code == 200, response.data
+        return response.data
+
+    @staticmethod
+    def _assert_deletions_follow_groups():
+        stored = set(AnagramGroupDeletion.objects.values_list("group__signature", "deletion"))
+        expected = {
+            (signature, deletion)
+            for signature in AnagramGroup.objects.values_list("signature", flat=True)
+            for deletion in deletion_signatures(signature)
+        }
+        assert stored == expected
+        assert not check_groups()
+
+    def _brute_force(self, word):
+        signature = Counter(word.lower())
+        near_anagrams = {"added": [], "removed": [], "substituted": []}
+        for other in Word.objects.order_by("id").values_list("word", flat=True):
+            other_signature = Counter(other.lower())
+            if other_signature == signature:
+                continue
+            if len(other) == len(word) + 1 and not signature - other_signature:
+                near_anagrams["added"].append(other)
+            elif len(other) == len(word) - 1 and not other_signature - signature:
+                near_anagrams["removed"].append(other)
+            elif len(other) == len(word) and sum((signature - other_signature).values()) == 1:
+                near_anagrams["substituted"].append(other)
+        return near_anagrams
+
+    @pytest.mark.parametrize("ingest", ["post", "bulk", "load"])
+    @pytest.mark.parametrize("word", ["read", "bread", "red", "dead", "a", "zzz"])
+    def test_matches_brute_force(self, client, tmp_path, ingest, word):
+        # Setup.
+        if ingest == "load":
+            path = tmp_path / "dictionary.txt"
+            path.write_text("\n".join(self.words), encoding="utf-8")
+            call_command("load_dictionary", str(path), stdout=io.StringIO())
+        else:
+            url = f"{reverse('words')}?bulk={ingest == 'bulk'}"
+            client.post(url, {"anagrams": self.words}, content_type="application/json")
+        self._assert_deletions_follow_groups()
+
+        # Do.
+        with CaptureQueriesContext(connection) as queries:
+            near_anagrams = self._get_near_anagrams(client, word)
+
+        # Check.
+        assert near_anagrams == self._brute_force(word)
+        assert len([query for query in queries if "anagram_" in query["sql"]]) <= 3
+
+    def test_options(self, client):
+        # Setup.
+        copy_words(self.words)
+
+        # Do.
+        near_anagrams = self._get_near_anagrams(client, "read", "?limit=1&exclude_proper_nouns=true")
+
+        # Check.
+        assert near_anagrams == {"added": ["bread"], "removed": ["red"], "substituted": ["road"]}
+
+    def test_deletions_follow_writes(self, client):
+        # Setup.
+        copy_words(self.words)
+
+        # Do & Check: delete single words, the last one of a group drops its deletions.
+        client.delete(reverse("words-delete-word", kwargs={"word": "dear"}))
+        client.delete(reverse("words-delete-word", kwargs={"word": "road"}))
+        self._assert_deletions_follow_groups()
+        assert not AnagramGroup.objects.filter(signature="ador").exists()
+
+        # Do & Check: delete word and its anagrams.
+        client.delete(reverse("anagrams-delete-word-and-anagrams", kwargs={"word": "bread"}))
+        self._assert_deletions_follow_groups()
+
+        # Do & Check: rebuild.
+        call_command("rebuild_anagram_groups", stdout=io.StringIO())
+        self._assert_deletions_follow_groups()
+
+        # Do & Check: delete all.
+        client.delete(reverse("words"))
+        assert not AnagramGroupDeletion.objects.exists()
+
+    @pytest.mark.parametrize("existing_words", [[], ["foo", "oof", "dead"]])
+    def test_load_stores_deletions_once(self, tmp_path, existing_words):
+        # Setup.
+        copy_words(existing_words)
+        deletions_before = AnagramGroupDeletion.objects.count()
+        path = tmp_path / "dictionary.txt"
+        path.write_text("\n".join(self.words), encoding="utf-8")
+
+        # Do.
+        out = io.StringIO()
+        call_command("load_dictionary", str(path), "--batch-size=5", stdout=out)
+
+        # Check: the deletions of all new groups are stored, and the indexes dropped for an empty table are back.
+        self._assert_deletions_follow_groups()
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, AnagramGroupDeletion._meta.db_table)
+        assert constraints["anagram_group_deletion_unique"]["unique"]
+        assert constraints["anagram_deletion_group_idx"]["columns"] == ["group_id"]
+        assert f"Stored {AnagramGroupDeletion.objects.count() - deletions_before} deletion" in out.getvalue()
+
+    def test_missing_deletions_are_reported(self):
+        # Setup.
+        copy_words(["dear", "foo"])
+        AnagramGroupDeletion.objects.filter(group__signature="foo").delete()
+
+        # Do.
+        out = io.StringIO()
+        with pytest.raises(CommandError):
+            call_command("rebuild_anagram_groups", "--check", stdout=out)
+
+        # Check.
+        assert "Groups without deletion signatures: 1" in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestAsyncViews:
+    words = ["read", "dear", "Dare", "bread", "beard", "foo", "oof", "ofo", "bar", "a"]
+
+    @staticmethod
+    def _route(settings, async_views):
+        settings.ANAGRAM_ASYNC_VIEWS = async_views
+        importlib.reload(importlib.import_module("anagram.urls"))
+        importlib.reload(importlib.import_module("anagramService.urls"))
+        clear_url_caches()
+
+    @pytest.fixture(autouse=True)
+    def _restore_routes(self, settings):
+        yield
+        self._route(settings, False)
+
+    def _get_both(self, client, settings, method, url, payload=None):
+        """Responses of the sync and of the async view for the same request."""
+        responses = []
+        for async_views in (False, True):
+            self._route(settings, async_views)
+            assert asyncio.iscoroutinefunction(resolve(unquote(url.split("?")[0])).func) == async_views
+            responses.append(getattr(client, method)(url, payload, content_type="application/json"))
+        return responses
+
+    @pytest.mark.parametrize("environ, expected", [({}, 0), ({"DJANGO_CONN_MAX_AGE": "60"}, 60)])
+    def test_asgi_entry_point_closes_connections_after_requests(self, monkeypatch, environ, expected):
+        # Setup: a copy of the environment, which the entry point changes.
+        monkeypatch.setattr(
+            os, "environ", {name: value for name, value in os.environ.items() if name != "DJANGO_CONN_MAX_AGE"}
+        )
+        os.environ.update(environ)
+
+        # Do.
+        importlib.reload(importlib.import_module("anagramService.asgi"))
+        project_settings = importlib.reload(importlib.import_module("anagramService.settings"))
+
+        # Check.
+        assert {alias["CONN_MAX_AGE"] for alias in project_settings.DATABASES.values()} == {expected}
+
+    @pytest.mark.parametrize("index_enabled", [False, True])
+    @pytest.mark.parametrize(
+        "url",
+        [
+            reverse("anagrams-get-anagrams-for-word", kwargs={"word": "dare"}),
+            f"{reverse('anagrams-get-anagrams-for-word', kwargs={'word': 'dare'})}?limit=1",
+            f"{reverse('anagrams-get-anagrams-for-word', kwargs={'word': 'read'})}?exclude_proper_nouns=true",
+            reverse("anagrams-get-anagrams-for-word", kwargs={"word": "re?d"}),
+            reverse("anagrams-get-anagrams-for-word", kwargs={"word": "????"}),
+            reverse("words-get-word-length-statistics"),
+            reverse("words-get-biggest-anagram-group"),
+            reverse("words-get-anagram-groups-of-at-least-size-x"),
+            f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=2",
+            f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=2&page=2",
+            f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=2&page=last",
+            f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=1",
+            f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=2&pagination=cursor",
+            f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?pagination=cursor&cursor=garbage",
+        ],
+    )
+    def test_reads_match_sync_views(self, client, settings, monkeypatch, index_enabled, url):
+        # Setup.
+        settings.ANAGRAM_INDEX_ENABLED = index_enabled
+        monkeypatch.setattr(PageNumberPagination, "page_size", 2)
+        monkeypatch.setattr(AnagramGroupCursorPagination, "page_size", 2)
+        copy_words(self.words)
+
+        # Do.
+        sync_response, async_response = self._get_both(client, settings, "get", url)
+
+        # Check.
+        assert async_response.status_code == sync_response.status_code
+        assert async_response["Content-Type"] == sync_response["Content-Type"]
+        assert async_response.json() == sync_response.json()
+
+    def test_blanks_follow_writes_of_other_processes(self, client, settings):
+        # Setup.
+        copy_words(self.words)
+        url = reverse("anagrams-get-anagrams-for-word", kwargs={"word": "re?d"})
+        self._route(settings, True)
+        client.get(url)
+        copy_words(["dare"])
+        bump_dataset_version()
+
+        # Do.
+        response = client.get(url)
+
+        # Check.
+        assert response.status_code == 200
+        assert response.json()["anagrams"] == ["read", "dear", "Dare", "dare"]
+
+    @pytest.mark.parametrize("index_enabled", [False, True])
+    @pytest.mark.parametrize(
+        "query, words",
+        [("", ["dare", "foo", "xyz"]), ("?limit=1&exclude_proper_nouns=true", ["read", "dare"]), ("", [])],
+    )
+    def test_batch_matches_sync_view(self, client, settings, index_enabled, query, words):
+        # Setup.
+        settings.ANAGRAM_INDEX_ENABLED = index_enabled
+        copy_words(self.words)
+        url = f"{reverse('anagrams-get-anagrams-for-words')}{query}"
+
+        # Do.
+        sync_response, async_response = self._get_both(client, settings, "post", url, {"words": words})
+
+        # Check.
+        assert async_response.status_code == sync_response.status_code
+        assert async_response.json() == sync_response.json()
+
+    def test_cache_and_etag(self, client, settings):
+        # Setup.
+        settings.ANAGRAM_CACHE_ENABLED = settings.ANAGRAM_ETAG_ENABLED = True
+        cache.clear()
+        cached_response.reset_stats()
+        copy_words(self.words)
+        self._route(settings, True)
+        url = reverse("anagrams-get-anagrams-for-word", kwargs={"word": "foo"})
+
+        # Do.
+        first = client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            second = client.get(url)
+            not_modified = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        # Check.
+        assert first.status_code == second.status_code == 200
+        assert second.json() == first.json() == {"anagrams": ["oof", "ofo"]}
+        assert second["Content-Type"] == first["Content-Type"] == "application/json"
+        assert second["ETag"] == first["ETag"]
+        assert not_modified.status_code == 304
+        assert all("Accept" in response["Vary"] for response in (first, second, not_modified))
+        assert not queries
+        assert (cached_response.stats.hits, cached_response.stats.misses) == (1, 1)
+        cache.clear()
+        cached_response.reset_stats()
+
+    def test_concurrent_requests(self, settings):
+        # Setup.
+        copy_words(self.words)
+        self._route(settings, True)
+        urls = [reverse("anagrams-get-anagrams-for-word", kwargs={"word": word}) for word in self.words]
+
+        async def get_all():
+            async_client = AsyncClient()
+            return await asyncio.gather(*(async_client.get(url) for url in urls))
+
+        # Do.
+        responses = async_to_sync(get_all)()
+
+        # Check.
+        assert [response.status_code for response in responses] == [200] * len(urls)
+        assert responses[0].json() == {"anagrams": ["dear", "Dare"]}
+
+    def test_metrics_count_queries_of_async_views(self, settings):
+        # Setup.
+        copy_words(self.words)
+        self._route(settings, True)
+        route = "words-get-biggest-anagram-group"
+        requests_before, queries_before = (
+            metrics.request_queries.count(route=route),
+            metrics.queries_total.value(route=route),
+        )
+
+        async def get():
+            return await AsyncClient().get(reverse(route))
+
+        # Do.
+        response = async_to_sync(get)()
+
+        # Check: the queries run in `sync_to_async` threads still count towards the request.
+        assert response.status_code == 200
+        assert metrics.request_queries.count(route=route) == requests_before + 1
+        assert metrics.queries_total.value(route=route) == queries_before + 2
+
+
+@pytest.mark.django_db
+class TestExport:
+    words = ["read", "dear", "Dare", "bread", "beard", "foo", "bar"]
+
+    @staticmethod
+    def _parse(content, export_format):
+        if export_format == "csv":
+            return list(csv.DictReader(io.StringIO(content.decode())))
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    def _export(self, client, url_name, query=""):
+        response = client.get(f"{reverse(url_name)}{query}")
+        assert response.status_code == 200
+        assert response.streaming
+        pieces = list(response.streaming_content)
+        return response, pieces, b"".join(pieces)
+
+    @pytest.mark.parametrize("use_gzip", [False, True])
+    @pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+    def test_export_words(self, client, monkeypatch, export_format, use_gzip):
+        # Setup.
+        monkeypatch.setattr(export, "CHUNK_SIZE", 3)
+        copy_words(self.words)
+
+        # Do.
+        response, pieces, content = self._export(
+            client, "words-export-words", f"?file_format={export_format}&gzip={use_gzip}"
+        )
+
+        # Check.
+        extension = f"{export_format}.gz" if use_gzip else export_format
+        assert response["Content-Disposition"] == f'attachment; filename="words.{extension}"'
+        rows = self._parse(gzip.decompress(content) if use_gzip else content, export_format)
+        expected = [(word, len(word), word.istitle()) for word in self.words]
+        if export_format == "csv":
+            assert [(row["word"], int(row["length"]), row["is_proper_noun"] == "True") for row in rows] == expected
+        else:
+            assert [(row["word"], row["length"], row["is_proper_noun"]) for row in rows] == expected
+        if not use_gzip:
+            # Rendered and sent a chunk of rows at a time (plus the CSV header).
+            assert len(pieces) == 3 + (export_format == "csv")
+
+    @pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+    @pytest.mark.parametrize(
+        "min_group_size, expected",
+        [
+            (
+                1,
+                [
+                    ("abder", ["bread", "beard"]),
+                    ("abr", ["bar"]),
+                    ("ader", ["read", "dear", "Dare"]),
+                    ("foo", ["foo"]),
+                ],
+            ),
+            (2, [("abder", ["bread", "beard"]), ("ader", ["read", "dear", "Dare"])]),
+            (4, []),
+        ],
+    )
+    def test_export_groups(self, client, monkeypatch, export_format, min_group_size, expected):
+        # Setup.
+        monkeypatch.setattr(export, "CHUNK_SIZE", 2)
+        copy_words(self.words)
+
+        # Do.
+        query = f"?file_format={export_format}&min_group_size={min_group_size}"
+        response, _, content = self._export(client, "words-export-anagram-groups", query)
+
+        # Check.
+        assert response["Content-Type"] == f"{export.CONTENT_TYPES[export_format]}; charset=utf-8"
+        rows = self._parse(content, export_format)
+        if export_format == "csv":
+            groups = [(row["signature"], int(row["count"]), row["words"].split()) for row in rows]
+        else:
+            groups = [(row["signature"], row["count"], row["words"]) for row in rows]
+        assert groups == [(signature, len(words), words) for signature, words in expected]
+
+    def test_empty_csv_has_a_header(self, client):
+        # Do.
+        _, _, content = self._export(client, "words-export-words", "?file_format=csv")
+
+        # Check.
+        assert content == b"word,length,is_proper_noun\r\n"
+
+    @pytest.mark.parametrize("query", ["?file_format=xml", "?min_group_size=0"])
+    def test_invalid_parameters(self, client, query):
+        # Do.
+        response = client.get(f"{reverse('words-export-anagram-groups')}{query}")
+
+        # Check.
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize("use_gzip", [False, True])
+    def test_export_dictionary_command(self, tmp_path, use_gzip):
+        # Setup.
+        copy_words(self.words)
+        path = tmp_path / "groups.ndjson"
+        options = ["--gzip"] if use_gzip else []
+
+        # Do.
+        out = io.StringIO()
+        call_command(
+            "export_dictionary", "groups", "--min-group-size", "2", "--output", str(path), *options, stdout=out
+        )
+
+        # Check.
+        content = gzip.decompress(path.read_bytes()) if use_gzip else path.read_bytes()
+        assert [row["words"] for row in self._parse(content, "ndjson")] == [
+            ["bread", "beard"],
+            ["read", "dear", "Dare"],
+        ]
+        assert f"Exported groups to {path}" in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestRenderers:
+    words = ["read", "dear", "Dare", "café", "éfac", "foo", "oof"]
+    url = f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=2"
+
+    @pytest.fixture(autouse=True)
+    def setup_words(self):
+        copy_words(self.words)
+
+    def test_json_is_the_default(self, client):
+        # Do.
+        response = client.get(self.url)
+
+        # Check.
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/json"
+        assert response.content == JSONRenderer().render(response.data)
+        assert "café" in response.content.decode()
+
+    def test_indented_json(self, client):
+        # Do.
+        response = client.get(self.url, HTTP_ACCEPT="application/json; indent=2")
+
+        # Check.
+        assert response.content == JSONRenderer().render(response.data, "application/json; indent=2")
+        assert b'\n  "count": 3,' in response.content
+
+    def test_msgpack(self, client):
+        # Do.
+        json_response = client.get(self.url)
+        response = client.get(self.url, HTTP_ACCEPT="application/msgpack")
+
+        # Check.
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/msgpack"
+        assert msgpack.unpackb(response.content) == json_response.json()
+        assert len(response.content) < len(json_response.content)
+
+    @pytest.mark.parametrize(
+        "content_type, body",
+        [
+            ("application/json", json.dumps({"words": ["read", "foo"]}).encode()),
+            ("application/msgpack", msgpack.packb({"words": ["read", "foo"]})),
+        ],
+    )
+    def test_request_formats(self, client, content_type, body):
+        # Do.
+        response = client.post(reverse("anagrams-get-anagrams-for-words"), body, content_type=content_type)
+
+        # Check.
+        assert response.status_code == 200
+        assert response.json() == {
+            "results": [{"word": "read", "anagrams": ["dear", "Dare"]}, {"word": "foo", "anagrams": ["oof"]}]
+        }
+
+    @pytest.mark.parametrize(
+        "content_type, body, error",
+        [
+            ("application/json", b'{"words": [', "JSON parse error"),
+            ("application/msgpack", b"\xc1", "MessagePack parse error"),
+            ("application/msgpack", b"\x92\x01", "MessagePack parse error"),
+            ("application/msgpack", b"\x92\x01\x02\x03", "MessagePack parse error"),
+            ("application/msgpack", b"\x91" * 100_000 + b"\x01", "MessagePack parse error"),
+        ],
+    )
+    def test_invalid_request_body(self, client, content_type, body, error):
+        # Do.
+        response = client.post(reverse("anagrams-get-anagrams-for-words"), body, content_type=content_type)
+
+        # Check.
+        assert response.status_code == 400
+        assert response.json()["detail"].startswith(error)
+
+    def test_any_msgpack_error_is_a_parse_error(self, client, monkeypatch):
+        # Setup.
+        def unpackb(data):
+            raise msgpack.UnpackException("unsupported")
+
+        monkeypatch.setattr(msgpack, "unpackb", unpackb)
+
+        # Do.
+        response = client.post(
+            reverse("anagrams-get-anagrams-for-words"),
+            msgpack.packb({"words": []}),
+            content_type="application/msgpack",
+        )
+
+        # Check.
+        assert response.status_code == 400
+        assert response.json()["detail"] == "MessagePack parse error - unsupported"
+
+    def test_types_unknown_to_orjson_and_msgpack(self):
+        # Setup.
+        data = {"decimal": Decimal("1.5"), "words": ReturnList(["read"], serializer=None)}
+
+        # Do & Check.
+        assert ORJSONRenderer().render(data) == b'{"decimal":1.5,"words":["read"]}'
+        assert msgpack.unpackb(MessagePackRenderer().render(data)) == {"decimal": 1.5, "words": ["read"]}
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"words": ["line\u2028separator", "paragraph\u2029separator", "em\u2014dash", "café"]},
+            {1: "read", 2: ["dear"]},
+            {"count": 2**70},
+            {"median": 8.5, "average": 1e16, "tiny": 0.1},
+        ],
+    )
+    def test_same_json_as_drf(self, data):
+        # Do & Check.
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    @pytest.mark.parametrize("value", [1e-05, 1.5e300, 2.5e-10])
+    def test_floats_have_the_same_value_as_with_drf(self, value):
+        # Do.
+        content = ORJSONRenderer().render({"value": value})
+
+        # Check.
+        assert json.loads(content) == json.loads(JSONRenderer().render({"value": value})) == {"value": value}
+
+
+@pytest.mark.django_db
+class TestCompression:
+    @pytest.fixture(autouse=True)
+    def setup_words(self, settings):
+        settings.ANAGRAM_COMPRESSION_MIN_SIZE = 200
+        copy_words([f"word{letter}{other}" for letter in string.ascii_lowercase for other in string.ascii_lowercase])
+
+    url = reverse("anagrams-get-anagrams-for-words")
+
+    def _post(self, client, words, **headers):
+        return client.post(self.url, {"words": words}, content_type="application/json", **headers)
+
+    @pytest.mark.parametrize(
+        "accept_encoding, encoding, decompress",
+        [
+            ("gzip, deflate, br", "br", brotli.decompress),
+            ("gzip", "gzip", gzip.decompress),
+            ("br;q=0.5, gzip", "gzip", gzip.decompress),
+            ("*", "br", brotli.decompress),
+        ],
+    )
+    def test_big_responses_are_compressed(self, client, accept_encoding, encoding, decompress):
+        # Setup.
+        words = list(Word.objects.values_list("word", flat=True))
+        plain = self._post(client, words)
+
+        # Do.
+        response = self._post(client, words, HTTP_ACCEPT_ENCODING=accept_encoding)
+
+        # Check.
+        assert response["Content-Encoding"] == encoding
+        assert "Accept-Encoding" in response["Vary"]
+        assert int(response["Content-Length"]) == len(response.content) < len(plain.content)
+        assert decompress(response.content) == plain.content
+
+    @pytest.mark.parametrize(
+        "accept_encoding, expected",
+        [
+            ("gzip, br", "br"),
+            ("GZIP;Q=0.9, br;q=0.8", "gzip"),
+            ("*;q=0.5, br;q=0", "gzip"),
+            ("deflate, identity", None),
+            ("gzip;q=invalid", None),
+            ("", None),
+        ],
+    )
+    def test_choose_encoding(self, accept_encoding, expected):
+        # Do & Check.
+        assert choose_encoding(accept_encoding) == expected
+
+    @pytest.mark.parametrize("accept_encoding", ["", "identity", "br;q=0, gzip;q=0"])
+    def test_encoding_not_accepted(self, client, accept_encoding):
+        # Do.
+        response = self._post(
+            client, list(Word.objects.values_list("word", flat=True)), HTTP_ACCEPT_ENCODING=accept_encoding
+        )
+
+        # Check.
+        assert not response.has_header("Content-Encoding")
+        assert "Accept-Encoding" in response["Vary"]
+
+    def test_small_responses_are_not_compressed(self, client):
+        # Do.
+        response = self._post(client, ["read"], HTTP_ACCEPT_ENCODING="gzip, br")
+
+        # Check.
+        assert not response.has_header("Content-Encoding")
+        assert "Accept-Encoding" not in response["Vary"]
+
+    def test_msgpack_responses_are_compressed(self, client):
+        # Do.
+        response = self._post(
+            client,
+            list(Word.objects.values_list("word", flat=True)),
+            HTTP_ACCEPT="application/msgpack",
+            HTTP_ACCEPT_ENCODING="gzip, br",
+        )
+
+        # Check.
+        assert response["Content-Type"] == "application/msgpack"
+        assert response["Content-Encoding"] == "br"
+
+    def test_html_pages_are_not_compressed(self, client):
+        # Do.
+        response = client.get(reverse("admin:login"), HTTP_ACCEPT_ENCODING="gzip, br")
+
+        # Check.
+        assert response["Content-Type"].startswith("text/html")
+        assert b"csrfmiddlewaretoken" in response.content
+        assert len(response.content) >= 200
+        assert not response.has_header("Content-Encoding")
+
+    def test_compressed_responses_have_weak_etags(self, client, settings):
+        # Setup.
+        settings.ANAGRAM_ETAG_ENABLED = True
+        cache.clear()
+        copy_words([word[::-1] for word in Word.objects.values_list("word", flat=True)])
+        url = f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=2"
+        call_command("rebuild_anagram_groups", stdout=io.StringIO())
+
+        # Do.
+        response = client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        not_modified = client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"])
+
+        # Check.
+        assert response["Content-Encoding"] == "gzip"
+        assert response["ETag"].startswith('W/"')
+        assert not_modified.status_code == 304
+
+
+@pytest.mark.django_db
+class TestWordImport:
+    url = reverse("words-import")
+
+    @staticmethod
+    def _word_list(lines):
+        return "".join(f"{line}\n" for line in lines).encode()
+
+    def test_multipart_upload(self, client, settings, django_capture_on_commit_callbacks):
+        # Setup.
+        settings.ANAGRAM_IMPORT_BATCH_SIZE = 2
+        copy_words(["foo"])
+        anagram_index.build()
+        content = self._word_list(["read", "", "dear", "foo", "two words", "x" * 101, "dear", "Dare"])
+        content += b"\xff\xfe\n" + b"y" * 10_000 + b"\nlast"
+
+        # Do.
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            upload = SimpleUploadedFile("words.txt", content, content_type="text/plain")
+            response = client.post(self.url, {"file": upload})
+
+        # Check.
+        assert response.status_code == 201, response.data
+        assert response.data == {
+            "lines": 11,
+            "inserted": 4,
+            "duplicates": 2,
+            "rejected": 4,
+            "errors": [
+                {"line": 5, "error": "Not a single word."},
+                {"line": 6, "error": "Longer than 100 characters."},
+                {"line": 9, "error": "Not valid UTF-8."},
+                {"line": 10, "error": "Longer than 100 characters."},
+            ],
+        }
+        assert list(Word.objects.values_list("word", flat=True)) == ["foo", "read", "dear", "Dare", "last"]
+        assert not check_groups()
+        # Valid words are inserted in batches of two, each committed with its own index updates and version bump.
+        assert len(callbacks) == 3 * 3
+        assert anagram_index.get_anagrams("dare") == ["read", "dear", "Dare"]
+
+    def test_gzipped_raw_body(self, client):
+        # Setup.
+        content = gzip.compress(self._word_list(["read", "dear", "read"]))
+
+        # Do.
+        response = client.post(self.url, content, content_type="application/gzip")
+
+        # Check.
+        assert response.status_code == 201, response.data
+        assert (response.data["inserted"], response.data["duplicates"]) == (2, 1)
+        assert AnagramGroup.objects.get(signature="ader").count == 2
+
+    def test_corrupt_gzip_keeps_committed_batches(self, client, settings):
+        # Setup.
+        settings.ANAGRAM_IMPORT_BATCH_SIZE = 1
+        content = gzip.compress(self._word_list(["read", "dear"] + [f"word{i}" for i in range(1000)]))
+
+        # Do.
+        response = client.post(self.url, content[: len(content) // 2], content_type="application/gzip")
+
+        # Check.
+        assert response.status_code == 201, response.data
+        assert response.data["rejected"] == 1
+        assert response.data["errors"][0]["error"] == "Not valid gzip data."
+        assert response.data["inserted"] == response.data["lines"] - 1 == Word.objects.count()
+
+    def test_requests_are_not_atomic(self):
+        # Check.
+        assert resolve(self.url).func._non_atomic_requests == {"default"}
+
+    @pytest.mark.parametrize("payload, content_type", [(b"", "text/plain"), ({"other": "field"}, None)])
+    def test_missing_file(self, client, payload, content_type):
+        # Do.
+        response = client.post(self.url, payload, **({"content_type": content_type} if content_type else {}))
+
+        # Check.
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestJobs:
+    @pytest.fixture(autouse=True)
+    def media_root(self, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        return tmp_path
+
+    @staticmethod
+    def _start(client, django_capture_on_commit_callbacks, url_name, *args, **kwargs):
+        """Start a job and run it (eagerly, once the request has committed), returning the start response."""
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post(reverse(url_name), *args, **kwargs)
+        assert response.status_code == 202, response.data
+        assert response.data["status"] == "pending"
+        assert response["Location"].endswith(reverse("jobs-detail", args=[response.data["id"]]))
+        return response
+
+    def test_import_words(self, client, settings, media_root, django_capture_on_commit_callbacks):
+        # Setup.
+        settings.ANAGRAM_IMPORT_BATCH_SIZE = 2
+        copy_words(["read"])
+        anagram_index.build()
+        upload = SimpleUploadedFile("words.txt", b"read\ndear\ntwo words\nDare\nfoo\n", content_type="text/plain")
+
+        # Do.
+        response = self._start(client, django_capture_on_commit_callbacks, "jobs-import-words", {"file": upload})
+        job = client.get(response["Location"]).data
+
+        # Check.
+        assert job["kind"] == "import_words"
+        assert job["status"] == "succeeded", job["error"]
+        assert (job["processed"], job["total"], job["progress"]) == (5, None, 1.0)
+        assert job["elapsed"] >= 0
+        assert job["result"] == {
+            "lines": 5,
+            "inserted": 3,
+            "duplicates": 1,
+            "rejected": 1,
+            "errors": [{"line": 3, "error": "Not a single word."}],
+        }
+        assert anagram_index.get_anagrams("dare") == ["read", "dear", "Dare"]
+        assert not check_groups()
+        # The uploaded file is deleted once the import has finished.
+        assert Job.objects.get().upload == ""
+        assert not list((media_root / "imports").iterdir())
+
+    def test_import_gzipped_raw_body(self, client, django_capture_on_commit_callbacks):
+        # Do.
+        response = self._start(
+            client,
+            django_capture_on_commit_callbacks,
+            "jobs-import-words",
+            gzip.compress(b"read\ndear\n"),
+            content_type="application/gzip",
+        )
+
+        # Check.
+        assert Job.objects.get(pk=response.data["id"]).result["inserted"] == 2
+        assert Word.objects.count() == 2
+
+    def test_long_word_lists_are_imported_by_a_job(self, client, settings, django_capture_on_commit_callbacks):
+        # Setup.
+        settings.ANAGRAM_UPLOAD_MAX_WORDS = 2
+        copy_words(["read"])
+
+        # Do.
+        response = self._start(
+            client,
+            django_capture_on_commit_callbacks,
+            "words",
+            {"anagrams": ["read", "dear", "Dare"]},
+            content_type="application/json",
+        )
+
+        # Check.
+        job = Job.objects.get(pk=response.data["id"])
+        assert (job.kind, job.status) == (Job.Kind.IMPORT_WORDS, Job.Status.SUCCEEDED)
+        assert (job.result["inserted"], job.result["duplicates"]) == (2, 1)
+        assert list(Word.objects.order_by("pk").values_list("word", flat=True)) == ["read", "dear", "Dare"]
+
+    def test_import_without_file(self, client):
+        # Do.
+        response = client.post(reverse("jobs-import-words"), {"other": "field"})
+
+        # Check.
+        assert response.status_code == 400
+        assert not Job.objects.exists()
+
+    def test_delete_words(self, client, settings, django_capture_on_commit_callbacks):
+        # Setup.
+        settings.ANAGRAM_DELETE_BATCH_SIZE = 2
+        copy_words(["read", "dear", "dare", "foo", "bar"])
+        anagram_index.build()
+        letter_index.build()
+        version = dataset_version()
+
+        # Do.
+        response = self._start(client, django_capture_on_commit_callbacks, "jobs-delete-words")
+
+        # Check.
+        job = Job.objects.get(pk=response.data["id"])
+        assert job.status == Job.Status.SUCCEEDED, job.error
+        assert (job.processed, job.total, job.result) == (5, 5, {"deleted": 5})
+        assert not Word.objects.exists()
+        assert not AnagramGroup.objects.exists()
+        assert not AnagramGroupDeletion.objects.exists()
+        assert anagram_index.get_anagrams("read") == []
+        assert letter_index.get_words("readfoobar") == []
+        # One bump for each of the three batches and one for the final cleanup.
+        assert dataset_version() == version + 4
+
+    def test_delete_words_keeps_words_added_meanwhile(self, client, monkeypatch, django_capture_on_commit_callbacks):
+        # Setup.
+        copy_words(["read", "dear"])
+        AnagramGroup.objects.create(signature="xyz", length=3)
+
+        def add_word_then_delete_groups(groups):
+            copy_words(["foo"])
+            delete_groups(groups)
+
+        monkeypatch.setattr(tasks, "delete_groups", add_word_then_delete_groups)
+
+        # Do.
+        response = self._start(client, django_capture_on_commit_callbacks, "jobs-delete-words")
+
+        # Check.
+        job = Job.objects.get(pk=response.data["id"])
+        assert job.status == Job.Status.SUCCEEDED, job.error
+        assert list(Word.objects.values_list("word", flat=True)) == ["foo"]
+        assert list(AnagramGroup.objects.values_list("signature", flat=True)) == ["foo"]
+        assert not check_groups()
+
+    def test_rebuild_anagram_groups(self, client, django_capture_on_commit_callbacks):
+        # Setup.
+        copy_words(["read", "dear", "foo"])
+        AnagramGroup.objects.update(count=7)
+        assert check_groups()
+
+        # Do.
+        response = self._start(client, django_capture_on_commit_callbacks, "jobs-rebuild-anagram-groups")
+
+        # Check.
+        job = client.get(response["Location"]).data
+        assert job["status"] == "succeeded", job["error"]
+        assert job["result"] == {"groups": 2}
+        assert job["throughput"] is None or job["throughput"] >= 0
+        assert not check_groups()
+
+    def test_failed_job(self, client, monkeypatch, django_capture_on_commit_callbacks):
+        # Setup.
+        def fail():
+            raise RuntimeError("Out of disk space")
+
+        monkeypatch.setattr(tasks, "rebuild_groups", fail)
+
+        # Do.
+        response = self._start(client, django_capture_on_commit_callbacks, "jobs-rebuild-anagram-groups")
+
+        # Check.
+        job = client.get(response["Location"]).data
+        assert job["status"] == "failed"
+        assert job["error"] == "RuntimeError: Out of disk space"
+        assert job["finished_at"] is not None
+
+    def test_job_is_run_only_once(self, monkeypatch):
+        # Setup.
+        job = Job.objects.create(kind=Job.Kind.REBUILD_GROUPS, status=Job.Status.SUCCEEDED)
+        monkeypatch.setattr(tasks, "rebuild_groups", pytest.fail)
+
+        # Do.
+        tasks.run_job(str(job.pk))
+
+        # Check.
+        job.refresh_from_db()
+        assert job.status == Job.Status.SUCCEEDED
+
+    def test_list_jobs(self, client):
+        # Setup.
+        jobs = [Job.objects.create(kind=kind) for kind in Job.Kind]
+
+        # Do.
+        response = client.get(reverse("jobs-list"))
+
+        # Check.
+        assert response.status_code == 200
+        assert [job["id"] for job in response.data["results"]] == [str(job.pk) for job in reversed(jobs)]
+        assert {job["progress"] for job in response.data["results"]} == {None}
+
+
+@pytest.mark.django_db
+class TestMetrics:
+    @staticmethod
+    def _scrape(client):
+        response = client.get(reverse("metrics"))
+        assert response.status_code == 200
+        assert response["Content-Type"] == metrics.CONTENT_TYPE
+        return response.content.decode()
+
+    def test_requests_and_queries_are_recorded_per_route(self, client):
+        # Setup.
+        copy_words(["read", "dear", "foo"])
+        route = "words-get-word-length-statistics"
+        requests_before = metrics.requests_total.value(route=route, method="GET", status=200)
+        queries_before = metrics.queries_total.value(route=route)
+
+        # Do.
+        response = client.get(reverse(route))
+        text = self._scrape(client)
+
+        # Check.
+        assert response.status_code == 200
+        assert metrics.requests_total.value(route=route, method="GET", status=200) == requests_before + 1
+        assert metrics.queries_total.value(route=route) > queries_before
+        assert metrics.query_seconds_total.value(route=route) > 0
+        assert f'anagram_http_requests_total{{route="{route}",method="GET",status="200"}} ' in text
+        assert f'anagram_http_request_duration_seconds_bucket{{route="{route}",method="GET",le="+Inf"}} ' in text
+        assert f'anagram_db_queries_per_request_count{{route="{route}"}} ' in text
+        assert "# TYPE anagram_http_request_duration_seconds histogram" in text
+
+    def test_unmatched_routes_share_a_label(self, client):
+        # Setup.
+        before = metrics.requests_total.value(route="unmatched", method="GET", status=404)
+
+        # Do.
+        for path in ["/no/such/page/", "/another/missing/page/"]:
+            client.get(path)
+
+        # Check.
+        assert metrics.requests_total.value(route="unmatched", method="GET", status=404) == before + 2
+
+    def test_words_ingested(self, client, django_capture_on_commit_callbacks):
+        # Setup.
+        before = metrics.words_ingested_total.value()
+
+        # Do.
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(
+                reverse("words") + "?bulk=true", {"anagrams": ["read", "dear"]}, content_type="application/json"
+            )
+
+        # Check.
+        assert metrics.words_ingested_total.value() == before + 2
+        assert f"anagram_words_ingested_total {before + 2}\n" in self._scrape(client)
+
+    def test_disabled(self, client, settings):
+        # Setup.
+        settings.ANAGRAM_METRICS_ENABLED = False
+        route = "words-get-word-length-statistics"
+        before = metrics.requests_total.value(route=route, method="GET", status=200)
+
+        # Do.
+        client.get(reverse(route))
+
+        # Check.
+        assert metrics.requests_total.value(route=route, method="GET", status=200) == before
+
+    def test_histogram_text_format(self, settings):
+        # Setup.
+        settings.TEST_BUCKETS = [1, 0.5]
+        histogram = metrics.Histogram("test_seconds", "Test histogram.", ("route",), buckets_setting="TEST_BUCKETS")
+
+        # Do.
+        for value in [0.25, 0.5, 0.75, 3]:
+            histogram.observe(value, route='a "b"')
+
+        # Check.
+        assert histogram.render() == (
+            "# HELP test_seconds Test histogram.\n"
+            "# TYPE test_seconds histogram\n"
+            'test_seconds_bucket{route="a \\"b\\"",le="0.5"} 2\n'
+            'test_seconds_bucket{route="a \\"b\\"",le="1"} 3\n'
+            'test_seconds_bucket{route="a \\"b\\"",le="+Inf"} 4\n'
+            'test_seconds_sum{route="a \\"b\\""} 4.5\n'
+            'test_seconds_count{route="a \\"b\\""} 4\n'
+        )
+
+
+@pytest.mark.django_db
+class TestQueryBudgets:
+    @pytest.mark.parametrize("view_class", [WordAPIView, WordViewSet, AnagramViewSet])
+    def test_every_action_has_a_budget(self, view_class):
+        # Setup.
+        if issubclass(view_class, GenericViewSet):
+            handlers = [extra_action.__name__ for extra_action in view_class.get_extra_actions()]
+        else:
+            handlers = [method for method in view_class.http_method_names if method != "options"]
+            handlers = [method for method in handlers if hasattr(view_class, method)]
+
+        # Check.
+        assert handlers
+        assert [handler for handler in handlers if not hasattr(getattr(view_class, handler), "query_budget")] == []
+
+    def test_writes_stay_within_budget_however_many_words(self, client):
+        # Setup.
+        words = [f"word{letter}{other}" for letter in string.ascii_lowercase for other in string.ascii_lowercase]
+
+        # Do.
+        response = client.post(reverse("words"), {"anagrams": words}, content_type="application/json")
+
+        # Check.
+        assert response.status_code == 201
+        assert Word.objects.count() == len(words)
+
+    def test_going_over_the_budget_fails_with_the_sql(self, client, monkeypatch):
+        # Setup.
+        copy_words(["read", "dear"])
+        monkeypatch.setattr(WordViewSet.get_word_length_statistics, "query_budget", QueryBudget(queries=0))
+
+        # Do.
+        with pytest.raises(pytest.fail.Exception) as error:
+            client.get(reverse("words-get-word-length-statistics"))
+
+        # Check.
+        message = str(error.value)
+        assert message.startswith("GET /words/length-stats/ ran 1 queries in ")
+        assert "over its budget of 0 queries:" in message
+        assert 'SELECT "anagram_word"."length", COUNT("anagram_word"."id")' in message
+
+    def test_going_over_the_time_budget_fails(self, client, monkeypatch):
+        # Setup.
+        copy_words(["read", "dear"])
+        monkeypatch.setattr(WordViewSet.get_word_length_statistics, "query_budget", QueryBudget(queries=10, seconds=0))
+
+        # Do.
+        with pytest.raises(pytest.fail.Exception) as error:
+            client.get(reverse("words-get-word-length-statistics"))
+
+        # Check.
+        assert "over its budget of 10 queries in 0.0ms:" in str(error.value)
+
+    def test_views_without_a_budget_are_not_checked(self, client):
+        # Do.
+        response = client.get(reverse("jobs-list"))
+
+        # Check.
+        assert response.status_code == 200
+
+
+# The replica is a second connection to the test database, so it only sees committed rows.
+@pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+class TestReplicaRouting:
+    @pytest.fixture(autouse=True)
+    def words(self, settings):
+        settings.ANAGRAM_REPLICA_DATABASE = "replica"
+        with transaction.atomic():
+            copy_words(["read", "dear", "dare", "foo"])
+
+    @staticmethod
+    def _request(client, method, url, payload=None):
+        """Send a request, returning the response and the number of queries run on each database alias."""
+        queries = Counter()
+
+        def count_query(alias):
+            def execute_wrapper(execute, sql, params, many, context):
+                queries[alias] += 1
+                return execute(sql, params, many, context)
+
+            return execute_wrapper
+
+        with ExitStack() as stack:
+            for alias in ["default", "replica"]:
+                stack.enter_context(connections[alias].execute_wrapper(count_query(alias)))
+            response = getattr(client, method)(url, payload, content_type="application/json")
+        return response, queries
+
+    @pytest.mark.parametrize(
+        "method, url, payload",
+        [
+            ("get", reverse("anagrams-get-anagrams-for-word", kwargs={"word": "read"}), None),
+            ("post", reverse("anagrams-get-anagrams-for-words"), {"words": ["read", "foo"]}),
+            ("get", reverse("words-get-word-length-statistics"), None),
+            ("get", reverse("words-get-biggest-anagram-group"), None),
+            ("get", f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=2", None),
+        ],
+    )
+    def test_reads_go_to_the_replica(self, client, method, url, payload):
+        # Do.
+        response, queries = self._request(client, method, url, payload)
+
+        # Check.
+        assert response.status_code == 200
+        assert queries["replica"] > 0
+        assert queries["default"] == 0
+
+    @pytest.mark.parametrize("setting", ["ANAGRAM_CACHE_ENABLED", "ANAGRAM_ETAG_ENABLED"])
+    def test_reads_of_cached_responses_go_to_default(self, client, settings, setting):
+        # Setup: a lagging replica's response would be kept under the new dataset version.
+        settings.ANAGRAM_CACHE_ENABLED = settings.ANAGRAM_ETAG_ENABLED = False
+        setattr(settings, setting, True)
+        cache.clear()
+
+        # Do.
+        response, queries = self._request(client, "get", reverse("words-get-word-length-statistics"))
+
+        # Check.
+        assert response.status_code == 200
+        assert queries["default"] > 0
+        assert queries["replica"] == 0
+        cache.clear()
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            reverse("anagrams-get-anagrams-for-word", kwargs={"word": "read"}),
+            reverse("anagrams-get-words-from-letters", kwargs={"letters": "daer"}),
+        ],
+    )
+    def test_index_builds_read_from_default(self, client, settings, url):
+        # Setup.
+        settings.ANAGRAM_INDEX_ENABLED = True
+        anagram_index.reset()
+        letter_index.reset()
+
+        # Do.
+        response, queries = self._request(client, "get", url)
+
+        # Check.
+        assert response.status_code == 200
+        assert queries["default"] > 0
+        assert queries["replica"] == 0
+        anagram_index.reset()
+        letter_index.reset()
+
+    def test_writes_go_to_default(self, client):
+        # Do.
+        response, queries = self._request(client, "post", reverse("words"), {"anagrams": ["ared", "oof"]})
+
+        # Check.
+        assert response.status_code == 201
+        assert queries["default"] > 0
+        assert queries["replica"] == 0
+        assert sorted(Word.objects.filter(sorted_lowercase_word="ader").values_list("word", flat=True)) == [
+            "ared",
+            "dare",
+            "dear",
+            "read",
+        ]
+
+    def test_reads_outside_of_read_only_views_go_to_default(self):
+        # Check.
+        assert Word.objects.all().db == "default"
+        with replica_reads():
+            assert Word.objects.all().db == "replica"
+            with primary_reads():
+                assert Word.objects.all().db == "default"
+            assert Word.objects.all().db == "replica"
+
+    def test_only_read_only_routes_are_exempt_from_atomic_requests(self):
+        # Do.
+        read_view = WordViewSet.as_view({"get": "get_word_length_statistics"})
+        write_view = WordViewSet.as_view({"delete": "delete_word"})
+
+        # Check.
+        assert getattr(read_view, "_non_atomic_requests", set()) == {"default"}
+        assert getattr(write_view, "_non_atomic_requests", set()) == set()
+
+
+@pytest.mark.django_db
+class TestLoadDictionaryCommand:
+    @pytest.fixture
+    def dictionary_file(self, tmp_path):
+        path = tmp_path / "dictionary.txt"
+        path.write_text("dear\nRead\n\nfoo, bar\n  dare  \n", encoding="utf-8")
+        return path
+
+    @pytest.mark.parametrize("vendor", ["postgresql", "sqlite"])
+    def test_load_dictionary(self, dictionary_file, monkeypatch, vendor):
+        # Setup.
+        monkeypatch.setattr(connection, "vendor", vendor)
+
+        # Do.
+        out = io.StringIO()
+        call_command("load_dictionary", str(dictionary_file), "--batch-size=2", stdout=out)
+
+        # Check.
+        fields = ("word", "sorted_word", "sorted_lowercase_word", "is_proper_noun", "length")
+        assert list(Word.objects.values_list(*fields)) == [
+            ("dear", "ader", "ader", False, 4),
+            ("Read", "Rade", "ader", True, 4),
+            ("foo, bar", " ,abfoor", " ,abfoor", False, 8),
+            ("dare", "ader", "ader", False, 4),
+        ]
+        assert "Loaded 4 words in" in out.getvalue()
+
+    def test_load_dictionary_with_truncate(self, dictionary_file):
+        # Setup.
+        make(Word, _quantity=3)
+
+        # Do.
+        call_command("load_dictionary", str(dictionary_file), "--truncate", stdout=io.StringIO())
+
+        # Check.
+        assert Word.objects.count() == 4
+        assert not check_groups()
+
+    def test_load_into_empty_tables_builds_indexes_afterwards(self, dictionary_file):
+        # Setup.
+        tables = [Word._meta.db_table, AnagramGroup._meta.db_table]
+
+        def schema():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = ANY(%s::regclass[]) "
+                    "UNION ALL "
+                    "SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = ANY(%s::regclass[])",
+                    [tables, tables],
+                )
+                return sorted(row[0] for row in cursor.fetchall())
+
+        expected_schema = schema()
+        executed = []
+
+        def record(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        # Do.
+        with connection.execute_wrapper(record):
+            call_command("load_dictionary", str(dictionary_file), stdout=io.StringIO())
+
+        # Check: the indexes and the foreign key of the words were dropped during the load and are all back.
+        assert any(sql.startswith("DROP INDEX") for sql in executed)
+        assert any("DROP CONSTRAINT" in sql for sql in executed)
+        assert schema() == expected_schema
+        assert Word.objects.count() == 4
+        assert not check_groups()
+
+
+@pytest.mark.django_db
+class TestAnagramGroups:
+    @staticmethod
+    def _groups():
+        return dict(AnagramGroup.objects.values_list("signature", "count"))
+
+    @pytest.mark.parametrize("bulk", [False, True])
+    def test_groups_follow_writes(self, client, bulk):
+        # Do & Check: add.
+        url = f"{reverse('words')}?bulk={bulk}"
+        payload = {"anagrams": ["foo", "ofo", "oof", "bar", "rab", "baz"]}
+        client.post(url, payload, content_type="application/json")
+        client.post(url, {"anagrams": ["Foo", "foo"]}, content_type="application/json")
+        assert self._groups() == {"foo": 4, "abr": 2, "abz": 1}
+        assert not check_groups()
+
+        # Do & Check: delete single word.
+        client.delete(reverse("words-delete-word", kwargs={"word": "baz"}))
+        client.delete(reverse("words-delete-word", kwargs={"word": "ofo"}))
+        assert self._groups() == {"foo": 3, "abr": 2}
+
+        # Do & Check: delete word and its anagrams.
+        client.delete(reverse("anagrams-delete-word-and-anagrams", kwargs={"word": "bar"}))
+        assert self._groups() == {"foo": 3}
+        assert not check_groups()
+
+        # Do & Check: delete all.
+        client.delete(reverse("words"))
+        assert self._groups() == {}
+
+    def test_load_dictionary_fills_groups(self, tmp_path):
+        # Setup.
+        path = tmp_path / "dictionary.txt"
+        path.write_text("dear\nRead\ndare\nfoo\n", encoding="utf-8")
+
+        # Do.
+        call_command("load_dictionary", str(path), stdout=io.StringIO())
+
+        # Check.
+        assert self._groups() == {"ader": 3, "foo": 1}
+        assert not check_groups()
+
+    def test_rebuild_anagram_groups(self):
+        # Setup.
+        make(Word, word="dear", sorted_lowercase_word="ader")
+        make(Word, word="read", sorted_lowercase_word="ader")
+        make(AnagramGroup, signature="ader", count=5, length=4)
+        make(AnagramGroup, signature="stale", count=1, length=5)
+
+        # Do & Check: drift is reported.
+        out = io.StringIO()
+        with pytest.raises(CommandError):
+            call_command("rebuild_anagram_groups", "--check", stdout=out)
+        assert "Words without a group: 2" in out.getvalue()
+        assert "ader: stored 5, actual 2" in out.getvalue()
+        assert "stale: stored 1, actual 0" in out.getvalue()
+
+        # Do & Check: rebuild fixes it.
+        call_command("rebuild_anagram_groups", stdout=io.StringIO())
+        assert self._groups() == {"ader": 2}
+        assert set(Word.objects.values_list("group__signature", flat=True)) == {"ader"}
+        out = io.StringIO()
+        call_command("rebuild_anagram_groups", "--check", stdout=out)
+        assert "up to date" in out.getvalue()
+
+
+class TestHelpers:
+    @pytest.mark.parametrize(
+        "value_counts,expected",
+        [
+            ([], None),
+            ([(3, 0)], None),
+            ([(6, 1)], 6),
+            ([(5, 1), (6, 1)], 5.5),
+            ([(2, 1), (3, 4), (4, 1), (7, 1), (10, 1)], 3),
+            ([(1, 2), (9, 2)], 5.0),
+            ([(1, 3), (9, 1)], 1.0),
+        ],
+    )
+    def test_calculate_median(self, value_counts, expected):
+        assert calculate_median(value_counts) == expected
+
+
+@pytest.mark.django_db
+class TestAnagramGroupsPagination:
+    PAIRS = ["ab", "bc", "cd", "de", "ef", "fg", "gh", "hi", "ij", "jk", "kl", "lm"]
+
+    @pytest.fixture
+    def words(self, client):
+        # 12 groups of two words ("ab"/"ba", "bc"/"cb", ...) plus one group of three.
+        words = [word for pair in self.PAIRS for word in (pair, pair[::-1])] + ["xyz", "zyx", "yxz"]
+        client.post(f"{reverse('words')}?bulk=true", {"anagrams": words}, content_type="application/json")
+        return words
+
+    def test_page_queries_do_not_grow_with_groups(self, client, words, django_assert_num_queries):
+        # Do & Check: count, page, words of all groups on the page.
+        url = f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=2"
+        with django_assert_num_queries(3):
+            response = client.get(url)
+        assert response.data["count"] == 13
+        assert response.data["results"][0] == {"count": 3, "words": ["xyz", "zyx", "yxz"]}
+        assert response.data["results"][1] == {"count": 2, "words": ["ab", "ba"]}
+
+    def test_cursor_pagination_walks_all_groups(self, client, words, django_assert_max_num_queries):
+        # Setup.
+        url = f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=2&pagination=cursor"
+
+        # Do.
+        pages = []
+        while url:
+            # One or two range scans for the page, words of all groups on the page.
+            with django_assert_max_num_queries(3):
+                response = client.get(url)
+            assert response.status_code == 200, response.data
+            assert "count" not in response.data
+            pages.append(response.data["results"])
+            url = response.data["next"]
+
+        # Check.
+        assert [len(page) for page in pages] == [10, 3]
+        groups = [group for page in pages for group in page]
+        assert groups[0] == {"count": 3, "words": ["xyz", "zyx", "yxz"]}
+        assert [group["words"][0] for group in groups[1:]] == self.PAIRS
+
+    def test_cursor_pagination_keeps_filters(self, client, words):
+        # Do.
+        url = f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=3&pagination=cursor"
+        response = client.get(url)
+
+        # Check.
+        assert response.data == {"next": None, "results": [{"count": 3, "words": ["xyz", "zyx", "yxz"]}]}
+
+    def test_invalid_cursor(self, client, words):
+        # Do.
+        url = f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?pagination=cursor&cursor=garbage"
+        response = client.get(url)
+
+        # Check.
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestWordIndexes:
+    @pytest.fixture
+    def dictionary(self):
+        # A few thousand generated words are enough for the planner to prefer the indexes, once it has statistics.
+        generator = random.Random(0)
+        words = ["".join(generator.choices(string.ascii_lowercase, k=generator.randint(3, 10))) for _ in range(5000)]
+        copy_words([*words, "dear", "read", "Dare"])
+        with connection.cursor() as cursor:
+            for model in (Word, AnagramGroup, AnagramGroupDeletion):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def test_lookups_use_index_scans(self, dictionary):
+        # Setup.
+        querysets = {
+            "anagrams": Word.objects.filter(sorted_lowercase_word="ader").exclude(word="dear").values_list("word"),
+            "anagrams without proper nouns": (
+                Word.objects.filter(sorted_lowercase_word="ader", is_proper_noun=False).values_list("word")[:5]
+            ),
+            "single word": Word.objects.filter(word="dear"),
+            "words of groups": Word.objects.filter(group_id__in=[1, 2, 3]),
+            "biggest group": AnagramGroup.objects.order_by("-count", "signature")[:1],
+            "groups of at least size x": AnagramGroup.objects.filter(count__gte=5).order_by("-count", "signature")[
+                :10
+            ],
+        }
+
+        # Do & Check.
+        for name, queryset in querysets.items():
+            plan = queryset.explain()
+            assert "Index" in plan and "Seq Scan" not in plan, f"{name}:\n{plan}"
+
+    @pytest.mark.parametrize("word", ["read", "reads"])
+    def test_near_anagrams_use_index_scans(self, client, dictionary, word):
+        # Setup.
+        url = reverse("anagrams-get-near-anagrams", kwargs={"word": word})
+
+        # Do.
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+
+        # Check: every query the lookup ran is answered from an index.
+        assert response.status_code == 200
+        lookups = [query["sql"] for query in queries if "anagram_" in query["sql"]]
+        assert len(lookups) == 3
+        with connection.cursor() as cursor:
+            for sql in lookups:
+                cursor.execute(f"EXPLAIN {sql}")
+                plan = "\n".join(row for (row,) in cursor.fetchall())
+                assert "Index" in plan and "Seq Scan" not in plan, f"{sql}:\n{plan}"
+
+
+@pytest.mark.django_db
+class TestUniqueWords:
+    migration = importlib.import_module("anagram.migrations.0006_unique_word")
+
+    @pytest.fixture
+    def unique_words(self, settings):
+        settings.ANAGRAM_UNIQUE_WORDS = True
+        with connection.schema_editor() as schema_editor:
+            self.migration.add_unique_word_constraint(django_apps, schema_editor)
+        yield
+        with connection.schema_editor() as schema_editor:
+            self.migration.remove_unique_word_constraint(django_apps, schema_editor)
+
+    def test_enabling_removes_existing_duplicates(self, client, settings):
+        # Setup.
+        copy_words(["dear", "read", "dear", "dear", "foo"])
+        assert AnagramGroup.objects.get(signature="ader").count == 4
+
+        # Do.
+        settings.ANAGRAM_UNIQUE_WORDS = True
+        with connection.schema_editor() as schema_editor:
+            self.migration.add_unique_word_constraint(django_apps, schema_editor)
+
+        # Check.
+        assert list(Word.objects.values_list("word", flat=True)) == ["dear", "read", "foo"]
+        assert not check_groups()
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Word.objects.create(word="dear", sorted_word="ader", sorted_lowercase_word="ader", length=4)
+
+    def test_constraint_is_optional(self):
+        # Do.
+        with connection.schema_editor() as schema_editor:
+            self.migration.add_unique_word_constraint(django_apps, schema_editor)
+
+        # Check.
+        assert copy_words(["dear", "dear"]) == 2
+
+    def test_inserts_skip_conflicts(self, unique_words):
+        # Setup.
+        copy_words(["dear", "foo"])
+
+        # Do & Check: the loader skips words that are already stored.
+        assert copy_words(["dear", "read", "dare"]) == 2
+
+        # Do & Check: so do bulk uploads that race with another insert of the same word.
+        words = [build_word("read"), build_word("Read")]
+        link_groups(words)
+        inserted = insert_words(words)
+        assert [(word.word, word.pk is not None) for word in inserted] == [("Read", True)]
+
+        # Check.
+        assert list(Word.objects.values_list("word", flat=True)) == ["dear", "foo", "read", "dare", "Read"]
+        assert AnagramGroup.objects.get(signature="ader").count == 3
@@ -1,18 +1,52 @@
-from django.urls import path, reverse_lazy
+from django.conf import settings
+from django.urls import path, re_path, reverse_lazy
 from django.views.generic import RedirectView
 from rest_framework.routers import DefaultRouter
 
-from anagram.views import AnagramViewSet, WordAPIView, WordViewSet
+from anagram import async_views
+from anagram.metrics import metrics_view
+from anagram.views import AnagramViewSet, JobViewSet, WordAPIView, WordImportAPIView, WordViewSet
 
 router = DefaultRouter()
 
 router.register("words", WordViewSet, basename="words")
 router.register("anagrams", AnagramViewSet, basename="anagrams")
+router.register("jobs", JobViewSet, basename="jobs")
 
+# Async read endpoints, same URLs and names as the router's routes they shadow (see `ANAGRAM_ASYNC_VIEWS`).
+async_urlpatterns = [
+    re_path(
+        r"^words/length-stats/$",
+        async_views.WordLengthStatsView.as_view(),
+        name="words-get-word-length-statistics",
+    ),
+    re_path(
+        r"^words/biggest-anagram-group/$",
+        async_views.BiggestAnagramGroupView.as_view(),
+        name="words-get-biggest-anagram-group",
+    ),
+    re_path(
+        r"^words/anagram-groups/$",
+        async_views.AnagramGroupsView.as_view(),
+        name="words-get-anagram-groups-of-at-least-size-x",
+    ),
+    re_path(
+        r"^anagrams/<(?P<word>[\w?]+)>.json/$",
+        async_views.AnagramsForWordView.as_view(),
+        name="anagrams-get-anagrams-for-word",
+    ),
+    re_path(r"^anagrams/batch/$", async_views.BatchAnagramsView.as_view(), name="anagrams-get-anagrams-for-words"),
+]
 
 urlpatterns = [
     # Default redirect to Swagger UI
     path("", RedirectView.as_view(url=reverse_lazy("swagger-ui")), name="index"),
     # Words / Anagrams related URLs
     path("words.json/", WordAPIView.as_view(), name="words"),
-] + router.urls
+    path("words/import/", WordImportAPIView.as_view(), name="words-import"),
+    # Prometheus scrapes `/metrics`, without a trailing slash.
+    path("metrics", metrics_view, name="metrics"),
+]
+if settings.ANAGRAM_ASYNC_VIEWS:
+    urlpatterns += async_urlpatterns
+urlpatterns += router.urls
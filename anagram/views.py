@@ -1,97 +1,256 @@
-from django.db.models import Avg, Count, Max, Min
+import itertools
+import time
+from collections import defaultdict
+from collections.abc import Iterable
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Count, Prefetch, QuerySet, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, extend_schema
-from rest_framework import status
+from rest_framework import mixins, status
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
+from anagram import export
+from anagram.budgets import query_budget
+from anagram.cache import (
+    cached_response,
+    conditional_response,
+    dataset_version,
+    single_flight,
+)
+from anagram.groups import delete_groups, deletion_signatures, release_groups
 from anagram.helpers import calculate_median, to_python_bool
-from anagram.models import Word
+from anagram.index import anagram_index
+from anagram.ingest import bulk_insert_words, bump_indexed_dataset_version, import_word_list, on_words_created
+from anagram.letters import letter_index
+from anagram.models import AnagramGroup, AnagramGroupDeletion, Job, Word
+from anagram.pagination import AnagramGroupCursorPagination
+from anagram.phrases import parallel_search_phrases, start_workers
+from anagram.routers import NonAtomicReadsMixin, read_only
 from anagram.serializers import (
     AnagramsListSerializer,
+    BatchAnagramsRequestSerializer,
+    BatchAnagramsSerializer,
+    BulkInsertResultSerializer,
+    CacheStatsSerializer,
+    ExportRequestSerializer,
+    GroupExportRequestSerializer,
+    ImportSummarySerializer,
     IsAnagramSerializer,
+    JobSerializer,
     MostAnagramsSerializer,
+    NearAnagramsSerializer,
     PaginatedAnagramGroupSerializer,
+    PhraseAnagramsRequestSerializer,
+    PhraseAnagramsSerializer,
     SimpleWordSerializer,
     WordLengthStatsSerializer,
     WordListSerializer,
+    WordListUploadSerializer,
+    WordsFromLettersSerializer,
 )
+from anagram.tasks import enqueue_job
+
+# Part of `ANAGRAM_PHRASE_TIME_BUDGET` the phrase search may take, the rest is left to spell out the phrases it found.
+PHRASE_SEARCH_BUDGET_SHARE = 0.9
 
 
 class WordAPIView(APIView):
     permission_classes = [AllowAny]
 
-    @extend_schema(request=AnagramsListSerializer, responses={status.HTTP_201_CREATED: None})
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="bulk",
+                description="Report how many words were inserted and how many were skipped as duplicates.",
+                type=OpenApiTypes.BOOL,
+                location=OpenApiParameter.QUERY,
+            ),
+        ],
+        request=AnagramsListSerializer,
+        responses={status.HTTP_201_CREATED: BulkInsertResultSerializer, status.HTTP_202_ACCEPTED: JobSerializer},
+    )
+    @query_budget(10)
     def post(self, request):
-        """Add a list of words to the database."""
+        """Add a list of words to the database. Lists of more than `ANAGRAM_UPLOAD_MAX_WORDS` words are imported by a
+        background job instead, which is returned with `202 Accepted`."""
         serializer = AnagramsListSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         words = serializer.validated_data["anagrams"]
-        for word in words:
-            Word.objects.get_or_create(
-                word=word,
-                sorted_word="".join(sorted(word)),
-                sorted_lowercase_word="".join(sorted(word.lower())),
-                is_proper_noun=word.istitle(),
-                length=len(word),
-            )
+        if len(words) > settings.ANAGRAM_UPLOAD_MAX_WORDS:
+            job = Job(kind=Job.Kind.IMPORT_WORDS)
+            job.upload.save("words.txt", ContentFile("\n".join(words).encode()), save=False)
+            return start_job(request, job)
+        # Words that are already stored are skipped, in a constant number of queries however many words are sent.
+        result = bulk_insert_words(words)
+        on_words_created(result.created)
+        if to_python_bool(request.query_params.get("bulk")):
+            serializer = BulkInsertResultSerializer({"inserted": result.inserted, "skipped": result.skipped})
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(status=status.HTTP_201_CREATED)
 
     @extend_schema(responses={status.HTTP_204_NO_CONTENT: None})
+    @query_budget(3)
     def delete(self, request):
         """Delete all words from the database."""
         Word.objects.all().delete()
+        delete_groups(AnagramGroup.objects.all())
+        transaction.on_commit(anagram_index.clear)
+        transaction.on_commit(letter_index.clear)
+        transaction.on_commit(bump_indexed_dataset_version)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class WordViewSet(GenericViewSet):
+class WordImportAPIView(APIView):
+    permission_classes = [AllowAny]
+    parser_classes = [MultiPartParser]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Batches are committed one by one, instead of the whole upload being a single transaction (`ATOMIC_REQUESTS`).
+        return transaction.non_atomic_requests(super().as_view(**initkwargs))
+
+    @extend_schema(
+        request={
+            "multipart/form-data": WordListUploadSerializer,
+            "text/plain": OpenApiTypes.BINARY,
+            "application/gzip": OpenApiTypes.BINARY,
+        },
+        responses={status.HTTP_201_CREATED: ImportSummarySerializer},
+    )
+    def post(self, request):
+        """Import a word list file (one word per line, plain text or gzipped), sent as the `file` field of a
+        multipart form or as the raw request body. The file is read as a stream and its words are committed in
+        batches, so it can be as big as needed."""
+        file = get_word_list_file(request)
+        summary = import_word_list(file, batch_size=settings.ANAGRAM_IMPORT_BATCH_SIZE, on_insert=on_words_created)
+        return Response(ImportSummarySerializer(summary).data, status=status.HTTP_201_CREATED)
+
+
+def get_word_list_file(request):
+    """The uploaded word list: the `file` field of a multipart form or the raw request body."""
+    if request.content_type.startswith("multipart/form-data"):
+        serializer = WordListUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data["file"]
+    if request.stream is None:
+        raise ValidationError("Send the word list as the request body or as the `file` field of a form.")
+    return request.stream
+
+
+def start_job(request, job: Job) -> Response:
+    """Save and queue a job, answering with the job and its URL."""
+    job.save()
+    enqueue_job(job)
+    location = reverse("jobs-detail", args=[job.pk], request=request)
+    return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED, headers={"Location": location})
+
+
+class JobViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, GenericViewSet):
+    """Heavy writes run by a Celery worker (see `anagram/tasks.py`). Starting one returns the job straight away, its
+    progress, throughput and errors can then be followed at `/jobs/<id>/`."""
+
+    permission_classes = [AllowAny]
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+
+    @extend_schema(
+        request={
+            "multipart/form-data": WordListUploadSerializer,
+            "text/plain": OpenApiTypes.BINARY,
+            "application/gzip": OpenApiTypes.BINARY,
+        },
+        responses={status.HTTP_202_ACCEPTED: JobSerializer},
+    )
+    @action(detail=False, methods=["post"], url_path=r"import-words", parser_classes=[MultiPartParser])
+    def import_words(self, request):
+        """Import a word list file like `/words/import/` does, in the background."""
+        file = get_word_list_file(request)
+        job = Job(kind=Job.Kind.IMPORT_WORDS)
+        # Stored for the worker, which deletes it once the import has finished.
+        job.upload.save(getattr(file, "name", None) or "words.txt", File(file), save=False)
+        return start_job(request, job)
+
+    @extend_schema(request=None, responses={status.HTTP_202_ACCEPTED: JobSerializer})
+    @action(detail=False, methods=["post"], url_path=r"delete-words")
+    def delete_words(self, request):
+        """Delete all words from the database in the background, in batches."""
+        return start_job(request, Job(kind=Job.Kind.DELETE_WORDS))
+
+    @extend_schema(request=None, responses={status.HTTP_202_ACCEPTED: JobSerializer})
+    @action(detail=False, methods=["post"], url_path=r"rebuild-anagram-groups")
+    def rebuild_anagram_groups(self, request):
+        """Rebuild the anagram groups from the words in the background, like `rebuild_anagram_groups` does."""
+        return start_job(request, Job(kind=Job.Kind.REBUILD_GROUPS))
+
+
+class WordViewSet(NonAtomicReadsMixin, GenericViewSet):
     permission_classes = [AllowAny]
     serializer_class = SimpleWordSerializer
 
     @action(detail=False, methods=["delete"], url_path=r"<(?P<word>\w+)>.json")
+    @query_budget(5)
     def delete_word(self, request, word):
         """Delete a word from the database."""
         word_instance = get_object_or_404(Word, word=word)
+        word_id, sorted_lowercase_word = word_instance.pk, word_instance.sorted_lowercase_word
         word_instance.delete()
+        release_groups([word_instance.group_id])
+        transaction.on_commit(lambda: anagram_index.remove_word(sorted_lowercase_word, word_id))
+        transaction.on_commit(lambda: letter_index.remove_word(sorted_lowercase_word, word_id))
+        transaction.on_commit(bump_indexed_dataset_version)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=["get"], url_path=r"length-stats", serializer_class=WordLengthStatsSerializer)
+    @read_only
+    @conditional_response
+    @cached_response
+    @single_flight
+    @query_budget(1)
     def get_word_length_statistics(self, request):
         """Collect statistics about length of words in database."""
-        stats = Word.objects.aggregate(
-            words_count=Count("id"),
-            min_word_length=Min("length"),
-            max_word_length=Max("length"),
-            average_word_length=Avg("length"),
-        )
-        median = calculate_median(list(Word.objects.values_list("length", flat=True).order_by("length")))
-        average = stats["average_word_length"]
-
-        serializer = WordLengthStatsSerializer(
-            {
-                "total_words": stats["words_count"],
-                "min_word_length": stats["min_word_length"],
-                "max_word_length": stats["max_word_length"],
-                "median_word_length": float(f"{median:.4f}") if median is not None else None,
-                "average_word_length": float(f"{average:.4f}") if average is not None else None,
-            }
-        )
+        serializer = WordLengthStatsSerializer(length_statistics(list(length_histogram())))
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["get"], url_path=r"biggest-anagram-group", serializer_class=MostAnagramsSerializer)
+    @read_only
+    @conditional_response
+    @cached_response
+    @single_flight
+    @query_budget(2)
     def get_biggest_anagram_group(self, request):
         """Get the biggest group of words that are anagrams of each other."""
-        anagram_groups = Word.objects.values("sorted_lowercase_word").annotate(count=Count("id"))
-        biggest_group = anagram_groups.order_by("-count", "sorted_lowercase_word").first()
+        biggest_group = AnagramGroup.objects.order_by("-count", "signature").first()
         if biggest_group is None:
             return Response(MostAnagramsSerializer({"count": 0, "words": []}).data)
-        words_in_biggest_group = Word.objects.filter(sorted_lowercase_word=biggest_group["sorted_lowercase_word"])
-        serializer = MostAnagramsSerializer({"count": len(words_in_biggest_group), "words": words_in_biggest_group})
+        words_in_biggest_group = Word.objects.filter(group=biggest_group).values_list("word", flat=True)
+        serializer = MostAnagramsSerializer({"count": biggest_group.count, "words": words_in_biggest_group})
+        return Response(serializer.data)
+
+    @action(detail=False, methods=["get"], url_path=r"cache-stats", serializer_class=CacheStatsSerializer)
+    @query_budget(0)
+    def get_cache_statistics(self, request):
+        """Get the dataset version and the response cache hit/miss counters of this process."""
+        stats = cached_response.stats
+        serializer = CacheStatsSerializer(
+            {
+                "enabled": settings.ANAGRAM_CACHE_ENABLED,
+                "dataset_version": dataset_version(),
+                "hits": stats.hits,
+                "misses": stats.misses,
+            }
+        )
         return Response(serializer.data)
 
     @extend_schema(
@@ -109,6 +268,20 @@ class WordViewSet(GenericViewSet):
                 type=OpenApiTypes.INT,
                 location=OpenApiParameter.QUERY,
             ),
+            OpenApiParameter(
+                name="pagination",
+                description="Use `cursor` to walk the groups with `next` links instead of page numbers. "
+                "Cursor pages skip the total count and stay fast however deep they are.",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                enum=["page", "cursor"],
+            ),
+            OpenApiParameter(
+                name="cursor",
+                description="Opaque position taken from the `next` link in cursor pagination mode.",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+            ),
         ],
         responses=PaginatedAnagramGroupSerializer,
     )
@@ -118,28 +291,60 @@ class WordViewSet(GenericViewSet):
         url_path=r"anagram-groups",
         serializer_class=MostAnagramsSerializer(many=True),
     )
+    @read_only
+    @conditional_response
+    @cached_response
+    @single_flight
+    @query_budget(3)
     def get_anagram_groups_of_at_least_size_x(self, request):
         """Get all anagram groups that are at least of size x. Minimum size is 2, default is 10."""
-        size = request.query_params.get("min_group_size") or 10
-        if int(size) < 2:
-            raise ValidationError("Minimum group size must be at least 2.")
-        anagram_groups = Word.objects.values("sorted_lowercase_word").annotate(count=Count("id"))
-        anagram_groups = anagram_groups.filter(count__gte=size).order_by("-count", "sorted_lowercase_word")
+        anagram_groups = anagram_groups_queryset(request)
 
         # Paginate the queryset
-        page = self.paginate_queryset(anagram_groups)
+        if request.query_params.get("pagination") == "cursor":
+            paginator = AnagramGroupCursorPagination()
+        else:
+            paginator = self.paginator
+        page = paginator.paginate_queryset(anagram_groups, request, view=self)
         if page is not None:
-            # For each group in the page, retrieve the original words
-            serializable_groups = []
-            for group in page:
-                words_in_group = Word.objects.filter(sorted_lowercase_word=group["sorted_lowercase_word"]).values_list(
-                    "word", flat=True
-                )
-                serializable_groups.append({"count": group["count"], "words": words_in_group})
-            return self.get_paginated_response(serializable_groups)
+            # Words of all groups in the page are fetched with a single query
+            prefetch_related_objects(page, Prefetch("words", queryset=Word.objects.only("id", "word", "group_id")))
+            serializable_groups = [
+                {"count": group.count, "words": [word.word for word in group.words.all()]} for group in page
+            ]
+            return paginator.get_paginated_response(serializable_groups)
+
+    @extend_schema(
+        parameters=[ExportRequestSerializer],
+        responses={(status.HTTP_200_OK, "application/x-ndjson"): OpenApiTypes.BINARY},
+    )
+    @action(detail=False, methods=["get"], url_path=r"export")
+    @query_budget(1)
+    def export_words(self, request):
+        """Stream all words as NDJSON or CSV, optionally gzipped."""
+        serializer = ExportRequestSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        chunks = export.export_words(params["file_format"])
+        return export.export_response(chunks, "words", params["file_format"], params["gzip"])
+
+    @extend_schema(
+        parameters=[GroupExportRequestSerializer],
+        responses={(status.HTTP_200_OK, "application/x-ndjson"): OpenApiTypes.BINARY},
+    )
+    @action(detail=False, methods=["get"], url_path=r"anagram-groups/export")
+    @query_budget(1)
+    def export_anagram_groups(self, request):
+        """Stream anagram groups of at least `min_group_size` words as NDJSON or CSV, optionally gzipped."""
+        serializer = GroupExportRequestSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        chunks = export.export_groups(params["file_format"], min_group_size=params["min_group_size"])
+        return export.export_response(chunks, "anagram-groups", params["file_format"], params["gzip"])
 
     @extend_schema(request=WordListSerializer, responses=IsAnagramSerializer)
     @action(detail=False, methods=["post"], url_path=r"anagram-check")
+    @query_budget(0)
     def check_if_words_are_anagrams(self, request):
         """Check if a list of words are anagrams of each other."""
         serializer = WordListSerializer(data=request.data)
@@ -152,44 +357,275 @@ class WordViewSet(GenericViewSet):
         return Response(IsAnagramSerializer({"is_anagram": is_anagram}).data)
 
 
-class AnagramViewSet(GenericViewSet):
+def length_histogram() -> QuerySet:
+    """`(length, count)` rows in length order. One row per distinct length is all the length statistics need."""
+    return Word.objects.order_by("length").values("length").annotate(count=Count("id")).values_list("length", "count")
+
+
+def length_statistics(length_counts: list[tuple[int, int]]) -> dict:
+    """Data for `WordLengthStatsSerializer`, computed from the rows of `length_histogram`."""
+    total_words = sum(count for _, count in length_counts)
+    median = calculate_median(length_counts)
+    average = sum(length * count for length, count in length_counts) / total_words if total_words else None
+    return {
+        "total_words": total_words,
+        "min_word_length": length_counts[0][0] if length_counts else None,
+        "max_word_length": length_counts[-1][0] if length_counts else None,
+        "median_word_length": float(f"{median:.4f}") if median is not None else None,
+        "average_word_length": float(f"{average:.4f}") if average is not None else None,
+    }
+
+
+def anagram_groups_queryset(request) -> QuerySet:
+    """Anagram groups of at least `min_group_size` words, biggest first."""
+    size = request.query_params.get("min_group_size") or 10
+    if int(size) < 2:
+        raise ValidationError("Minimum group size must be at least 2.")
+    return AnagramGroup.objects.filter(count__gte=size).order_by("-count", "signature")
+
+
+BLANK = "?"
+
+ANAGRAM_QUERY_PARAMETERS = [
+    OpenApiParameter(
+        name="limit",
+        description="Limit the number of results returned.",
+        type=OpenApiTypes.INT,
+        location=OpenApiParameter.QUERY,
+    ),
+    OpenApiParameter(
+        name="exclude_proper_nouns",
+        description="Exclude proper nouns from the results.",
+        type=OpenApiTypes.BOOL,
+        location=OpenApiParameter.QUERY,
+    ),
+]
+
+
+def get_anagram_query_options(request) -> tuple[int | None, bool]:
+    """Parse the `limit` and `exclude_proper_nouns` query parameters shared by the anagram lookups."""
+    limit = request.query_params.get("limit")
+    limit = int(limit) if limit is not None else None
+    exclude_proper_nouns = request.query_params.get("exclude_proper_nouns")
+    exclude_proper_nouns = bool(exclude_proper_nouns and to_python_bool(exclude_proper_nouns))
+    return limit, exclude_proper_nouns
+
+
+def get_anagrams_with_blanks(word: str, limit: int | None, exclude_proper_nouns: bool) -> list[str]:
+    """Anagrams of every fill of the `?` blanks in the word, served from the letter index."""
+    blanks = word.count(BLANK)
+    if blanks > settings.ANAGRAM_MAX_BLANKS:
+        raise ValidationError(f"At most {settings.ANAGRAM_MAX_BLANKS} blanks are allowed.")
+    max_results = settings.ANAGRAM_MAX_BLANK_RESULTS
+    return letter_index.get_anagrams_with_blanks(
+        word,
+        blank=BLANK,
+        limit=min(limit, max_results) if limit is not None else max_results,
+        exclude_proper_nouns=exclude_proper_nouns,
+    )
+
+
+def anagrams_queryset(word: str, limit: int | None, exclude_proper_nouns: bool) -> QuerySet:
+    """Anagrams of a word, as a `values_list` of words."""
+    sorted_lowercase_word = "".join(sorted(word.lower()))
+    anagram_qs = Word.objects.filter(sorted_lowercase_word=sorted_lowercase_word).exclude(word=word)
+    if exclude_proper_nouns:
+        anagram_qs = anagram_qs.exclude(is_proper_noun=True)
+    if limit is not None:
+        anagram_qs = anagram_qs[:limit]
+    return anagram_qs.values_list("word", flat=True)
+
+
+def indexed_batch_results(words: list[str], limit: int | None, exclude_proper_nouns: bool) -> list[dict]:
+    """Data for `BatchAnagramsSerializer`, served from the anagram index."""
+    anagrams = anagram_index.get_anagrams_for_words(words, limit=limit, exclude_proper_nouns=exclude_proper_nouns)
+    return [{"word": word, "anagrams": word_anagrams} for word, word_anagrams in zip(words, anagrams, strict=True)]
+
+
+def batch_queryset(words: list[str], exclude_proper_nouns: bool) -> QuerySet:
+    """`(signature, word)` rows of all the anagram groups of the words, fetched with a single query."""
+    signatures = {"".join(sorted(word.lower())) for word in words}
+    anagram_qs = Word.objects.filter(sorted_lowercase_word__in=signatures)
+    if exclude_proper_nouns:
+        anagram_qs = anagram_qs.exclude(is_proper_noun=True)
+    return anagram_qs.values_list("sorted_lowercase_word", "word")
+
+
+def batch_results(words: list[str], rows: Iterable[tuple[str, str]], limit: int | None) -> list[dict]:
+    """Data for `BatchAnagramsSerializer`, grouping the rows of `batch_queryset` by signature."""
+    groups = defaultdict(list)
+    for signature, group_word in rows:
+        groups[signature].append(group_word)
+    results = []
+    for word in words:
+        anagrams_list = [group_word for group_word in groups["".join(sorted(word.lower()))] if group_word != word]
+        results.append({"word": word, "anagrams": anagrams_list[:limit] if limit is not None else anagrams_list})
+    return results
+
+
+class AnagramViewSet(NonAtomicReadsMixin, GenericViewSet):
     permission_classes = [AllowAny]
     serializer_class = AnagramsListSerializer
 
+    @extend_schema(parameters=ANAGRAM_QUERY_PARAMETERS)
+    @action(detail=False, methods=["get"], url_path=r"<(?P<word>[\w?]+)>.json")
+    @read_only
+    @conditional_response
+    @cached_response
+    @query_budget(2)
+    def get_anagrams_for_word(self, request, word):
+        """Get anagrams for a word. Every `?` (sent as `%3F`) is a blank that stands for any letter."""
+        limit, exclude_proper_nouns = get_anagram_query_options(request)
+
+        if BLANK in word:
+            anagrams_list = get_anagrams_with_blanks(word, limit, exclude_proper_nouns)
+        elif settings.ANAGRAM_INDEX_ENABLED:
+            anagrams_list = anagram_index.get_anagrams(word, limit=limit, exclude_proper_nouns=exclude_proper_nouns)
+        else:
+            anagrams_list = list(anagrams_queryset(word, limit, exclude_proper_nouns))
+        serializer = self.get_serializer({"anagrams": anagrams_list})
+        return Response(data=serializer.data, status=status.HTTP_200_OK)
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
-                name="limit",
-                description="Limit the number of results returned.",
+                name="min_length",
+                description="Only return words at least this long.",
                 type=OpenApiTypes.INT,
                 location=OpenApiParameter.QUERY,
+                default=1,
             ),
-            OpenApiParameter(
-                name="exclude_proper_nouns",
-                description="Exclude proper nouns from the results.",
-                type=OpenApiTypes.BOOL,
-                location=OpenApiParameter.QUERY,
-            ),
+            *ANAGRAM_QUERY_PARAMETERS,
         ],
+        responses=WordsFromLettersSerializer,
     )
-    @action(detail=False, methods=["get"], url_path=r"<(?P<word>\w+)>.json")
-    def get_anagrams_for_word(self, request, word):
-        """Get anagrams for a word."""
-        sorted_lowercase_word = "".join(sorted(word.lower()))
-        anagram_qs = Word.objects.filter(sorted_lowercase_word=sorted_lowercase_word).exclude(word=word)
-        limit = request.query_params.get("limit")
+    @action(detail=False, methods=["get"], url_path=r"from-letters/(?P<letters>[A-Za-z]+)")
+    @read_only
+    @conditional_response
+    @cached_response
+    @query_budget(1)
+    def get_words_from_letters(self, request, letters):
+        """Get words that can be spelled from the letters, each letter used at most once. Longest words come first."""
+        limit, exclude_proper_nouns = get_anagram_query_options(request)
+        min_length = int(request.query_params.get("min_length") or 1)
+        words = letter_index.get_words(
+            letters, min_length=min_length, limit=limit, exclude_proper_nouns=exclude_proper_nouns
+        )
+        return Response(WordsFromLettersSerializer({"words": words}).data, status=status.HTTP_200_OK)
+
+    @extend_schema(parameters=ANAGRAM_QUERY_PARAMETERS, responses=NearAnagramsSerializer)
+    @action(detail=False, methods=["get"], url_path=r"near/(?P<word>\w+)")
+    @read_only
+    @conditional_response
+    @cached_response
+    @query_budget(3)
+    def get_near_anagrams(self, request, word):
+        """Get words that are anagrams of the word with one letter added, removed or substituted."""
+        limit, exclude_proper_nouns = get_anagram_query_options(request)
+        signature = "".join(sorted(word.lower()))
+        deletions = deletion_signatures(signature)
+
+        # A letter was added if the word's signature is one of their deletions and substituted if both share a
+        # deletion: both come from the deletion index. A letter was removed if their signature is one of the word's
+        # deletions. Separate queries, each answered by one index: an OR of the two lookups is a scan of all words.
+        near_group_ids = list(
+            AnagramGroupDeletion.objects.filter(deletion__in=deletions | {signature})
+            .values_list("group_id", flat=True)
+            .distinct()
+        )
+        near_qs = Word.objects.filter(group_id__in=near_group_ids).exclude(sorted_lowercase_word=signature)
+        removed_qs = Word.objects.filter(sorted_lowercase_word__in=deletions)
+        if exclude_proper_nouns:
+            near_qs = near_qs.exclude(is_proper_noun=True)
+            removed_qs = removed_qs.exclude(is_proper_noun=True)
+        near_anagrams = {"added": [], "substituted": []}
+        kinds = {len(signature) + 1: "added", len(signature): "substituted"}
+        for near_word, near_signature in near_qs.order_by("id").values_list("word", "sorted_lowercase_word"):
+            near_anagrams[kinds[len(near_signature)]].append(near_word)
+        near_anagrams["removed"] = list(removed_qs.order_by("id").values_list("word", flat=True))
         if limit is not None:
-            anagram_qs = anagram_qs[: int(limit)]
-        exclude_proper_nouns = request.query_params.get("exclude_proper_nouns")
-        if exclude_proper_nouns and to_python_bool(exclude_proper_nouns):
-            anagram_qs = anagram_qs.exclude(is_proper_noun=True)
-        anagrams_list = list(anagram_qs.values_list("word", flat=True))
-        serializer = self.get_serializer({"anagrams": anagrams_list})
-        return Response(data=serializer.data, status=status.HTTP_200_OK)
+            near_anagrams = {kind: words[:limit] for kind, words in near_anagrams.items()}
+        return Response(NearAnagramsSerializer(near_anagrams).data, status=status.HTTP_200_OK)
+
+    @extend_schema(parameters=[PhraseAnagramsRequestSerializer], responses=PhraseAnagramsSerializer)
+    @action(detail=False, methods=["get"], url_path=r"phrases")
+    @read_only
+    @query_budget(1)
+    def get_phrase_anagrams(self, request):
+        """Get phrases of dictionary words that are anagrams of a phrase, e.g. "dirty room" for "dormitory"."""
+        serializer = PhraseAnagramsRequestSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        max_results = params["max_results"]
+        target = "".join(sorted(character for character in params["phrase"].lower() if not character.isspace()))
+
+        words_by_signature = letter_index.get_signatures(
+            target, min_length=params["min_length"], exclude_proper_nouns=params["exclude_proper_nouns"]
+        )
+        candidates = sorted(words_by_signature, key=lambda signature: (-len(signature), signature))
+        # The budget only starts once the index and the search processes are ready. Long phrases have a huge number of
+        # anagrams: the search returns what it found after most of the budget, the rest is left to spell them out.
+        start_workers(settings.ANAGRAM_PHRASE_WORKERS)
+        started_at = time.time()
+        deadline = started_at + settings.ANAGRAM_PHRASE_TIME_BUDGET
+        result = parallel_search_phrases(
+            candidates,
+            target,
+            max_words=params["max_words"],
+            max_results=max_results,
+            deadline=started_at + PHRASE_SEARCH_BUDGET_SHARE * settings.ANAGRAM_PHRASE_TIME_BUDGET,
+            workers=settings.ANAGRAM_PHRASE_WORKERS,
+        )
+
+        # Every row is a phrase of signatures, spelled out with every word of each signature. One more phrase than
+        # returned is enough to tell the results are incomplete.
+        phrase_words = sorted(params["phrase"].split())
+        phrases = []
+        complete = result.complete
+        rows_words = (
+            itertools.product(*(words_by_signature[candidates[row]] for row in rows)) for rows in result.phrases
+        )
+        for words in itertools.chain.from_iterable(rows_words):
+            if time.time() > deadline:
+                complete = False
+                break
+            if sorted(words) != phrase_words:
+                phrases.append(" ".join(words))
+                if len(phrases) > max_results:
+                    break
+        complete = complete and len(phrases) <= max_results
+        serializer = PhraseAnagramsSerializer({"phrases": phrases[:max_results], "complete": complete})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=ANAGRAM_QUERY_PARAMETERS,
+        request=BatchAnagramsRequestSerializer,
+        responses=BatchAnagramsSerializer,
+    )
+    @action(detail=False, methods=["post"], url_path=r"batch")
+    @read_only
+    @query_budget(2)
+    def get_anagrams_for_words(self, request):
+        """Get anagrams for many words at once. Results come in the order of the requested words."""
+        serializer = BatchAnagramsRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        words = serializer.validated_data["words"]
+        limit, exclude_proper_nouns = get_anagram_query_options(request)
+
+        if settings.ANAGRAM_INDEX_ENABLED:
+            results = indexed_batch_results(words, limit, exclude_proper_nouns)
+        else:
+            results = batch_results(words, batch_queryset(words, exclude_proper_nouns), limit)
+        return Response(BatchAnagramsSerializer({"results": results}).data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["delete"], url_path=r"delete/<(?P<word>\w+)>")
+    @query_budget(3)
     def delete_word_and_anagrams(self, request, word):
         """Delete a word and words that are its anagrams from the database."""
         sorted_lowercase_word = "".join(sorted(word.lower()))
         Word.objects.filter(sorted_lowercase_word=sorted_lowercase_word).delete()
+        delete_groups(AnagramGroup.objects.filter(signature=sorted_lowercase_word))
+        transaction.on_commit(lambda: anagram_index.remove_signature(sorted_lowercase_word))
+        transaction.on_commit(lambda: letter_index.remove_signature(sorted_lowercase_word))
+        transaction.on_commit(bump_indexed_dataset_version)
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "anagramService.settings")
+# Requests run in different threads, persistent connections would pile up (see `DATABASE_CONN_MAX_AGE`).
+os.environ.setdefault("DJANGO_CONN_MAX_AGE", "0")
 
 application = get_asgi_application()
@@ -0,0 +1,19 @@
+import os
+from pathlib import Path
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "anagramService.settings")
+
+app = Celery("anagramService")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
+
+
+@app.on_after_configure.connect
+def create_broker_folders(sender, **kwargs):
+    """The filesystem transport expects its folders to exist."""
+    if sender.conf.broker_url.startswith("filesystem://"):
+        for option in ("data_folder_in", "data_folder_out", "control_folder"):
+            if folder := sender.conf.broker_transport_options.get(option):
+                Path(folder).mkdir(parents=True, exist_ok=True)
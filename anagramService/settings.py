@@ -49,6 +49,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the whole middleware stack.
+    "anagram.metrics.MetricsMiddleware",
+    # Before everything else that reads or changes the response content.
+    "anagram.compression.CompressionMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -83,6 +87,12 @@ WSGI_APPLICATION = "anagramService.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Keep connections open between requests, checking them before reuse. Django 4.2 has no connection pool of its own; put
+# PgBouncer in front of Postgres when there are more workers than connections to spare. Under ASGI every request may
+# run in a different thread with connections of its own, so `anagramService/asgi.py` sets `DJANGO_CONN_MAX_AGE` to 0
+# unless it's set already.
+DATABASE_CONN_MAX_AGE = int(os.environ.get("DJANGO_CONN_MAX_AGE", 600))
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -92,9 +102,24 @@ DATABASES = {
         "HOST": "localhost",
         "PORT": "12432",
         "ATOMIC_REQUESTS": True,
-        "CONN_MAX_AGE": 0,
-    }
+        "CONN_MAX_AGE": DATABASE_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
+    },
+    # Read-only views read from here (see `anagram/routers.py`). Locally it's the same database; in production point it
+    # at a streaming replica of `default`.
+    "replica": {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": "django_app",
+        "USER": "django",
+        "PASSWORD": "django",
+        "HOST": "localhost",
+        "PORT": "12432",
+        "CONN_MAX_AGE": DATABASE_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
+        "TEST": {"MIRROR": "default"},
+    },
 }
+DATABASE_ROUTERS = ["anagram.routers.ReplicaRouter"]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
@@ -106,6 +131,18 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
     "COERCE_DECIMAL_TO_STRING": False,
+    # JSON stays the default, MessagePack is picked with `Accept: application/msgpack` (see `anagram/renderers.py`).
+    "DEFAULT_RENDERER_CLASSES": [
+        "anagram.renderers.ORJSONRenderer",
+        "anagram.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "anagram.renderers.ORJSONParser",
+        "anagram.renderers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
@@ -115,6 +152,19 @@ SPECTACULAR_SETTINGS = {
     "SERVE_INCLUDE_SCHEMA": False,
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# In production point this at a cache shared by all processes, e.g. `django.core.cache.backends.redis.RedisCache` with
+# `LOCATION: "redis://localhost:6379"` (and a `maxmemory-policy` that evicts, e.g. `allkeys-lru`).
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "TIMEOUT": 60 * 60,
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -156,7 +206,95 @@ USE_TZ = True
 STATIC_URL = "static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
+# Uploaded files (word lists of import jobs)
+# https://docs.djangoproject.com/en/5.0/topics/files/
+
+MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+# Celery
+# https://docs.celeryq.dev/en/stable/django/first-steps-with-django.html
+# Background jobs (see `anagram/tasks.py`) are queued through the filesystem transport, a broker stand-in that needs no
+# server and is shared by all processes on one machine. In production point it at Redis, e.g.
+# `CELERY_BROKER_URL = "redis://localhost:6379/0"`. Run a worker with `make worker`.
+
+CELERY_BROKER_URL = "filesystem://"
+CELERY_BROKER_QUEUE_FOLDER = os.path.join(BASE_DIR, ".celery", "queue")
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "data_folder_in": CELERY_BROKER_QUEUE_FOLDER,
+    "data_folder_out": CELERY_BROKER_QUEUE_FOLDER,
+    "control_folder": os.path.join(BASE_DIR, ".celery", "control"),
+}
+CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
+# Job progress and results are stored on `anagram.models.Job`, Celery doesn't need to keep them.
+CELERY_TASK_IGNORE_RESULT = True
+# Jobs run for minutes, don't let a busy worker hold on to queued ones.
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Anagram service
+# Serve `/anagrams/<word>.json` lookups from an in-process signature index (see `anagram/index.py`) instead of
+# querying the database. Every process holds its own copy and rebuilds it once another process changed the dataset,
+# which takes a cache shared by all processes (see `ANAGRAM_CACHE_ALIAS`).
+ANAGRAM_INDEX_ENABLED = False
+# Read the anagram index from a memory-mapped snapshot written by `manage.py build_anagram_snapshot` (see
+# `anagram/snapshot.py`), e.g. `os.path.join(BASE_DIR, "anagram-index.snapshot")`. All workers on a host share it, and
+# open it in milliseconds instead of loading the dictionary, then read the words changed since it was written from the
+# database. Writes queue a Celery task that rewrites it `ANAGRAM_SNAPSHOT_REFRESH_DELAY` seconds later, once per burst
+# of writes; `load_dictionary` rewrites it straight away.
+ANAGRAM_SNAPSHOT_PATH = None
+ANAGRAM_SNAPSHOT_REFRESH_DELAY = 60
+# Reject duplicate words with a unique constraint on `Word.word` (added by migration `anagram.0006_unique_word`).
+# Uploads skip words that already exist either way; with the constraint in place, so does `load_dictionary`.
+ANAGRAM_UNIQUE_WORDS = False
+# Cache responses of the read endpoints (see `anagram/cache.py`), keyed by a dataset version that every write bumps.
+# The version lives in the cache, so only enable it where all processes share the cache or there is a single process.
+ANAGRAM_CACHE_ENABLED = False
+ANAGRAM_CACHE_ALIAS = "default"
+# Run identical concurrent requests to the aggregate endpoints (length stats, biggest group, groups) once and share the
+# response (see `SingleFlight` in `anagram/cache.py`). Across processes this takes a lock in `ANAGRAM_CACHE_ALIAS`, so
+# it only coalesces requests of different processes when they share the cache. Waiting requests give up and run the
+# view themselves after `ANAGRAM_COALESCE_TIMEOUT` seconds; other processes check for the response every
+# `ANAGRAM_COALESCE_POLL_INTERVAL` seconds.
+ANAGRAM_COALESCE_ENABLED = True
+ANAGRAM_COALESCE_TIMEOUT = 30
+ANAGRAM_COALESCE_POLL_INTERVAL = 0.05
+# Send ETags derived from the same dataset version and answer `If-None-Match` with a 304 (see `anagram/cache.py`).
+ANAGRAM_ETAG_ENABLED = False
+# Longest word list `POST /words/` inserts within the request, longer ones are imported by a background job.
+ANAGRAM_UPLOAD_MAX_WORDS = 10000
+# Words inserted and committed per batch by `/words/import/` uploads and import jobs.
+ANAGRAM_IMPORT_BATCH_SIZE = 5000
+# Words deleted and committed per batch by delete-words jobs.
+ANAGRAM_DELETE_BATCH_SIZE = 5000
+# Maximum number of words accepted by one `/anagrams/batch/` request.
+ANAGRAM_BATCH_MAX_WORDS = 1000
+# Anagram lookups with `?` blanks: maximum number of blanks in a pattern and of words returned.
+ANAGRAM_MAX_BLANKS = 3
+ANAGRAM_MAX_BLANK_RESULTS = 1000
+# Phrase anagrams: upper bounds for the `max_words` and `max_results` parameters, seconds a search may take before
+# it returns partial results, and processes its top-level branches are spread over (0 searches in the request thread).
+ANAGRAM_PHRASE_MAX_WORDS = 4
+ANAGRAM_PHRASE_MAX_RESULTS = 1000
+ANAGRAM_PHRASE_TIME_BUDGET = 2.0
+ANAGRAM_PHRASE_WORKERS = 0
+# Route the read endpoints (anagram lookups, batch lookup, length stats and groups) to async views using the async ORM
+# (see `anagram/async_views.py`). Only worth it under an ASGI server, e.g. `make run-asgi`; under WSGI every async
+# view gets an event loop of its own.
+ANAGRAM_ASYNC_VIEWS = False
+# Record request latency and database queries per route (see `anagram/metrics.py`), served at `/metrics` in the
+# Prometheus text format. Bucket boundaries: seconds for the latency histogram, queries for the per-request histogram.
+ANAGRAM_METRICS_ENABLED = True
+ANAGRAM_METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ANAGRAM_METRICS_QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Database alias the read-only views (anagram lookups, stats and groups) read from, see `anagram/routers.py`. `None`
+# sends every read to `default`.
+ANAGRAM_REPLICA_DATABASE = "replica"
+# Responses of at least this many bytes are compressed with Brotli or gzip, whichever the client prefers (see
+# `anagram/compression.py`). Brotli quality goes from 0 to 11; above ~5 it costs more CPU than it saves in bytes.
+ANAGRAM_COMPRESSION_MIN_SIZE = 1024
+ANAGRAM_BROTLI_QUALITY = 4
@@ -1,3 +1,6 @@
 from .settings import *  # noqa: F403 - unused import
 
 CELERY_TASK_ALWAYS_EAGER = True
+# The replica is a mirror of `default` in tests, but a connection of its own: it can't see the rows a test writes
+# inside its transaction.
+ANAGRAM_REPLICA_DATABASE = None
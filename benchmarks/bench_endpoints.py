@@ -0,0 +1,215 @@
+"""End-to-end benchmarks of the API endpoints over the full `dictionary.txt`, run with `make bench`.
+
+Not collected by `make test` (the file name doesn't match `python_files`). The dictionary is loaded into the test
+database once per run; every benchmark then sends its requests through the Django test client and records the latency
+and the number of database queries of each one. Writes are rolled back after every benchmark, like in the tests.
+
+Results (p50/p95/max latency, queries per request) are written as JSON to `BENCHMARK_RESULTS`
+(`benchmarks/results.json` by default). A benchmark fails when its p95 latency or its queries per request exceed the
+thresholds in `benchmarks/thresholds.json`; update them in the same commit as an intended change.
+"""
+
+import io
+import json
+import os
+import platform
+import random
+import string
+import time
+from pathlib import Path
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from anagram.models import AnagramGroup, Word
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+THRESHOLDS = json.loads((BENCHMARKS_DIR / "thresholds.json").read_text())
+RESULTS_PATH = Path(os.environ.get("BENCHMARK_RESULTS", BENCHMARKS_DIR / "results.json"))
+
+results: dict[str, dict] = {}
+
+
+@pytest.fixture(scope="session")
+def django_db_setup(django_db_setup, django_db_blocker):
+    """Load the whole dictionary into the test database once, for all benchmarks."""
+    with django_db_blocker.unblock():
+        call_command("load_dictionary", str(settings.BASE_DIR / "dictionary.txt"), stdout=io.StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Word._meta.db_table}")
+            cursor.execute(f"ANALYZE {AnagramGroup._meta.db_table}")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def write_results():
+    yield
+    report = {
+        "python": platform.python_version(),
+        "database": connection.vendor,
+        "benchmarks": dict(sorted(results.items())),
+    }
+    RESULTS_PATH.write_text(json.dumps(report, indent=2) + "\n")
+
+
+@pytest.fixture(scope="session")
+def sample_words(django_db_blocker) -> list[str]:
+    """A fixed sample of dictionary words that fit the lookup URLs."""
+    with django_db_blocker.unblock():
+        words = sorted(
+            {word for word in Word.objects.values_list("word", flat=True) if word.isascii() and word.isalpha()}
+        )
+    return random.Random(0).sample(words, 200)
+
+
+def percentile(values: list[float], share: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, round(share * len(ordered)) - 1)]
+
+
+def run(name: str, requests: list[tuple[str, str, dict | None]], expected_status: int = 200) -> dict:
+    """Send `(method, url, json payload)` requests one by one, then record and check their latency and queries."""
+    client = Client()
+    latencies, queries = [], []
+
+    def count_query(execute, sql, params, many, context):
+        queries[-1] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_query):
+        for method, url, payload in requests:
+            queries.append(0)
+            started_at = time.perf_counter()
+            if payload is None:
+                response = getattr(client, method)(url)
+            else:
+                response = getattr(client, method)(url, payload, content_type="application/json")
+            latencies.append(time.perf_counter() - started_at)
+            assert response.status_code == expected_status, (url, response.status_code)
+
+    result = {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+        "queries_per_request": round(sum(queries) / len(queries), 2),
+        "max_queries": max(queries),
+    }
+    results[name] = result
+
+    threshold = THRESHOLDS[name]
+    assert result["p95_ms"] <= threshold["p95_ms"], f"{name}: p95 {result['p95_ms']}ms > {threshold['p95_ms']}ms"
+    assert (
+        result["max_queries"] <= threshold["max_queries"]
+    ), f"{name}: {result['max_queries']} queries per request > {threshold['max_queries']}"
+    return result
+
+
+def random_words(count: int, seed: int) -> list[str]:
+    """Words that are not in the dictionary."""
+    generator = random.Random(seed)
+    return ["zq" + "".join(generator.choices(string.ascii_lowercase, k=8)) for _ in range(count)]
+
+
+@pytest.mark.django_db
+class TestReadEndpoints:
+    def test_anagrams_for_word(self, sample_words):
+        run(
+            "anagrams_for_word",
+            [("get", reverse("anagrams-get-anagrams-for-word", kwargs={"word": word}), None) for word in sample_words],
+        )
+
+    def test_anagrams_for_word_without_proper_nouns(self, sample_words):
+        run(
+            "anagrams_for_word_without_proper_nouns",
+            [
+                (
+                    "get",
+                    f"{reverse('anagrams-get-anagrams-for-word', kwargs={'word': word})}?exclude_proper_nouns=true",
+                    None,
+                )
+                for word in sample_words
+            ],
+        )
+
+    def test_batch_anagrams(self, sample_words):
+        run("batch_anagrams", [("post", reverse("anagrams-get-anagrams-for-words"), {"words": sample_words})] * 20)
+
+    def test_near_anagrams(self, sample_words):
+        run(
+            "near_anagrams",
+            [
+                ("get", reverse("anagrams-get-near-anagrams", kwargs={"word": word}), None)
+                for word in sample_words[:50]
+            ],
+        )
+
+    def test_length_stats(self):
+        run("length_stats", [("get", reverse("words-get-word-length-statistics"), None)] * 20)
+
+    def test_biggest_anagram_group(self):
+        run("biggest_anagram_group", [("get", reverse("words-get-biggest-anagram-group"), None)] * 20)
+
+    def test_anagram_groups_first_page(self):
+        url = f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=2"
+        run("anagram_groups_first_page", [("get", url, None)] * 20)
+
+    def test_anagram_groups_deep_page(self):
+        page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+        page = AnagramGroup.objects.filter(count__gte=2).count() // page_size // 2
+        url = f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=2&page={page}"
+        run("anagram_groups_deep_page", [("get", url, None)] * 20)
+
+    def test_anagram_groups_last_page(self):
+        url = f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=2&page=last"
+        run("anagram_groups_last_page", [("get", url, None)] * 20)
+
+    def test_anagram_groups_cursor_pages(self):
+        """Walk the first 50 pages with cursor pagination, following the `next` links."""
+        url = f"{reverse('words-get-anagram-groups-of-at-least-size-x')}?min_group_size=2&pagination=cursor"
+        client, urls = Client(), []
+        for _ in range(50):
+            urls.append(url)
+            url = client.get(url).json()["next"]
+        run("anagram_groups_cursor_pages", [("get", url, None) for url in urls])
+
+
+@pytest.mark.django_db
+class TestWriteEndpoints:
+    def test_add_words(self):
+        run(
+            "add_words",
+            [("post", reverse("words"), {"anagrams": random_words(100, seed)}) for seed in range(10)],
+            expected_status=201,
+        )
+
+    def test_bulk_add_words(self):
+        run(
+            "bulk_add_words",
+            [("post", f"{reverse('words')}?bulk=true", {"anagrams": random_words(1000, seed)}) for seed in range(10)],
+            expected_status=201,
+        )
+
+    def test_upload_words(self):
+        words = random_words(settings.ANAGRAM_UPLOAD_MAX_WORDS, seed=100)
+        run("upload_words", [("post", f"{reverse('words')}?bulk=true", {"anagrams": words})], expected_status=201)
+
+    def test_upload_words_as_job(self, settings, tmp_path):
+        # Only queueing the import job is measured, it runs in the worker once the request has committed.
+        settings.MEDIA_ROOT = tmp_path
+        words = random_words(100_000, seed=101)
+        run("upload_words_as_job", [("post", reverse("words"), {"anagrams": words})], expected_status=202)
+
+    def test_delete_word(self, sample_words):
+        run(
+            "delete_word",
+            [("delete", reverse("words-delete-word", kwargs={"word": word}), None) for word in sample_words[:50]],
+            expected_status=204,
+        )
+
+    def test_delete_all_words(self):
+        run("delete_all_words", [("delete", reverse("words"), None)], expected_status=204)
@@ -0,0 +1,61 @@
+import time
+from contextlib import ExitStack
+
+import pytest
+from django.db import connections
+from django.test import Client
+from django.urls import Resolver404
+
+from anagram.budgets import QueryBudget, get_query_budget
+
+# Statements the test transaction adds around every request (`ATOMIC_REQUESTS` nests a savepoint in it). Outside of
+# tests requests run in a plain transaction, so they don't count towards the budgets.
+SAVEPOINT_PREFIXES = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+def check_query_budget(description: str, budget: QueryBudget, queries: list[tuple[str, float]]) -> None:
+    """Fail the test if the `(sql, seconds)` queries of a request exceed the budget, listing them."""
+    seconds = sum(duration for _, duration in queries)
+    if len(queries) <= budget.queries and (budget.seconds is None or seconds <= budget.seconds):
+        return
+    lines = [
+        f"{description} ran {len(queries)} queries in {seconds * 1000:.1f}ms, over its budget of {budget.queries}"
+        + (f" queries in {budget.seconds * 1000:.1f}ms:" if budget.seconds is not None else " queries:")
+    ]
+    lines += [f"{position}. ({duration * 1000:.1f}ms) {sql}" for position, (sql, duration) in enumerate(queries, 1)]
+    pytest.fail("\n".join(lines), pytrace=False)
+
+
+class QueryBudgetClient(Client):
+    """Test client that checks every request against the query budget of the view that served it (see
+    `anagram.budgets`)."""
+
+    def request(self, **request):
+        queries = []
+
+        def record_query(execute, sql, params, many, context):
+            started_at = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                if not sql.startswith(SAVEPOINT_PREFIXES):
+                    queries.append((sql, time.perf_counter() - started_at))
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record_query))
+            response = super().request(**request)
+
+        try:
+            budget = get_query_budget(response.resolver_match, request["REQUEST_METHOD"])
+        except Resolver404:
+            budget = None
+        if budget is not None:
+            check_query_budget(f"{request['REQUEST_METHOD']} {request['PATH_INFO']}", budget, queries)
+        return response
+
+
+@pytest.fixture
+def client() -> QueryBudgetClient:
+    """pytest-django's `client`, checking every request against its view's query budget."""
+    return QueryBudgetClient()
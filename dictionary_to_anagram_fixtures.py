@@ -1,4 +1,4 @@
-# TODO: This could be converted to a Django management command.
+# Superseded by `python manage.py load_dictionary dictionary.txt`, kept for the fixture based flow.
 import json
 
 INPUT_FILE = "dictionary.txt"